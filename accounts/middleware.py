@@ -0,0 +1,19 @@
+from django.utils.functional import SimpleLazyObject
+
+from .profiles import resolve
+
+
+class RoleProfileMiddleware:
+    """
+    Expose the user's role profile as ``request.role_profile``.
+
+    Resolved lazily, so the user is the one DRF authenticates (token or
+    session) and requests that never use the profile never look it up.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.role_profile = SimpleLazyObject(lambda: resolve(request.user))
+        return self.get_response(request)
@@ -0,0 +1,85 @@
+"""
+Role profiles of staff users.
+
+City staff and agricultural officers each have a profile row (CityStaff,
+AgriOfficer) that views need on most requests. The profile is created when
+the account is approved (ensure_profile) and afterwards resolved through
+the cache, so views neither query nor get_or_create it per request.
+RoleProfileMiddleware exposes it as ``request.role_profile``, resolved on
+first access. Cached profiles are dropped whenever they are saved or
+deleted; PROFILE_TTL bounds how stale another process's copy can get.
+"""
+from django.apps import apps
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+
+PROFILE_TTL = 300
+
+# role -> (model, defaults for a new profile)
+PROFILE_MODELS = {
+    'city_staff': ('city_services.CityStaff', lambda user: {
+        'department': 'Operations',
+        'designation': 'Field Officer',
+        'employee_id': f"CITY-{user.username}",
+        'jurisdiction': 'Central',
+    }),
+    'agri_officer': ('agriculture.AgriOfficer', lambda user: {
+        'department': 'Agriculture',
+        'specialization': 'General Officer',
+        'employee_id': f"EMP-{user.username}",
+        'district': 'Central District',
+    }),
+}
+
+
+def _cache_key(role, user_id):
+    return f'role-profile:{role}:{user_id}'
+
+
+def ensure_profile(user):
+    """
+    Create a user's role profile with default details if it does not exist.
+
+    Returns:
+        The profile, or None if the user's role has none
+    """
+    if user.role not in PROFILE_MODELS:
+        return None
+    model, defaults = PROFILE_MODELS[user.role]
+    profile, created = apps.get_model(model).objects.get_or_create(user=user, defaults=defaults(user))
+    return profile
+
+
+def resolve(user):
+    """
+    A user's role profile, from the cache when possible.
+
+    Accounts approved before profiles were created at approval get theirs
+    on first use.
+
+    Returns:
+        CityStaff, AgriOfficer or None
+    """
+    if not user.is_authenticated or user.role not in PROFILE_MODELS:
+        return None
+    key = _cache_key(user.role, user.pk)
+    profile = cache.get(key)
+    if profile is None:
+        model = apps.get_model(PROFILE_MODELS[user.role][0])
+        profile = model.objects.filter(user=user).first() or ensure_profile(user)
+        cache.set(key, profile, PROFILE_TTL)
+    profile.user = user
+    return profile
+
+
+def _profile_changed(sender, instance, **kwargs):
+    for role, (model, defaults) in PROFILE_MODELS.items():
+        if sender is apps.get_model(model):
+            cache.delete(_cache_key(role, instance.user_id))
+
+
+def connect_signals():
+    for role, (model, defaults) in PROFILE_MODELS.items():
+        sender = apps.get_model(model)
+        post_save.connect(_profile_changed, sender=sender, dispatch_uid=f'role-profile-save-{role}')
+        post_delete.connect(_profile_changed, sender=sender, dispatch_uid=f'role-profile-delete-{role}')
@@ -4,13 +4,14 @@ from .models import CustomUser, UserProfile, ApprovalRequest, OTP
 import random
 from datetime import datetime, timedelta
 from .utils import face_service
+from core.mixins import DynamicFieldsMixin
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = UserProfile
         fields = ['avatar', 'bio', 'city', 'state', 'pincode']
 
-class CustomUserSerializer(serializers.ModelSerializer):
+class CustomUserSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     profile = serializers.SerializerMethodField()
     
     def get_profile(self, obj):
@@ -133,7 +134,7 @@ class LoginSerializer(serializers.Serializer):
             raise serializers.ValidationError("Your account is pending approval")
         return {'user': user}
 
-class ApprovalRequestSerializer(serializers.ModelSerializer):
+class ApprovalRequestSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = CustomUserSerializer(read_only=True)
     reviewed_by_name = serializers.CharField(source='reviewed_by.get_full_name', read_only=True)
     
@@ -141,3 +142,4 @@ class ApprovalRequestSerializer(serializers.ModelSerializer):
         model = ApprovalRequest
         fields = '__all__'
         read_only_fields = ['reviewed_by', 'reviewed_at', 'status']
+        expandable_fields = ['user']
@@ -1,3 +1,64 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from rest_framework.test import APIClient
+
+from agriculture.models import AgriOfficer
+from city_services.models import CityStaff
+
+from . import profiles
+from .middleware import RoleProfileMiddleware
+from .models import ApprovalRequest, CustomUser
+
+
+class RoleProfileTests(TestCase):
+
+    def setUp(self):
+        self.officer = CustomUser.objects.create_user(username='officer', password='pw123456xx', role='agri_officer')
+        self.admin = CustomUser.objects.create_user(username='admin', password='pw123456xx', role='admin')
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_profile_is_created_on_approval(self):
+        approval = ApprovalRequest.objects.create(user=self.officer, request_type='agri_officer')
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with mock.patch('accounts.views.send_approval_status_email'):
+            response = client.post(f'/api/accounts/approvals/{approval.pk}/approve/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AgriOfficer.objects.get(user=self.officer).employee_id, 'EMP-officer')
+
+    def test_profile_is_resolved_only_when_used(self):
+        profiles.ensure_profile(self.officer)
+        request = RequestFactory().get('/')
+        request.user = self.officer
+        middleware = RoleProfileMiddleware(lambda request: request)
+        with self.assertNumQueries(0):
+            middleware(request)
+        with self.assertNumQueries(1):
+            self.assertEqual(request.role_profile.user, self.officer)
+        # Later requests are served from the cache
+        with self.assertNumQueries(0):
+            self.assertEqual(profiles.resolve(self.officer).district, 'Central District')
+
+    def test_cached_profile_is_dropped_when_changed_or_deleted(self):
+        officer = profiles.ensure_profile(self.officer)
+        profiles.resolve(self.officer)
+        officer.district = 'Pune'
+        officer.save()
+        self.assertEqual(profiles.resolve(self.officer).district, 'Pune')
+        officer.delete()
+        # Recreated with defaults, not served from the cache
+        self.assertEqual(profiles.resolve(self.officer).district, 'Central District')
+        self.assertNotEqual(profiles.resolve(self.officer).pk, officer.pk)
+
+    def test_other_roles_have_no_profile_and_get_403(self):
+        citizen = CustomUser.objects.create_user(username='cit', password='pw123456xx', role='citizen')
+        self.assertIsNone(profiles.resolve(citizen))
+        client = APIClient()
+        client.force_authenticate(citizen)
+        self.assertEqual(client.post('/api/agriculture/queries/claim/').status_code, 403)
+        self.assertEqual(client.post('/api/city/complaints/1/respond/', {'message': 'x'}).status_code, 403)
+        self.assertFalse(AgriOfficer.objects.exists() or CityStaff.objects.exists())
@@ -11,6 +11,8 @@ from .serializers import (
     LoginSerializer, ApprovalRequestSerializer
 )
 from .utils import face_service
+from .profiles import ensure_profile
+from core.mixins import FieldProjectionMixin
 from .email_utils import generate_otp, send_otp_email, send_admin_notification_email, send_approval_status_email
 
 @api_view(['POST'])
@@ -269,10 +271,11 @@ def user_logout(request):
         return Response({'message': 'Logged out successfully'})
     return redirect('login')
 
-class ApprovalRequestViewSet(viewsets.ModelViewSet):
+class ApprovalRequestViewSet(FieldProjectionMixin, viewsets.ModelViewSet):
     """Approval request management"""
     queryset = ApprovalRequest.objects.all()
     serializer_class = ApprovalRequestSerializer
+    compact_fields = ['id', 'user', 'request_type', 'status', 'requested_at']
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
@@ -293,6 +296,7 @@ class ApprovalRequestViewSet(viewsets.ModelViewSet):
         # Approve the user
         approval_request.user.is_approved = True
         approval_request.user.save()
+        ensure_profile(approval_request.user)
         
         # Send approval email
         send_approval_status_email(approval_request.user, 'approved')
@@ -315,7 +319,7 @@ class ApprovalRequestViewSet(viewsets.ModelViewSet):
         
         return Response({'message': 'Approval request rejected and user notified'})
 
-class UserViewSet(viewsets.ReadOnlyModelViewSet):
+class UserViewSet(FieldProjectionMixin, viewsets.ReadOnlyModelViewSet):
     """Admin-only user list"""
     queryset = CustomUser.objects.all()
     serializer_class = CustomUserSerializer
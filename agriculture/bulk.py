@@ -0,0 +1,73 @@
+"""
+Bulk transitions for farmer queries.
+
+Officers close or hand out many queries at once. Each action is one
+conditional UPDATE per previous status over the selected queries, so
+queries another officer holds a live claim on (see agriculture.queue) are
+never taken over. A query that is already closed, or that is no longer
+open when it is handed out, is simply left out of the result, and only
+the queries that changed are published to the dashboards.
+"""
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core import transitions
+from core.events import publish_instances
+
+from .queue import LEASE
+
+ACTIONS = ('close', 'assign')
+
+
+def not_held_by_other(officer, now):
+    """Queries without a live lease, or leased to the officer"""
+    return Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now) | Q(assigned_to=officer)
+
+
+def apply(queries, action, officer, value=None, now=None):
+    """
+    Apply a transition to many queries.
+
+    Args:
+        queries: FarmerQuery queryset of the selected queries
+        action: "close", or "assign" to lease them to another officer as if
+            that officer had claimed them
+        officer: The AgriOfficer acting
+        value: The AgriOfficer to assign to
+        now: Transition time (default: now)
+
+    Returns:
+        list: The queries changed
+    """
+    model = queries.model
+    now = now or timezone.now()
+    if action == 'close':
+        previous_statuses = ('submitted', 'under_review', 'answered')
+        changes = {'status': 'closed', 'lease_expires_at': None}
+    else:
+        # Already under review first, so queries moved there below are not matched again
+        previous_statuses = ('under_review', 'submitted')
+        changes = {'assigned_to': value, 'lease_expires_at': now + LEASE, 'status': 'under_review'}
+
+    selected = list(queries.values_list('id', flat=True))
+    changed_from = {}
+    # One conditional UPDATE per status, each re-checking that no other
+    # officer holds the query, rather than reading first: on SQLite a
+    # transaction that reads before writing fails instead of waiting
+    with transaction.atomic():
+        for previous in previous_statuses:
+            eligible = model.objects.filter(not_held_by_other(officer, now), id__in=selected,
+                                            status=previous).exclude(id__in=changed_from)
+            if not eligible.update(updated_at=now, **changes):
+                continue
+            # After this transaction's first write nobody else can change
+            # these rows, so its own timestamp picks out what it wrote
+            written = model.objects.filter(id__in=selected, status=changes['status'], updated_at=now)
+            for pk in written.exclude(id__in=changed_from).values_list('id', flat=True):
+                changed_from[pk] = previous
+        transitions.record('farmer_query', [(pk, previous, changes['status']) for pk, previous in changed_from.items()],
+                           officer.user, now)
+    changed = list(model.objects.filter(id__in=changed_from).select_related('farmer', 'crop_category', 'assigned_to__user'))
+    publish_instances(changed)
+    return changed
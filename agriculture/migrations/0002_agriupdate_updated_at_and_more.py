@@ -0,0 +1,35 @@
+# Generated by Django 5.1.5 on 2026-10-19 17:08
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    AgriUpdate = apps.get_model('agriculture', 'AgriUpdate')
+    AgriUpdate.objects.update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agriculture', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agriupdate',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='agriupdate',
+            index=models.Index(fields=['updated_at', 'id'], name='agriculture_updated_b6523b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='farmerquery',
+            index=models.Index(fields=['updated_at', 'id'], name='agriculture_updated_d9c8b5_idx'),
+        ),
+    ]
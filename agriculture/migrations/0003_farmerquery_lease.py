@@ -0,0 +1,24 @@
+# Generated by Django 5.1.5 on 2026-10-19 17:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agriculture', '0002_agriupdate_updated_at_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='farmerquery',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='farmerquery',
+            index=models.Index(fields=['status', 'created_at'], name='agriculture_status_a3e852_idx'),
+        ),
+    ]
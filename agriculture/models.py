@@ -43,6 +43,7 @@ class FarmerQuery(models.Model):
     farmer = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='farmer_queries')
     crop_category = models.ForeignKey(CropCategory, on_delete=models.SET_NULL, null=True, blank=True, related_name='queries')
     assigned_to = models.ForeignKey(AgriOfficer, on_delete=models.SET_NULL, null=True, blank=True, related_name='assigned_queries')
+    lease_expires_at = models.DateTimeField(null=True, blank=True)  # Claim by assigned_to lapses after this
     
     title = models.CharField(max_length=200)
     description = models.TextField()
@@ -60,6 +61,10 @@ class FarmerQuery(models.Model):
     class Meta:
         verbose_name_plural = "Farmer Queries"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['updated_at', 'id']),  # Delta sync keyset
+            models.Index(fields=['status', 'created_at']),  # Officer work queue
+        ]
 
 
 class AgriAdvisory(models.Model):
@@ -100,9 +105,11 @@ class AgriUpdate(models.Model):
     image = models.ImageField(upload_to='agri_updates/', blank=True, null=True)
     is_urgent = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.title} - {self.get_update_type_display()}"
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['updated_at', 'id'])]  # Delta sync keyset
@@ -0,0 +1,141 @@
+"""
+Work queue for agri officers answering farmer queries.
+
+An officer claims the next open query instead of browsing the full list.
+A claim sets ``assigned_to`` and a lease; until the lease expires no other
+officer is handed that query, and once it expires (the officer went idle)
+the query is claimable again. Queries in the officer's district and crops
+named in their specialisation come first, then the oldest.
+
+On databases with ``SELECT ... FOR UPDATE SKIP LOCKED`` (PostgreSQL, MySQL)
+officers claiming at the same time lock different rows and never wait on
+each other. SQLite has no row locks, so there the claim is a conditional
+UPDATE on the row still being claimable (compare-and-swap) and the officer
+moves on to the next candidate if someone else won it.
+"""
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from city_services.locations import location_tokens
+
+OPEN_STATUSES = ('submitted', 'under_review')
+
+LEASE = timedelta(minutes=30)
+
+# Candidates tried per claim on databases without SKIP LOCKED
+CAS_CANDIDATES = 10
+
+
+def claimable(now):
+    """Open queries nobody holds a live lease on"""
+    return Q(status__in=OPEN_STATUSES) & (Q(assigned_to__isnull=True) | Q(lease_expires_at__isnull=True)
+                                          | Q(lease_expires_at__lte=now))
+
+
+def held_by(officer, now):
+    return Q(assigned_to=officer, lease_expires_at__gt=now)
+
+
+def _preference(officer):
+    """Ordering expression: 0 for the officer's district and crop, 1 for either, 2 otherwise"""
+    from .models import CropCategory
+
+    tokens = location_tokens(officer.district)
+    specialization = officer.specialization.lower()
+    crops = [pk for pk, name in CropCategory.objects.values_list('id', 'name') if name.lower() in specialization]
+
+    district = Value(1)
+    if tokens:
+        in_district = Q(*[Q(location__icontains=token) for token in tokens])
+        district = Case(When(in_district, then=Value(0)), default=Value(1), output_field=IntegerField())
+    crop = Case(When(crop_category_id__in=crops, then=Value(0)), default=Value(1), output_field=IntegerField())
+    return district + crop
+
+
+def _take(query_id, officer, now):
+    """Claim one query if it is still claimable; returns whether this officer got it"""
+    from core import transitions
+    from .models import FarmerQuery
+    # One conditional UPDATE per status rather than reading it first: on
+    # SQLite a transaction that reads before writing fails instead of waiting
+    # when another claim is writing
+    with transaction.atomic():
+        for previous in OPEN_STATUSES:
+            if FarmerQuery.objects.filter(claimable(now), id=query_id, status=previous).update(
+                    assigned_to=officer, lease_expires_at=now + LEASE, status='under_review', updated_at=now):
+                transitions.record('farmer_query', [(query_id, previous, 'under_review')], officer.user, now)
+                return True
+    return False
+
+
+def _published(query_id):
+    """Load a query written with update() and publish its change to the dashboards"""
+    from core.events import publish_instances
+    from .models import FarmerQuery
+    query = FarmerQuery.objects.select_related('farmer', 'crop_category', 'assigned_to__user').get(pk=query_id)
+    publish_instances([query])
+    return query
+
+
+def claim_next(officer):
+    """
+    Claim the best open query for an officer.
+
+    Args:
+        officer: AgriOfficer
+
+    Returns:
+        FarmerQuery: The claimed query, or None if the queue is empty
+    """
+    from .models import FarmerQuery
+
+    now = timezone.now()
+    candidates = (
+        FarmerQuery.objects.filter(claimable(now))
+        .annotate(preference=_preference(officer))
+        .order_by('preference', 'created_at', 'id')
+    )
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            query_id = candidates.select_for_update(skip_locked=True).values_list('id', flat=True).first()
+            if query_id is None or not _take(query_id, officer, now):
+                return None
+        return _published(query_id)
+
+    # Compare-and-swap: losing a race only costs trying the next candidate
+    while True:
+        ids = list(candidates.values_list('id', flat=True)[:CAS_CANDIDATES])
+        if not ids:
+            return None
+        for query_id in ids:
+            if _take(query_id, officer, now):
+                return _published(query_id)
+
+
+def renew(query, officer):
+    """Extend the officer's lease on a query; returns False if they no longer hold it"""
+    from .models import FarmerQuery
+    now = timezone.now()
+    return FarmerQuery.objects.filter(held_by(officer, now), id=query.pk, status__in=OPEN_STATUSES).update(
+        lease_expires_at=now + LEASE, updated_at=now,
+    ) == 1
+
+
+def release(query, officer):
+    """Hand a held query back to the queue; returns False if the officer did not hold it"""
+    from .models import FarmerQuery
+    now = timezone.now()
+    if not FarmerQuery.objects.filter(held_by(officer, now), id=query.pk).update(
+            assigned_to=None, lease_expires_at=None, updated_at=now):
+        return False
+    _published(query.pk)
+    return True
+
+
+def is_held_by_other(query, officer):
+    """Whether another officer holds a live lease on the query"""
+    return (query.assigned_to_id not in (None, officer.pk) and query.lease_expires_at is not None
+            and query.lease_expires_at > timezone.now())
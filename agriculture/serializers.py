@@ -1,7 +1,9 @@
 from rest_framework import serializers
 from .models import AgriOfficer, CropCategory, FarmerQuery, AgriAdvisory, AgriUpdate
+from core.mixins import DynamicFieldsMixin
+from core.thumbnails import get_thumbnail_url
 
-class AgriOfficerSerializer(serializers.ModelSerializer):
+class AgriOfficerSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user_details = serializers.SerializerMethodField()
     
     class Meta:
@@ -15,12 +17,12 @@ class AgriOfficerSerializer(serializers.ModelSerializer):
             'email': obj.user.email
         }
 
-class CropCategorySerializer(serializers.ModelSerializer):
+class CropCategorySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = CropCategory
         fields = '__all__'
 
-class AgriAdvisorySerializer(serializers.ModelSerializer):
+class AgriAdvisorySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     officer_name = serializers.CharField(source='officer.user.get_full_name', read_only=True)
     query_ref = serializers.CharField(source='query.query_id', read_only=True)
     
@@ -29,15 +31,20 @@ class AgriAdvisorySerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ['created_at', 'officer', 'query']
 
-class FarmerQuerySerializer(serializers.ModelSerializer):
+class FarmerQuerySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     advisories = AgriAdvisorySerializer(many=True, read_only=True)
     crop_name = serializers.CharField(source='crop_category.name', read_only=True)
     farmer_name = serializers.CharField(source='farmer.get_full_name', read_only=True)
+    image_thumbnail = serializers.SerializerMethodField()
     
     class Meta:
         model = FarmerQuery
         fields = '__all__'
-        read_only_fields = ['query_id', 'created_at', 'updated_at', 'farmer']
+        read_only_fields = ['query_id', 'created_at', 'updated_at', 'farmer', 'assigned_to', 'lease_expires_at']
+        expandable_fields = ['advisories']
+    
+    def get_image_thumbnail(self, obj):
+        return get_thumbnail_url(obj.image, self.context.get('request'))
     
     def create(self, validated_data):
         # Generate unique query ID
@@ -45,11 +52,15 @@ class FarmerQuerySerializer(serializers.ModelSerializer):
         validated_data['query_id'] = f"AGR-{uuid.uuid4().hex[:8].upper()}"
         return super().create(validated_data)
 
-class AgriUpdateSerializer(serializers.ModelSerializer):
+class AgriUpdateSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     officer_name = serializers.CharField(source='officer.user.get_full_name', read_only=True)
     crop_name = serializers.CharField(source='crop_category.name', read_only=True)
+    image_thumbnail = serializers.SerializerMethodField()
     
     class Meta:
         model = AgriUpdate
         fields = '__all__'
         read_only_fields = ['created_at', 'officer']
+    
+    def get_image_thumbnail(self, obj):
+        return get_thumbnail_url(obj.image, self.context.get('request'))
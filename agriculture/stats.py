@@ -0,0 +1,75 @@
+"""
+Officer dashboard figures.
+
+The query figures come from one conditional-aggregation query over farmer
+queries joined to their advisories: the open queue, the month's queries and
+advisories, response times, and the requesting officer's own claims and
+advisories.
+"""
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Q
+from django.utils import timezone
+
+from core.stats import cached, hours, month_start
+
+from .queue import OPEN_STATUSES
+
+
+def compute(user=None, now=None):
+    """
+    Dashboard figures for an officer.
+
+    Args:
+        user: Officer user whose own claims and advisories are reported
+        now: Reference time (default: now)
+
+    Returns:
+        dict: pending_queries, unclaimed, queries_this_month,
+        answered_this_month, advisories_this_month, avg_response_hours
+        (query to advisory, advisories given this month), advisories_given,
+        updates_posted and mine (held, advisories_this_month,
+        avg_response_hours)
+    """
+    from .models import AgriUpdate, FarmerQuery
+
+    now = now or timezone.now()
+    since = month_start(now)
+    is_open = Q(status__in=OPEN_STATUSES)
+    advised = Q(advisories__created_at__gte=since)
+    mine = Q(advisories__officer__user=user) if user is not None else Q(pk__in=[])
+    response_time = ExpressionWrapper(F('advisories__created_at') - F('created_at'), output_field=DurationField())
+
+    # Queries are joined to their advisories, so query counts are distinct
+    row = FarmerQuery.objects.aggregate(
+        pending_queries=Count('id', filter=is_open, distinct=True),
+        unclaimed=Count('id', filter=is_open & (Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now)),
+                        distinct=True),
+        queries_this_month=Count('id', filter=Q(created_at__gte=since), distinct=True),
+        answered_this_month=Count('id', filter=advised, distinct=True),
+        advisories_this_month=Count('advisories', filter=advised, distinct=True),
+        avg_response=Avg(response_time, filter=advised),
+        advisories_given=Count('advisories', filter=mine, distinct=True),
+        mine_held=Count('id', filter=is_open & Q(assigned_to__user=user, lease_expires_at__gt=now), distinct=True),
+        mine_advised=Count('advisories', filter=mine & advised, distinct=True),
+        mine_response=Avg(response_time, filter=mine & advised),
+    )
+    return {
+        'pending_queries': row['pending_queries'],
+        'unclaimed': row['unclaimed'],
+        'queries_this_month': row['queries_this_month'],
+        'answered_this_month': row['answered_this_month'],
+        'advisories_this_month': row['advisories_this_month'],
+        'avg_response_hours': hours(row['avg_response']),
+        'advisories_given': row['advisories_given'],
+        # Updates are not tied to queries; a second, indexed count
+        'updates_posted': AgriUpdate.objects.filter(officer__user=user).count() if user is not None else 0,
+        'mine': {
+            'held': row['mine_held'],
+            'advisories_this_month': row['mine_advised'],
+            'avg_response_hours': hours(row['mine_response']),
+        },
+    }
+
+
+def dashboard_stats(user):
+    """compute() for a user, cached for core.stats.STATS_TTL seconds"""
+    return cached('agriculture', user, compute)
@@ -1,3 +1,148 @@
-from django.test import TestCase
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from core.models import StatusTransition
+
+from . import bulk, queue, stats
+from .models import AgriAdvisory, AgriOfficer, AgriUpdate, FarmerQuery
+
+
+def make_officers(count):
+    return [
+        AgriOfficer.objects.create(
+            user=CustomUser.objects.create_user(username=f'officer{index}', password='pw123456xx',
+                                                role='agri_officer', is_approved=True),
+            department='Agriculture', specialization='General', employee_id=f'EMP-{index}', district='Pune',
+        )
+        for index in range(count)
+    ]
+
+
+def make_queries(count):
+    farmer = CustomUser.objects.create_user(username='farmer', password='pw123456xx', role='citizen')
+    FarmerQuery.objects.bulk_create([
+        FarmerQuery(farmer=farmer, title=f'Query {index}', description='Leaves yellowing', location='Pune',
+                    query_id=f'FQ-{index}')
+        for index in range(count)
+    ])
+    return list(FarmerQuery.objects.order_by('created_at', 'id').values_list('id', flat=True))
+
+
+class ClaimQueueTests(TestCase):
+
+    def setUp(self):
+        self.first, self.second = make_officers(2)
+        self.ids = make_queries(3)
+
+    def test_held_queries_are_not_handed_out_again(self):
+        claims = [queue.claim_next(officer) for officer in (self.first, self.second, self.first, self.second)]
+        self.assertEqual([query.id if query else None for query in claims], self.ids + [None])
+        self.assertEqual(claims[0].assigned_to, self.first)
+        self.assertEqual(claims[0].status, 'under_review')
+
+    def test_lost_race_moves_on_to_the_next_candidate(self):
+        take = queue._take
+
+        def rival_wins_first(query_id, officer, now):
+            # Another officer claims the candidate between the read and the compare-and-swap
+            if officer == self.first and query_id == self.ids[0]:
+                self.assertTrue(take(query_id, self.second, now))
+            return take(query_id, officer, now)
+
+        with mock.patch.object(queue, '_take', side_effect=rival_wins_first):
+            query = queue.claim_next(self.first)
+        self.assertEqual(query.id, self.ids[1])
+        self.assertEqual(FarmerQuery.objects.get(id=self.ids[0]).assigned_to, self.second)
+
+
+class BulkTransitionTests(TestCase):
+
+    def setUp(self):
+        self.first, self.second = make_officers(2)
+        self.ids = make_queries(4)
+        FarmerQuery.objects.filter(id=self.ids[1]).update(status='answered')
+        FarmerQuery.objects.filter(id=self.ids[2]).update(status='closed')
+        FarmerQuery.objects.filter(id=self.ids[3]).update(
+            status='under_review', assigned_to=self.second, lease_expires_at=timezone.now() + timedelta(minutes=5))
+
+    def history(self):
+        return sorted(StatusTransition.objects.values_list('object_id', 'from_status', 'to_status'))
+
+    def test_close_skips_closed_and_claimed_queries(self):
+        changed = bulk.apply(FarmerQuery.objects.filter(id__in=self.ids), 'close', self.first)
+        self.assertEqual(sorted(query.id for query in changed), self.ids[:2])
+        self.assertEqual(self.history(), [(self.ids[0], 'submitted', 'closed'), (self.ids[1], 'answered', 'closed')])
+        self.assertEqual(FarmerQuery.objects.get(id=self.ids[3]).status, 'under_review')
+
+    def test_assign_records_only_status_changes(self):
+        changed = bulk.apply(FarmerQuery.objects.filter(id__in=self.ids), 'assign', self.second, self.first)
+        self.assertEqual(sorted(query.id for query in changed), [self.ids[0], self.ids[3]])
+        self.assertTrue(all(query.assigned_to == self.first for query in changed))
+        self.assertEqual(self.history(), [(self.ids[0], 'submitted', 'under_review')])
+        # Now held by the first officer, so the second officer's close leaves them alone
+        changed = bulk.apply(FarmerQuery.objects.filter(id__in=self.ids), 'close', self.second)
+        self.assertEqual([query.id for query in changed], [self.ids[1]])
+
+
+class DashboardStatsTests(TestCase):
+
+    def test_figures(self):
+        now = datetime(2026, 10, 15, 12, tzinfo=dt_timezone.utc)
+        filed = now - timedelta(hours=10)
+        mine, other = make_officers(2)
+        ids = make_queries(4)
+        FarmerQuery.objects.update(created_at=filed)
+        FarmerQuery.objects.filter(id=ids[1]).update(status='under_review', assigned_to=mine,
+                                                     lease_expires_at=now + timedelta(minutes=10))
+        FarmerQuery.objects.filter(id=ids[2]).update(status='answered')
+        FarmerQuery.objects.filter(id=ids[3]).update(status='closed', created_at=now - timedelta(days=40))
+        for query_id, officer, at in ((ids[2], mine, filed + timedelta(hours=2)),
+                                      (ids[2], other, filed + timedelta(hours=6)),
+                                      (ids[3], mine, now - timedelta(days=39))):
+            advisory = AgriAdvisory.objects.create(query_id=query_id, officer=officer, advice='Spray neem oil')
+            AgriAdvisory.objects.filter(pk=advisory.pk).update(created_at=at)
+        AgriUpdate.objects.create(officer=mine, title='Rain', content='Heavy rain', update_type='weather')
+
+        self.assertEqual(stats.compute(mine.user, now), {
+            'pending_queries': 2,
+            'unclaimed': 1,
+            'queries_this_month': 3,
+            'answered_this_month': 1,
+            'advisories_this_month': 2,
+            'avg_response_hours': 4.0,
+            'advisories_given': 2,
+            'updates_posted': 1,
+            'mine': {'held': 1, 'advisories_this_month': 1, 'avg_response_hours': 2.0},
+        })
+
+
+class ConcurrentClaimTests(TransactionTestCase):
+
+    def test_concurrent_officers_never_claim_the_same_query(self):
+        officers = make_officers(4)
+        ids = make_queries(20)
+        claimed, errors = [], []
+
+        def work(officer):
+            try:
+                while (query := queue.claim_next(officer)) is not None:
+                    claimed.append(query.id)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=work, args=(officer,)) for officer in officers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(claimed), sorted(ids))
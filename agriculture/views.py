@@ -1,27 +1,39 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.db import transaction
+from django.utils import timezone
 from .models import AgriOfficer, CropCategory, FarmerQuery, AgriAdvisory, AgriUpdate
 from .serializers import (
     AgriOfficerSerializer, CropCategorySerializer, FarmerQuerySerializer,
     AgriAdvisorySerializer, AgriUpdateSerializer
 )
+from core import transitions
+from core.mixins import BulkActionMixin, ConditionalListMixin, FieldProjectionMixin
+from . import bulk, stats
+from . import queue as work_queue
 from dpi_platform.forms import FarmerForm
-from dpi_platform.utils import crop_model, yield_model, encoders
+from dpi_platform.utils import crop_forest, yield_forest, crop_lookup, encoders
 import numpy as np
 
-class CropCategoryViewSet(viewsets.ModelViewSet):
+class CropCategoryViewSet(ConditionalListMixin, FieldProjectionMixin, viewsets.ModelViewSet):
     """Crop category management"""
     queryset = CropCategory.objects.all()
     serializer_class = CropCategorySerializer
     permission_classes = [IsAuthenticated]
+    version_collections = ['crop_categories']
 
-class FarmerQueryViewSet(viewsets.ModelViewSet):
+class FarmerQueryViewSet(BulkActionMixin, FieldProjectionMixin, viewsets.ModelViewSet):
     """Farmer query management"""
     queryset = FarmerQuery.objects.all()
     serializer_class = FarmerQuerySerializer
     permission_classes = [IsAuthenticated]
+    compact_fields = [
+        'id', 'query_id', 'title', 'crop_name', 'farmer_name', 'location',
+        'status', 'created_at', 'image_thumbnail', 'assigned_to', 'lease_expires_at'
+    ]
     
     def get_queryset(self):
         user = self.request.user
@@ -29,27 +41,66 @@ class FarmerQueryViewSet(viewsets.ModelViewSet):
             return FarmerQuery.objects.none()
         if user.role == 'agri_officer':
             # Allow officers to see all queries to pick them up
-            return FarmerQuery.objects.all().order_by('-created_at')
+            queryset = FarmerQuery.objects.select_related('farmer', 'crop_category').order_by('-created_at')
+            if self.request.query_params.get('queue') == 'mine':
+                # Queries this officer currently holds a claim on
+                queryset = queryset.filter(work_queue.held_by(self.request.role_profile, timezone.now()))
+            return queryset
         elif user.role == 'citizen':
             return FarmerQuery.objects.filter(farmer=user).order_by('-created_at')
         return FarmerQuery.objects.all()
     
     def perform_create(self, serializer):
-        serializer.save(farmer=self.request.user)
+        with transaction.atomic():
+            query = serializer.save(farmer=self.request.user)
+            transitions.record('farmer_query', [(query.pk, '', query.status)], self.request.user)
+    
+    def perform_update(self, serializer):
+        previous = serializer.instance.status
+        with transaction.atomic():
+            query = serializer.save()
+            transitions.record('farmer_query', [(query.pk, previous, query.status)], self.request.user)
+    
+    @action(detail=False, methods=['post'])
+    def claim(self, request):
+        """Claim the next open query from the work queue"""
+        if request.user.role != 'agri_officer':
+            return Response({'error': 'Only agri officers can claim queries'}, status=status.HTTP_403_FORBIDDEN)
+        query = work_queue.claim_next(request.role_profile)
+        if query is None:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        return Response(self.get_serializer(query).data)
+    
+    @action(detail=True, methods=['post'])
+    def renew(self, request, pk=None):
+        """Extend the claim on a query the officer is still working on"""
+        if request.user.role != 'agri_officer':
+            return Response({'error': 'Only agri officers can claim queries'}, status=status.HTTP_403_FORBIDDEN)
+        query = self.get_object()
+        if not work_queue.renew(query, request.role_profile):
+            return Response({'error': 'You do not hold a claim on this query'}, status=status.HTTP_409_CONFLICT)
+        query.refresh_from_db(fields=['lease_expires_at'])
+        return Response({'lease_expires_at': query.lease_expires_at})
+    
+    @action(detail=True, methods=['post'])
+    def release(self, request, pk=None):
+        """Return a claimed query to the work queue"""
+        if request.user.role != 'agri_officer':
+            return Response({'error': 'Only agri officers can claim queries'}, status=status.HTTP_403_FORBIDDEN)
+        query = self.get_object()
+        if not work_queue.release(query, request.role_profile):
+            return Response({'error': 'You do not hold a claim on this query'}, status=status.HTTP_409_CONFLICT)
+        return Response({'message': 'Query released'})
     
     @action(detail=True, methods=['post'])
     def respond(self, request, pk=None):
         """Add advisory to query"""
+        if request.user.role != 'agri_officer':
+            return Response({'error': 'Only agri officers can respond to queries'}, status=status.HTTP_403_FORBIDDEN)
         query = self.get_object()
-        officer, created = AgriOfficer.objects.get_or_create(
-            user=request.user,
-            defaults={
-                'department': 'Agriculture',
-                'specialization': 'General Officer',
-                'employee_id': f"EMP-{request.user.username}",
-                'district': 'Central District'
-            }
-        )
+        officer = request.role_profile
+        if work_queue.is_held_by_other(query, officer):
+            return Response({'error': 'Another officer has claimed this query'}, status=status.HTTP_409_CONFLICT)
         
         print(f"[DEBUG] Respond Action - Query: {query.query_id}, Officer: {officer.user.username}")
         print(f"[DEBUG] Request Data: {request.data}")
@@ -57,11 +108,15 @@ class FarmerQueryViewSet(viewsets.ModelViewSet):
         advisory_serializer = AgriAdvisorySerializer(data=request.data)
         if advisory_serializer.is_valid():
             try:
-                advisory_serializer.save(query=query, officer=officer)
-                
-                # Update query status
-                query.status = 'answered'
-                query.save()
+                with transaction.atomic():
+                    advisory_serializer.save(query=query, officer=officer)
+                    
+                    # Update query status; the answering officer keeps the query
+                    previous, query.status = query.status, 'answered'
+                    query.assigned_to = officer
+                    query.lease_expires_at = None
+                    query.save()
+                    transitions.record('farmer_query', [(query.pk, previous, query.status)], request.user)
                 
                 return Response(advisory_serializer.data, status=status.HTTP_201_CREATED)
             except Exception as e:
@@ -71,16 +126,44 @@ class FarmerQueryViewSet(viewsets.ModelViewSet):
         print(f"[DEBUG] Validation Errors: {advisory_serializer.errors}")
         return Response(advisory_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Close or assign many queries at once"""
+        if request.user.role != 'agri_officer':
+            return Response({'error': 'Only agri officers can update queries'}, status=status.HTTP_403_FORBIDDEN)
+        name = request.data.get('action')
+        if name not in bulk.ACTIONS:
+            return Response({'error': f"action must be one of {', '.join(bulk.ACTIONS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        ids = self.bulk_ids(request)
+        if ids is None:
+            return Response({'error': f'ids must be a list of 1 to {self.max_bulk_ids} query ids'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        value = None
+        if name == 'assign':
+            try:
+                value = AgriOfficer.objects.get(pk=int(request.data.get('assigned_to')))
+            except (TypeError, ValueError, AgriOfficer.DoesNotExist):
+                return Response({'error': 'assigned_to must be an officer id'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        queries = self.get_queryset().filter(pk__in=ids)
+        missing = set(ids) - set(queries.values_list('id', flat=True))
+        if missing:
+            return Response({'error': 'Queries not found', 'missing': sorted(missing)}, status=status.HTTP_404_NOT_FOUND)
+        updated = {query.pk for query in bulk.apply(queries, name, request.role_profile, value)}
+        return Response({'updated': sorted(updated), 'skipped': sorted(set(ids) - updated)})
+    
     @action(detail=True, methods=['post'])
     def validate_advisory(self, request, pk=None):
         """Validate an advisory (senior officer)"""
+        if request.user.role != 'agri_officer':
+            return Response({'error': 'Only agri officers can validate advisories'}, status=status.HTTP_403_FORBIDDEN)
         query = self.get_object()
         advisory_id = request.data.get('advisory_id')
         
         try:
             advisory = AgriAdvisory.objects.get(id=advisory_id, query=query)
             advisory.is_validated = True
-            advisory.validated_by = AgriOfficer.objects.get(user=request.user)
+            advisory.validated_by = request.role_profile
             advisory.save()
             return Response({'message': 'Advisory validated'})
         except AgriAdvisory.DoesNotExist:
@@ -93,32 +176,9 @@ def dashboard_stats(request):
     if request.user.role != 'agri_officer':
         return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
     
-    # Calculate stats
-    pending_queries = FarmerQuery.objects.filter(status__in=['submitted', 'under_review']).count()
-    try:
-        officer, created = AgriOfficer.objects.get_or_create(
-            user=request.user,
-            defaults={
-                'department': 'Agriculture',
-                'specialization': 'General Officer',
-                'employee_id': f"EMP-{request.user.username}",
-                'district': 'Central District'
-            }
-        )
-        advisories = AgriAdvisory.objects.filter(officer=officer).count()
-        updates = AgriUpdate.objects.filter(officer=officer).count()
-    except Exception as e:
-        print(f"Stats Error: {e}")
-        advisories = 0
-        updates = 0
-    
-    return Response({
-        'pending_queries': pending_queries,
-        'advisories_given': advisories,
-        'updates_posted': updates
-    })
+    return Response(stats.dashboard_stats(request.user))
 
-class AgriAdvisoryViewSet(viewsets.ReadOnlyModelViewSet):
+class AgriAdvisoryViewSet(FieldProjectionMixin, viewsets.ReadOnlyModelViewSet):
     """View given advisories"""
     serializer_class = AgriAdvisorySerializer
     permission_classes = [IsAuthenticated]
@@ -129,10 +189,15 @@ class AgriAdvisoryViewSet(viewsets.ReadOnlyModelViewSet):
             return AgriAdvisory.objects.filter(officer__user=user).select_related('query').order_by('-created_at')
         return AgriAdvisory.objects.none()
 
-class AgriUpdateViewSet(viewsets.ModelViewSet):
+class AgriUpdateViewSet(ConditionalListMixin, FieldProjectionMixin, viewsets.ModelViewSet):
     """Agricultural update management"""
     queryset = AgriUpdate.objects.all()
     serializer_class = AgriUpdateSerializer
+    version_collections = ['agri_updates']
+    compact_fields = [
+        'id', 'title', 'content', 'update_type', 'district', 'crop_name',
+        'officer_name', 'is_urgent', 'created_at', 'image_thumbnail'
+    ]
     
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -140,7 +205,7 @@ class AgriUpdateViewSet(viewsets.ModelViewSet):
         return [permissions.IsAuthenticated()]
     
     def get_queryset(self):
-        queryset = AgriUpdate.objects.all().order_by('-created_at')
+        queryset = AgriUpdate.objects.select_related('officer__user', 'crop_category').order_by('-created_at')
         district = self.request.query_params.get('district')
         update_type = self.request.query_params.get('type')
         
@@ -152,16 +217,9 @@ class AgriUpdateViewSet(viewsets.ModelViewSet):
         return queryset
     
     def perform_create(self, serializer):
-        officer, created = AgriOfficer.objects.get_or_create(
-            user=self.request.user,
-            defaults={
-                'department': 'Agriculture',
-                'specialization': 'General Officer',
-                'employee_id': f"EMP-{self.request.user.username}",
-                'district': 'Central District'
-            }
-        )
-        serializer.save(officer=officer)
+        if self.request.user.role != 'agri_officer':
+            raise PermissionDenied('Only agri officers can post updates')
+        serializer.save(officer=self.request.role_profile)
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
@@ -172,25 +230,25 @@ def recommend_crop(request):
         data = form.cleaned_data
 
         try:
-            # Transform inputs using loaded encoders
-            # Note: The original code used encoders["location"].transform([data["location"]])[0]
-            # We assume encoders is a dict of LabelEncoders or OneHotEncoders as per utils.py
-            
-            input_data = [
-                encoders["location"].transform([data["location"]])[0],
-                encoders["season"].transform([data["season"]])[0],
-                encoders["soil_type"].transform([data["soil_type"]])[0],
-                encoders["irrigation"].transform([data["irrigation"]])[0],
-                encoders["rainfall"].transform([data["rainfall"]])[0],
-                data["land_size"]
-            ]
+            # Precomputed table first; the forests only for combinations it lacks
+            prediction = crop_lookup.predict(data) if crop_lookup else None
+            if prediction:
+                crop, yield_level = prediction
+            else:
+                # Transform inputs using loaded encoders
+                input_data = [
+                    encoders["location"].transform([data["location"]])[0],
+                    encoders["season"].transform([data["season"]])[0],
+                    encoders["soil_type"].transform([data["soil_type"]])[0],
+                    encoders["irrigation"].transform([data["irrigation"]])[0],
+                    encoders["rainfall"].transform([data["rainfall"]])[0],
+                    data["land_size"]
+                ]
 
-            X = np.array([input_data])
+                X = np.array([input_data])
 
-            crop = crop_model.predict(X)[0]
-            # Check if yield_model predicts a scalar or array
-            yield_pred = yield_model.predict(X)
-            yield_level = yield_pred[0] if len(yield_pred.shape) > 0 else yield_pred
+                crop = str(crop_forest.predict(X)[0])
+                yield_level = str(yield_forest.predict(X)[0])
 
             # Advisory (rule-based)
             fertilizer_map = {
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import CityStaff, ComplaintCategory, Complaint, ComplaintResponse
+from .models import CityStaff, ComplaintCategory, Complaint, ComplaintResponse, SLATarget
 
 @admin.register(CityStaff)
 class CityStaffAdmin(admin.ModelAdmin):
@@ -12,9 +12,14 @@ class ComplaintCategoryAdmin(admin.ModelAdmin):
     list_display = ['name', 'description']
     search_fields = ['name']
 
+@admin.register(SLATarget)
+class SLATargetAdmin(admin.ModelAdmin):
+    list_display = ['category', 'priority', 'hours']
+    list_filter = ['priority']
+
 @admin.register(Complaint)
 class ComplaintAdmin(admin.ModelAdmin):
-    list_display = ['complaint_id', 'citizen', 'category', 'status', 'priority', 'created_at', 'assigned_to']
+    list_display = ['complaint_id', 'citizen', 'category', 'status', 'priority', 'created_at', 'assigned_to', 'due_at', 'escalated_at']
     list_filter = ['status', 'priority', 'category']
     search_fields = ['complaint_id', 'title', 'citizen__username']
     date_hierarchy = 'created_at'
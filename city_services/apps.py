@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class CityServicesConfig(AppConfig):
     name = 'city_services'
+
+    def ready(self):
+        from . import rollup, routing
+        routing.connect_signals()
+        rollup.connect_signals()
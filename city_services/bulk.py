@@ -0,0 +1,105 @@
+"""
+Bulk status transitions for complaints.
+
+Staff close out many complaints at once, e.g. after a field drive. The
+selected rows are locked, the action is applied to every one it applies to
+with one bulk_update, the heatmap rollup is adjusted in the same
+transaction, and the changes go out as one batch of live events.
+Complaints the action does not apply to (already resolved, closed, or
+unchanged) are skipped.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from core import transitions
+from core.events import publish_instances
+
+from . import rollup, sla
+from .routing import OPEN_STATUSES, load_index
+
+ACTIONS = ('resolve', 'close', 'assign', 'set_priority')
+
+
+def _resolve(complaint, value, now):
+    complaint.status = 'resolved'
+    complaint.resolved_at = now
+
+
+def _close(complaint, value, now):
+    complaint.status = 'closed'
+
+
+def _assign(complaint, value, now):
+    complaint.assigned_to = value
+
+
+def _set_priority(complaint, value, now):
+    complaint.priority = value
+
+
+# action -> (applies to complaint, change, fields written)
+_TRANSITIONS = {
+    'resolve': (lambda c, value: c.status in OPEN_STATUSES, _resolve, ['status', 'resolved_at']),
+    'close': (lambda c, value: c.status != 'closed', _close, ['status']),
+    'assign': (lambda c, value: c.status in OPEN_STATUSES and c.assigned_to_id != value.pk, _assign,
+               ['assigned_to']),
+    'set_priority': (lambda c, value: c.status in OPEN_STATUSES and c.priority != value, _set_priority,
+                     ['priority', 'due_at']),
+}
+
+
+def apply(complaints, action, value=None, now=None, actor=None):
+    """
+    Apply a transition to many complaints.
+
+    The complaints are re-read and locked inside the transaction, and the
+    action is checked against those rows, so two staff acting on the same
+    complaints at once never apply a change, its rollup delta or its status
+    transition twice.
+
+    Args:
+        complaints: The selected complaints (only their ids are used)
+        action: One of ACTIONS
+        value: The CityStaff for "assign", the priority for "set_priority"
+        now: Transition time (default: now)
+        actor: The user making the change, for the status history
+
+    Returns:
+        list: The complaints changed
+    """
+    from .models import Complaint
+
+    applies, change, fields = _TRANSITIONS[action]
+    now = now or timezone.now()
+    ids = [complaint.pk for complaint in complaints]
+    targets = sla.load_targets() if action == 'set_priority' else None
+
+    with transaction.atomic():
+        locked = (
+            Complaint.objects.filter(pk__in=ids).select_for_update(of=('self',))
+            .select_related('category', 'citizen', 'assigned_to__user').order_by('pk')
+        )
+        changed = [complaint for complaint in locked if applies(complaint, value)]
+        if not changed:
+            return []
+
+        before = [rollup.snapshot(complaint) for complaint in changed]
+        statuses = [complaint.status for complaint in changed]
+        assignees = [complaint.assigned_to_id for complaint in changed]
+        for complaint in changed:
+            change(complaint, value, now)
+            if targets is not None:
+                # A new priority means a new SLA deadline
+                complaint.due_at = sla.deadline(complaint, targets)
+            complaint.updated_at = now
+
+        Complaint.objects.bulk_update(changed, fields + ['updated_at'])
+        if 'status' in fields:
+            rollup.apply(zip(before, map(rollup.snapshot, changed)))
+            transitions.record('complaint', [(complaint.pk, status, complaint.status)
+                                             for complaint, status in zip(changed, statuses)], actor, now)
+    if action == 'assign':
+        for staff_id in assignees:
+            load_index.move(value.pk, staff_id)
+    publish_instances(changed)
+    return changed
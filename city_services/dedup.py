@@ -0,0 +1,173 @@
+"""
+Near-duplicate detection for complaints.
+
+A complaint is described by a set of features: its normalised location
+tokens plus the words and word pairs of its title and description. A
+MinHash signature of that set is cut into LSH bands and each band hashed to
+a bucket, stored in ComplaintBucket. Two complaints with similar feature
+sets very likely share a bucket, so on create the new complaint's buckets
+are looked up (one indexed query) and only the few complaints found there
+are compared exactly. A match joins the new complaint to the other's
+ComplaintCluster, creating the cluster if needed.
+
+``manage.py rebuild_complaint_clusters`` builds the index for complaints
+filed before it existed.
+"""
+import hashlib
+import re
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .locations import location_tokens
+
+# 16 bands of 4 rows: pairs with a feature Jaccard of 0.5 share a bucket
+# ~65% of the time, at 0.7 ~99%
+BANDS, ROWS = 16, 4
+NUM_HASHES = BANDS * ROWS
+
+# Exact thresholds a candidate must meet to count as the same incident
+TEXT_THRESHOLD = 0.35
+LOCATION_THRESHOLD = 0.5
+
+# Only complaints filed this recently are considered
+WINDOW = timedelta(days=30)
+MAX_CANDIDATES = 20
+
+STOPWORDS = frozenset({
+    'the', 'and', 'for', 'are', 'was', 'has', 'have', 'been', 'this', 'that', 'with', 'from', 'there',
+    'not', 'our', 'near', 'since', 'please', 'very', 'report', 'issue', 'problem', 'days',
+})
+
+_WORD = re.compile(r'[a-z0-9]+')
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, _PRIME, NUM_HASHES, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, NUM_HASHES, dtype=np.uint64)
+
+
+def _hash(value, bits=31):
+    # Stable across processes, unlike hash()
+    digest = int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+    return digest & ((1 << bits) - 1)
+
+
+def text_features(title, description):
+    words = [word for word in _WORD.findall(f'{title} {description}'.lower())
+             if len(word) > 2 and word not in STOPWORDS]
+    return frozenset(words) | frozenset(f'{a} {b}' for a, b in zip(words, words[1:]))
+
+
+def features(complaint):
+    """(location tokens, text features) of a complaint"""
+    return location_tokens(complaint.location), text_features(complaint.title, complaint.description)
+
+
+def signature(location, text):
+    """MinHash signature (NUM_HASHES values) of a feature set"""
+    items = [f'loc:{token}' for token in location] + list(text)
+    if not items:
+        return None
+    x = np.array([_hash(item) for item in items], dtype=np.uint64)
+    return ((np.outer(_A, x) + _B[:, None]) % _PRIME).min(axis=1)
+
+
+def buckets(sig):
+    """One 63-bit bucket key per band; the band number is part of the key"""
+    return [
+        _hash(f'{band}:' + ','.join(map(str, sig[band * ROWS:(band + 1) * ROWS])), bits=63)
+        for band in range(BANDS)
+    ]
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+def is_duplicate(a, b):
+    """Whether two (location tokens, text features) pairs describe the same incident"""
+    return jaccard(a[0], b[0]) >= LOCATION_THRESHOLD and jaccard(a[1], b[1]) >= TEXT_THRESHOLD
+
+
+def find_duplicate(complaint, keys):
+    """
+    The most similar earlier complaint sharing an LSH bucket, if it is a duplicate.
+
+    Args:
+        complaint: The new complaint
+        keys: Its buckets()
+
+    Returns:
+        Complaint or None
+    """
+    from .models import Complaint, ComplaintBucket
+
+    since = (complaint.created_at or timezone.now()) - WINDOW
+    candidate_ids = list(
+        ComplaintBucket.objects.filter(bucket__in=keys, complaint__created_at__gte=since)
+        .exclude(complaint_id=complaint.pk)
+        .values_list('complaint_id').annotate(hits=Count('id')).order_by('-hits')[:MAX_CANDIDATES]
+    )
+    if not candidate_ids:
+        return None
+    mine = features(complaint)
+    best, best_score = None, 0.0
+    candidates = Complaint.objects.filter(id__in=[pk for pk, _ in candidate_ids]).only(
+        'id', 'title', 'description', 'location', 'category_id', 'cluster_id', 'created_at')
+    for candidate in candidates:
+        if complaint.category_id and candidate.category_id and complaint.category_id != candidate.category_id:
+            continue
+        theirs = features(candidate)
+        if not is_duplicate(mine, theirs):
+            continue
+        score = jaccard(mine[1], theirs[1])
+        if score > best_score:
+            best, best_score = candidate, score
+    return best
+
+
+def _published(complaint_id):
+    from core.events import publish_instances
+    from .models import Complaint
+    publish_instances([Complaint.objects.select_related('category', 'citizen', 'assigned_to__user').get(pk=complaint_id)])
+
+
+def index_complaint(complaint, link=True):
+    """
+    Add a saved complaint to the LSH index and, if link, find its cluster.
+
+    Sets ``complaint.cluster_id`` when a duplicate is found; the caller saves
+    it. An unclustered duplicate is put in a new cluster right away.
+
+    Returns:
+        int: The cluster id, or None
+    """
+    from .models import Complaint, ComplaintBucket, ComplaintCluster
+
+    sig = signature(*features(complaint))
+    if sig is None:
+        return None
+    keys = buckets(sig)
+    ComplaintBucket.objects.bulk_create([ComplaintBucket(complaint=complaint, bucket=key) for key in keys])
+    duplicate = find_duplicate(complaint, keys) if link else None
+    if duplicate is None:
+        return None
+
+    now = timezone.now()
+    cluster_id = duplicate.cluster_id
+    if cluster_id is None:
+        with transaction.atomic():
+            cluster_id = ComplaintCluster.objects.create().pk
+            # Conditional, so two copies filed at once do not each open a cluster
+            if Complaint.objects.filter(pk=duplicate.pk, cluster__isnull=True).update(
+                    cluster_id=cluster_id, updated_at=now):
+                transaction.on_commit(lambda: _published(duplicate.pk))
+            else:
+                ComplaintCluster.objects.filter(pk=cluster_id).delete()
+                cluster_id = Complaint.objects.filter(pk=duplicate.pk).values_list('cluster_id', flat=True).get()
+    ComplaintCluster.objects.filter(pk=cluster_id).update(updated_at=now)
+    complaint.cluster_id = cluster_id
+    return cluster_id
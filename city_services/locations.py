@@ -0,0 +1,66 @@
+"""
+Normalisation of free-text complaint locations.
+
+Citizens type locations such as "Street 4, Area B" and staff jurisdictions
+are names such as "Zone B". Both are reduced to sets of lower-case tokens
+without the generic words that every location shares, so they can be
+compared cheaply. area_key() maps a location to the ward or area it lies
+in, the unit complaint heatmaps are aggregated by.
+"""
+import re
+
+# Words that describe the kind of place rather than which place
+GENERIC_AREA_WORDS = frozenset({
+    'area', 'zone', 'ward', 'sector', 'district', 'city', 'street', 'road', 'lane', 'near', 'the', 'of', 'and',
+})
+
+# Words that introduce the name of an administrative area: "Area B", "Ward 12"
+AREA_PREFIXES = ('ward', 'area', 'zone', 'sector', 'block', 'district')
+
+UNKNOWN_AREA = 'unknown'
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+_AREA = re.compile(r'\b(' + '|'.join(AREA_PREFIXES) + r')\W*(?:no\b\W*|number\W+)?([a-z0-9]+)\b')
+
+
+def location_tokens(text):
+    """
+    Tokens identifying a place.
+
+    Args:
+        text: A location or jurisdiction, e.g. ``"Street 4, Area B"``
+
+    Returns:
+        frozenset: e.g. ``{"4", "b"}``
+    """
+    return frozenset(token for token in _TOKEN.findall((text or '').lower()) if token not in GENERIC_AREA_WORDS)
+
+
+def in_jurisdiction(jurisdiction_tokens, location):
+    """Whether every identifying token of a jurisdiction appears in a location's tokens"""
+    return bool(jurisdiction_tokens) and jurisdiction_tokens <= location
+
+
+def area_key(text):
+    """
+    The area a location lies in, as a stable key.
+
+    The first "<area word> <name>" pair wins, e.g. ``"Street 4, Area B"`` ->
+    ``"area-b"``; otherwise the last comma-separated part of the location,
+    e.g. ``"MG Road, Indiranagar"`` -> ``"indiranagar"``.
+
+    Args:
+        text: A free-text location
+
+    Returns:
+        str: Lower-case, hyphen-separated key; UNKNOWN_AREA if text is empty
+    """
+    text = (text or '').lower()
+    match = _AREA.search(text)
+    if match:
+        return f'{match.group(1)}-{match.group(2)}'
+    for part in reversed(text.split(',')):
+        tokens = _TOKEN.findall(part)
+        if tokens:
+            return '-'.join(tokens)[:100]
+    return UNKNOWN_AREA
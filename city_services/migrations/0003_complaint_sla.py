@@ -0,0 +1,81 @@
+# Generated by Django 5.1.5 on 2026-10-19 17:40
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Spelled out rather than calling into city_services.sla, so later changes
+# there cannot change what this migration writes
+OPEN_STATUSES = ('submitted', 'under_review', 'in_progress')
+DEFAULT_SLA_HOURS = {'urgent': 4, 'high': 24, 'medium': 72, 'low': 168}
+
+
+def backfill_deadlines(apps, schema_editor):
+    """due_at for open complaints: created_at plus the category's, then any category's, then the default target"""
+    Complaint = apps.get_model('city_services', 'Complaint')
+    SLATarget = apps.get_model('city_services', 'SLATarget')
+    targets = {(category_id, priority): hours
+               for category_id, priority, hours in SLATarget.objects.values_list('category_id', 'priority', 'hours')}
+    pending = (Complaint.objects.filter(status__in=OPEN_STATUSES, due_at__isnull=True)
+               .only('id', 'created_at', 'category_id', 'priority').order_by('id'))
+    batch = []
+    for complaint in pending.iterator(chunk_size=2000):
+        hours = targets.get((complaint.category_id, complaint.priority), targets.get((None, complaint.priority)))
+        if hours is None:
+            hours = DEFAULT_SLA_HOURS.get(complaint.priority, DEFAULT_SLA_HOURS['medium'])
+        complaint.due_at = complaint.created_at + timedelta(hours=hours)
+        batch.append(complaint)
+        if len(batch) >= 2000:
+            Complaint.objects.bulk_update(batch, ['due_at'])
+            batch = []
+    Complaint.objects.bulk_update(batch, ['due_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('city_services', '0002_complaint_city_servic_updated_c05782_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SLATarget',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('priority', models.CharField(choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High'), ('urgent', 'Urgent')], max_length=20)),
+                ('hours', models.PositiveIntegerField()),
+            ],
+            options={
+                'verbose_name': 'SLA Target',
+                'ordering': ['category__name', 'priority'],
+            },
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='due_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='escalated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['status', 'due_at'], name='city_servic_status_966b2f_idx'),
+        ),
+        migrations.AddField(
+            model_name='slatarget',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sla_targets', to='city_services.complaintcategory'),
+        ),
+        migrations.AddConstraint(
+            model_name='slatarget',
+            constraint=models.UniqueConstraint(fields=('category', 'priority'), name='unique_sla_target'),
+        ),
+        migrations.RunPython(backfill_deadlines, migrations.RunPython.noop),
+    ]
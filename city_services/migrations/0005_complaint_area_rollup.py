@@ -0,0 +1,109 @@
+# Generated by Django 5.1.5 on 2026-10-19 17:45
+
+import re
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+
+
+# A frozen copy of city_services.locations.area_key and of the rollup
+# rebuild as of this migration, so later changes there cannot change what
+# it writes. manage.py rebuild_complaint_rollup recomputes both afterwards.
+UNKNOWN_AREA = 'unknown'
+AREA_PREFIXES = ('ward', 'area', 'zone', 'sector', 'block', 'district')
+TOKEN = re.compile(r'[a-z0-9]+')
+AREA = re.compile(r'\b(' + '|'.join(AREA_PREFIXES) + r')\W*(?:no\b\W*|number\W+)?([a-z0-9]+)\b')
+LOCATED = Q(latitude__isnull=False, longitude__isnull=False)
+
+
+def area_key(text):
+    text = (text or '').lower()
+    match = AREA.search(text)
+    if match:
+        return f'{match.group(1)}-{match.group(2)}'
+    for part in reversed(text.split(',')):
+        tokens = TOKEN.findall(part)
+        if tokens:
+            return '-'.join(tokens)[:100]
+    return UNKNOWN_AREA
+
+
+def fill_rollup(apps, schema_editor):
+    Complaint = apps.get_model('city_services', 'Complaint')
+    ComplaintAreaDaily = apps.get_model('city_services', 'ComplaintAreaDaily')
+
+    batch = []
+    for complaint in Complaint.objects.only('id', 'location', 'area_key').order_by('id').iterator(chunk_size=2000):
+        complaint.area_key = area_key(complaint.location)
+        batch.append(complaint)
+        if len(batch) >= 2000:
+            Complaint.objects.bulk_update(batch, ['area_key'])
+            batch = []
+    Complaint.objects.bulk_update(batch, ['area_key'])
+
+    groups = (
+        Complaint.objects
+        .annotate(day=TruncDate('created_at'))
+        .values('day', 'area_key', 'category_id', 'status')
+        .annotate(
+            n=Count('id'),
+            located=Count('id', filter=LOCATED),
+            latitude_sum=Sum('latitude', filter=LOCATED),
+            longitude_sum=Sum('longitude', filter=LOCATED),
+        )
+        .order_by()
+    )
+    ComplaintAreaDaily.objects.bulk_create([
+        ComplaintAreaDaily(
+            day=group['day'], area_key=group['area_key'] or UNKNOWN_AREA, category_id=group['category_id'],
+            status=group['status'], count=group['n'], located=group['located'],
+            latitude_sum=group['latitude_sum'] or 0.0, longitude_sum=group['longitude_sum'] or 0.0,
+        )
+        for group in groups
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('city_services', '0004_complaint_clusters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='area_key',
+            field=models.CharField(blank=True, db_index=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)]),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)]),
+        ),
+        migrations.CreateModel(
+            name='ComplaintAreaDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('area_key', models.CharField(max_length=100)),
+                ('status', models.CharField(choices=[('submitted', 'Submitted'), ('under_review', 'Under Review'), ('in_progress', 'In Progress'), ('resolved', 'Resolved'), ('closed', 'Closed')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('located', models.IntegerField(default=0)),
+                ('latitude_sum', models.FloatField(default=0)),
+                ('longitude_sum', models.FloatField(default=0)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='city_services.complaintcategory')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'area_key', 'category', 'status'), name='unique_complaint_area_daily')],
+            },
+        ),
+        migrations.RunPython(fill_rollup, migrations.RunPython.noop),
+    ]
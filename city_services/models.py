@@ -1,3 +1,4 @@
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from accounts.models import CustomUser
 
@@ -31,6 +32,18 @@ class ComplaintCategory(models.Model):
         ordering = ['name']
 
 
+class ComplaintCluster(models.Model):
+    """Complaints that describe the same incident, see city_services.dedup"""
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # Last time a complaint joined
+    
+    def __str__(self):
+        return f"Cluster {self.pk}"
+    
+    class Meta:
+        ordering = ['-updated_at']
+
+
 class Complaint(models.Model):
     """Public complaint submissions"""
     
@@ -52,10 +65,14 @@ class Complaint(models.Model):
     citizen = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='complaints')
     category = models.ForeignKey(ComplaintCategory, on_delete=models.SET_NULL, null=True, related_name='complaints')
     assigned_to = models.ForeignKey(CityStaff, on_delete=models.SET_NULL, null=True, blank=True, related_name='assigned_complaints')
+    cluster = models.ForeignKey(ComplaintCluster, on_delete=models.SET_NULL, null=True, blank=True, related_name='complaints')
     
     title = models.CharField(max_length=200)
     description = models.TextField()
     location = models.CharField(max_length=300)
+    area_key = models.CharField(max_length=100, blank=True, db_index=True)  # Derived from location, see city_services.locations
+    latitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
     image = models.ImageField(upload_to='complaints/', blank=True, null=True)
     
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='submitted')
@@ -65,12 +82,58 @@ class Complaint(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     resolved_at = models.DateTimeField(null=True, blank=True)
+    due_at = models.DateTimeField(null=True, blank=True)  # SLA deadline, see city_services.sla
+    escalated_at = models.DateTimeField(null=True, blank=True)
     
     def __str__(self):
         return f"{self.complaint_id} - {self.title}"
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['updated_at', 'id']),  # Delta sync keyset
+            models.Index(fields=['status', 'due_at']),  # SLA breaches
+        ]
+
+
+class SLATarget(models.Model):
+    """Hours allowed to resolve a complaint; a blank category applies to every category"""
+    category = models.ForeignKey(ComplaintCategory, on_delete=models.CASCADE, null=True, blank=True, related_name='sla_targets')
+    priority = models.CharField(max_length=20, choices=Complaint.PRIORITY_CHOICES)
+    hours = models.PositiveIntegerField()
+    
+    def __str__(self):
+        return f"{self.category or 'Any category'} / {self.priority}: {self.hours}h"
+    
+    class Meta:
+        verbose_name = "SLA Target"
+        ordering = ['category__name', 'priority']
+        constraints = [
+            models.UniqueConstraint(fields=['category', 'priority'], name='unique_sla_target'),
+        ]
+
+
+class ComplaintBucket(models.Model):
+    """LSH bucket of a complaint's MinHash signature, one row per band"""
+    complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE, related_name='+')
+    bucket = models.BigIntegerField(db_index=True)
+
+
+class ComplaintAreaDaily(models.Model):
+    """Complaints filed per day, area, category and current status, see city_services.rollup"""
+    day = models.DateField()
+    area_key = models.CharField(max_length=100)
+    category = models.ForeignKey(ComplaintCategory, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    status = models.CharField(max_length=20, choices=Complaint.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+    located = models.IntegerField(default=0)  # Complaints with coordinates
+    latitude_sum = models.FloatField(default=0)
+    longitude_sum = models.FloatField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'area_key', 'category', 'status'], name='unique_complaint_area_daily'),
+        ]
 
 
 class ComplaintResponse(models.Model):
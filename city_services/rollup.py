@@ -0,0 +1,231 @@
+"""
+Complaint heatmap aggregates.
+
+ComplaintAreaDaily holds, per filing day, area, category and current
+status, how many complaints there are and the sums of their coordinates,
+so a heatmap over any date range reads a few hundred rollup rows instead
+of scanning complaints. Rows are kept current incrementally: every saved
+or deleted complaint moves its contribution from its old key to its new
+one. Writes that bypass signals (``bulk_update``, ``QuerySet.update``) of
+status, category, location or coordinates must pass their before/after
+snapshots to ``apply()``; ``manage.py rebuild_complaint_rollup`` recomputes
+the table from scratch.
+
+Each complaint's ``area_key`` is derived from its location on every full save.
+"""
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+from .locations import UNKNOWN_AREA, area_key
+from .routing import OPEN_STATUSES
+
+# Complaint fields a rollup row depends on
+TRACKED_FIELDS = ('created_at', 'area_key', 'category_id', 'status', 'latitude', 'longitude')
+
+_ZERO = (0, 0, 0.0, 0.0)
+_LOCATED = Q(latitude__isnull=False, longitude__isnull=False)
+
+
+def snapshot(values):
+    """
+    A complaint's rollup contribution.
+
+    Args:
+        values: Complaint instance or dict with TRACKED_FIELDS
+
+    Returns:
+        tuple: ``(key, (count, located, latitude, longitude))``, key being
+        ``(day, area_key, category_id, status)``
+    """
+    get = values.get if isinstance(values, dict) else lambda name: getattr(values, name)
+    latitude, longitude = get('latitude'), get('longitude')
+    located = latitude is not None and longitude is not None
+    key = (timezone.localdate(get('created_at')), get('area_key') or UNKNOWN_AREA, get('category_id'), get('status'))
+    return key, (1, int(located), latitude if located else 0.0, longitude if located else 0.0)
+
+
+def apply(changes):
+    """
+    Move complaints' contributions between rollup rows.
+
+    Args:
+        changes: Iterable of (before, after) snapshots; None for a complaint
+            that did not exist before or no longer exists
+    """
+    deltas = defaultdict(lambda: _ZERO)
+    for before, after in changes:
+        for snap, sign in ((before, -1), (after, 1)):
+            if snap is not None:
+                key, measure = snap
+                deltas[key] = tuple(total + sign * value for total, value in zip(deltas[key], measure))
+    for key, delta in deltas.items():
+        if delta[:2] != (0, 0) or delta[2:] != (0.0, 0.0):
+            _write(key, delta)
+
+
+def _write(key, delta):
+    from .models import ComplaintAreaDaily
+
+    day, area, category_id, status = key
+    rows = ComplaintAreaDaily.objects.filter(day=day, area_key=area, category_id=category_id, status=status)
+    changes = {
+        'count': F('count') + delta[0],
+        'located': F('located') + delta[1],
+        'latitude_sum': F('latitude_sum') + delta[2],
+        'longitude_sum': F('longitude_sum') + delta[3],
+    }
+    if rows.update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            ComplaintAreaDaily.objects.create(
+                day=day, area_key=area, category_id=category_id, status=status, count=delta[0],
+                located=delta[1], latitude_sum=delta[2], longitude_sum=delta[3],
+            )
+    except IntegrityError:
+        # Created concurrently since the update above
+        rows.update(**changes)
+
+
+def backfill_area_keys(complaint_model, batch_size=2000):
+    """Derive area_key for every complaint; returns the number of complaints updated"""
+    complaints = complaint_model.objects.only('id', 'location', 'area_key').order_by('id')
+    batch, written = [], 0
+    for complaint in complaints.iterator(chunk_size=batch_size):
+        key = area_key(complaint.location)
+        if complaint.area_key != key:
+            complaint.area_key = key
+            batch.append(complaint)
+        if len(batch) >= batch_size:
+            complaint_model.objects.bulk_update(batch, ['area_key'])
+            written, batch = written + len(batch), []
+    if batch:
+        complaint_model.objects.bulk_update(batch, ['area_key'])
+        written += len(batch)
+    return written
+
+
+def rebuild(complaint_model, rollup_model):
+    """
+    Recompute every rollup row.
+
+    Takes the models as arguments so migrations can pass historical models.
+
+    Returns:
+        int: Rollup rows written
+    """
+    groups = (
+        complaint_model.objects
+        .annotate(day=TruncDate('created_at'))
+        .values('day', 'area_key', 'category_id', 'status')
+        .annotate(
+            n=Count('id'),
+            located=Count('id', filter=_LOCATED),
+            latitude_sum=Sum('latitude', filter=_LOCATED),
+            longitude_sum=Sum('longitude', filter=_LOCATED),
+        )
+        .order_by()
+    )
+    rows = [
+        rollup_model(
+            day=group['day'], area_key=group['area_key'] or UNKNOWN_AREA, category_id=group['category_id'],
+            status=group['status'], count=group['n'], located=group['located'],
+            latitude_sum=group['latitude_sum'] or 0.0, longitude_sum=group['longitude_sum'] or 0.0,
+        )
+        for group in groups
+    ]
+    with transaction.atomic():
+        rollup_model.objects.all().delete()
+        rollup_model.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def heatmap(start, end, category_id=None, status=None):
+    """
+    Complaint counts per area for complaints filed between two dates.
+
+    Args:
+        start: First day, inclusive
+        end: Last day, inclusive
+        category_id: Only this category
+        status: Only this status, or "open" for any OPEN_STATUSES
+
+    Returns:
+        list: One dict per area, busiest first, with total, open,
+        by_status, by_category and the mean latitude/longitude of the
+        complaints that have coordinates (None if none do)
+    """
+    from .models import ComplaintAreaDaily
+
+    rows = ComplaintAreaDaily.objects.filter(day__range=(start, end), count__gt=0)
+    if category_id is not None:
+        rows = rows.filter(category_id=category_id)
+    if status == 'open':
+        rows = rows.filter(status__in=OPEN_STATUSES)
+    elif status:
+        rows = rows.filter(status=status)
+    rows = (
+        rows.values('area_key', 'category__name', 'status')
+        .annotate(n=Sum('count'), located=Sum('located'), latitude=Sum('latitude_sum'),
+                  longitude=Sum('longitude_sum'))
+        .order_by()
+    )
+
+    areas = {}
+    for row in rows:
+        area = areas.setdefault(row['area_key'], {
+            'area_key': row['area_key'], 'total': 0, 'open': 0, 'by_status': defaultdict(int),
+            'by_category': defaultdict(int), 'located': 0, 'latitude': 0.0, 'longitude': 0.0,
+        })
+        area['total'] += row['n']
+        if row['status'] in OPEN_STATUSES:
+            area['open'] += row['n']
+        area['by_status'][row['status']] += row['n']
+        area['by_category'][row['category__name'] or 'Uncategorized'] += row['n']
+        area['located'] += row['located']
+        area['latitude'] += row['latitude']
+        area['longitude'] += row['longitude']
+
+    result = []
+    for area in sorted(areas.values(), key=lambda a: (-a['total'], a['area_key'])):
+        located = area.pop('located')
+        area['latitude'] = round(area['latitude'] / located, 6) if located else None
+        area['longitude'] = round(area['longitude'] / located, 6) if located else None
+        area['by_status'] = dict(area['by_status'])
+        area['by_category'] = dict(area['by_category'])
+        result.append(area)
+    return result
+
+
+def _complaint_saving(sender, instance, update_fields=None, **kwargs):
+    # Partial saves (update_fields) leave area_key alone; none of them touch location
+    if update_fields is None:
+        instance.area_key = area_key(instance.location)
+    instance._rollup_before = None
+    if instance.pk and (update_fields is None
+                        or set(update_fields) & {'status', 'category', 'latitude', 'longitude'}):
+        before = sender.objects.filter(pk=instance.pk).values(*TRACKED_FIELDS).first()
+        instance._rollup_before = snapshot(before) if before else None
+
+
+def _complaint_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        apply([(None, snapshot(instance))])
+    elif instance._rollup_before is not None:
+        apply([(instance._rollup_before, snapshot(instance))])
+
+
+def _complaint_deleted(sender, instance, **kwargs):
+    apply([(snapshot(instance), None)])
+
+
+def connect_signals():
+    from .models import Complaint
+    pre_save.connect(_complaint_saving, sender=Complaint, dispatch_uid='rollup-complaint-presave')
+    post_save.connect(_complaint_saved, sender=Complaint, dispatch_uid='rollup-complaint-save')
+    post_delete.connect(_complaint_deleted, sender=Complaint, dispatch_uid='rollup-complaint-delete')
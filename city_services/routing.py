@@ -0,0 +1,134 @@
+"""
+Automatic assignment of complaints to city staff.
+
+A complaint goes to the staff member who suits it best: one whose
+department is the complaint's category and whose jurisdiction covers its
+location, failing that one matching either, failing that anyone. Among
+equally suitable staff the one with the fewest open complaints wins.
+
+Open-complaint counts live in an in-memory LoadIndex, so choosing an
+assignee costs no queries. The index is re-read from the database (two
+queries) every REFRESH_SECONDS and bumped locally on each assignment in
+between, which bounds the drift caused by other worker processes.
+``manage.py rebalance_complaints`` assigns any backlog and evens out queues.
+"""
+import threading
+import time
+
+from django.db.models import Count
+from django.db.models.signals import post_delete, post_save
+
+from .locations import in_jurisdiction, location_tokens
+
+# Statuses that still need work from the assignee
+OPEN_STATUSES = ('submitted', 'under_review', 'in_progress')
+
+REFRESH_SECONDS = 60
+
+
+class LoadIndex:
+    """Staff profiles and their open-complaint counts, kept in memory"""
+
+    def __init__(self, max_age=REFRESH_SECONDS):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._staff = {}  # id -> (department, jurisdiction tokens)
+        self._load = {}  # id -> open complaints
+        self._loaded_at = None
+
+    def refresh(self):
+        """Reload staff and their open counts from the database"""
+        from .models import CityStaff, Complaint
+        staff = {
+            pk: (department.strip().lower(), location_tokens(jurisdiction))
+            for pk, department, jurisdiction in CityStaff.objects.values_list('id', 'department', 'jurisdiction')
+        }
+        load = dict(
+            Complaint.objects.filter(assigned_to__isnull=False, status__in=OPEN_STATUSES)
+            .values_list('assigned_to').annotate(open=Count('id')).order_by()
+        )
+        with self._lock:
+            self._staff = staff
+            self._load = {pk: load.get(pk, 0) for pk in staff}
+            self._loaded_at = time.monotonic()
+
+    def expire(self):
+        """Force a reload before the next choice"""
+        self._loaded_at = None
+
+    def _ensure_fresh(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.max_age:
+            self.refresh()
+
+    def load(self, staff_id):
+        return self._load.get(staff_id, 0)
+
+    def match(self, staff_id, department, tokens):
+        """Suitability 0-3: 2 for the department, 1 for the jurisdiction"""
+        if staff_id not in self._staff:
+            return -1
+        staff_department, area = self._staff[staff_id]
+        return 2 * (staff_department == department) + in_jurisdiction(area, tokens)
+
+    def choose(self, department, location, exclude=None):
+        """
+        Best assignee for a complaint.
+
+        Args:
+            department: The complaint's category name
+            location: The complaint's free-text location
+            exclude: Staff id to leave out, e.g. the current assignee
+
+        Returns:
+            int: CityStaff id, or None if there are no staff
+        """
+        self._ensure_fresh()
+        department = (department or '').strip().lower()
+        tokens = location_tokens(location)
+        with self._lock:
+            ranked = (
+                (-self.match(pk, department, tokens), self._load[pk], pk)
+                for pk in self._staff if pk != exclude
+            )
+            best = min(ranked, default=None)
+        return best[2] if best else None
+
+    def move(self, staff_id, previous=None):
+        """Count one more open complaint for staff_id (and one fewer for previous)"""
+        with self._lock:
+            if staff_id in self._load:
+                self._load[staff_id] += 1
+            if previous in self._load:
+                self._load[previous] -= 1
+
+    def assign(self, department, location):
+        """choose() and count the complaint against the chosen staff member"""
+        staff_id = self.choose(department, location)
+        if staff_id is not None:
+            self.move(staff_id)
+        return staff_id
+
+
+load_index = LoadIndex()
+
+
+def assign_complaint(complaint):
+    """
+    Set ``assigned_to`` on a new complaint; the caller saves it.
+
+    Returns:
+        int: The CityStaff id, or None if there are no staff
+    """
+    department = complaint.category.name if complaint.category else ''
+    complaint.assigned_to_id = load_index.assign(department, complaint.location)
+    return complaint.assigned_to_id
+
+
+def _staff_changed(sender, **kwargs):
+    load_index.expire()
+
+
+def connect_signals():
+    from .models import CityStaff
+    post_save.connect(_staff_changed, sender=CityStaff, dispatch_uid='routing-citystaff-save')
+    post_delete.connect(_staff_changed, sender=CityStaff, dispatch_uid='routing-citystaff-delete')
@@ -1,7 +1,9 @@
 from rest_framework import serializers
-from .models import CityStaff, ComplaintCategory, Complaint, ComplaintResponse
+from .models import CityStaff, ComplaintCategory, Complaint, ComplaintCluster, ComplaintResponse
+from core.mixins import DynamicFieldsMixin
+from core.thumbnails import get_thumbnail_url
 
-class CityStaffSerializer(serializers.ModelSerializer):
+class CityStaffSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user_details = serializers.SerializerMethodField()
     
     class Meta:
@@ -15,12 +17,12 @@ class CityStaffSerializer(serializers.ModelSerializer):
             'email': obj.user.email
         }
 
-class ComplaintCategorySerializer(serializers.ModelSerializer):
+class ComplaintCategorySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ComplaintCategory
         fields = '__all__'
 
-class ComplaintResponseSerializer(serializers.ModelSerializer):
+class ComplaintResponseSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     staff_name = serializers.CharField(source='staff.user.get_full_name', read_only=True)
     
     class Meta:
@@ -28,19 +30,41 @@ class ComplaintResponseSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ['created_at', 'staff', 'complaint']
 
-class ComplaintSerializer(serializers.ModelSerializer):
+class ComplaintSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     responses = ComplaintResponseSerializer(many=True, read_only=True)
     category_name = serializers.CharField(source='category.name', read_only=True)
     citizen_name = serializers.CharField(source='citizen.get_full_name', read_only=True)
     priority_display = serializers.CharField(source='get_priority_display', read_only=True)
+    assigned_to_name = serializers.CharField(source='assigned_to.user.get_full_name', read_only=True)
+    assigned_to_username = serializers.CharField(source='assigned_to.user.username', read_only=True)
+    image_thumbnail = serializers.SerializerMethodField()
     
     class Meta:
         model = Complaint
         fields = '__all__'
-        read_only_fields = ['complaint_id', 'created_at', 'updated_at', 'citizen', 'priority']
+        read_only_fields = ['complaint_id', 'created_at', 'updated_at', 'citizen', 'priority', 'due_at', 'escalated_at', 'cluster', 'area_key']
+        expandable_fields = ['responses']
+    
+    def get_image_thumbnail(self, obj):
+        return get_thumbnail_url(obj.image, self.context.get('request'))
     
     def create(self, validated_data):
         # Generate unique complaint ID
         import uuid
         validated_data['complaint_id'] = f"CMP-{uuid.uuid4().hex[:8].upper()}"
         return super().create(validated_data)
+
+class ComplaintClusterSerializer(serializers.ModelSerializer):
+    size = serializers.IntegerField(read_only=True)
+    open_count = serializers.IntegerField(read_only=True)
+    complaints = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ComplaintCluster
+        fields = ['id', 'size', 'open_count', 'created_at', 'updated_at', 'complaints']
+    
+    def get_complaints(self, obj):
+        # Members as list cards, oldest (the original report) first
+        from .views import ComplaintViewSet
+        return ComplaintSerializer(obj.complaints.all(), many=True, fields=ComplaintViewSet.compact_fields,
+                                   context=self.context).data
@@ -0,0 +1,187 @@
+"""
+Service-level deadlines and escalation for complaints.
+
+Every complaint gets a ``due_at`` when it is filed: its creation time plus
+the SLATarget hours for its category and priority, falling back to a target
+for any category and then to DEFAULT_SLA_HOURS.
+
+SLAScheduler keeps the deadlines of open complaints in a min-heap, so each
+tick only pops the complaints that have come due (O(log n) each) instead of
+re-scanning the table. It learns about new and changed complaints through
+the delta-sync keyset on (updated_at, id), which reads only the rows
+written since the previous tick. Entries for complaints that were resolved,
+escalated or given a new deadline are skipped when they surface (lazy
+deletion). ``manage.py escalate_complaints`` runs the scheduler.
+"""
+import heapq
+from datetime import timedelta
+
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .routing import OPEN_STATUSES
+
+DEFAULT_SLA_HOURS = {'urgent': 4, 'high': 24, 'medium': 72, 'low': 168}
+
+PRIORITY_ORDER = ('low', 'medium', 'high', 'urgent')
+
+# Re-read this far behind the newest change seen, so a transaction that
+# committed late with an older updated_at is not missed
+POLL_OVERLAP = timedelta(seconds=60)
+
+
+def load_targets(target_model=None):
+    """{(category_id or None, priority): hours} from the SLATarget table"""
+    if target_model is None:
+        from .models import SLATarget as target_model
+    return {(category_id, priority): hours
+            for category_id, priority, hours in target_model.objects.values_list('category_id', 'priority', 'hours')}
+
+
+def target_hours(category_id, priority, targets):
+    for key in ((category_id, priority), (None, priority)):
+        if key in targets:
+            return targets[key]
+    return DEFAULT_SLA_HOURS.get(priority, DEFAULT_SLA_HOURS['medium'])
+
+
+def deadline(complaint, targets=None):
+    """
+    When a complaint must be resolved by.
+
+    Args:
+        complaint: A saved Complaint
+        targets: load_targets() result, to share one query across many complaints
+
+    Returns:
+        datetime
+    """
+    if targets is None:
+        targets = load_targets()
+    return complaint.created_at + timedelta(hours=target_hours(complaint.category_id, complaint.priority, targets))
+
+
+def raised(priority):
+    """The next priority up, capped at urgent"""
+    index = PRIORITY_ORDER.index(priority) if priority in PRIORITY_ORDER else 1
+    return PRIORITY_ORDER[min(index + 1, len(PRIORITY_ORDER) - 1)]
+
+
+class SLAScheduler:
+    """Deadlines of open, unescalated complaints, earliest first"""
+
+    def __init__(self):
+        self._heap = []  # (due_at, complaint id)
+        self._due = {}  # complaint id -> current due_at; heap entries that disagree are stale
+        self._cursor = None
+
+    def __len__(self):
+        return len(self._due)
+
+    def _apply(self, rows):
+        for pk, due_at, status, escalated_at, updated_at in rows:
+            if status in OPEN_STATUSES and escalated_at is None and due_at is not None:
+                if self._due.get(pk) != due_at:
+                    self._due[pk] = due_at
+                    heapq.heappush(self._heap, (due_at, pk))
+            else:
+                self._due.pop(pk, None)
+            if self._cursor is None or updated_at > self._cursor:
+                self._cursor = updated_at
+
+    def poll(self):
+        """Pick up complaints written since the last poll (all open ones on the first call)"""
+        from .models import Complaint
+        columns = ('id', 'due_at', 'status', 'escalated_at', 'updated_at')
+        if self._cursor is None:
+            rows = Complaint.objects.filter(status__in=OPEN_STATUSES, escalated_at__isnull=True,
+                                            due_at__isnull=False)
+            # An empty table still needs a starting point for the next poll
+            self._cursor = timezone.now() - POLL_OVERLAP
+        else:
+            rows = Complaint.objects.filter(updated_at__gte=self._cursor - POLL_OVERLAP)
+        self._apply(rows.order_by('updated_at', 'id').values_list(*columns).iterator(chunk_size=2000))
+
+    def pop_due(self, now):
+        """Ids of complaints whose deadline is at or before now, removing them from the schedule"""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due_at, pk = heapq.heappop(self._heap)
+            if self._due.get(pk) == due_at:
+                del self._due[pk]
+                due.append(pk)
+        return due
+
+
+def escalate(complaint_ids, now=None, overdue_only=True):
+    """
+    Escalate complaints: stamp ``escalated_at`` and raise their priority one level.
+
+    Args:
+        complaint_ids: Complaint ids
+        now: Escalation time; defaults to the current time
+        overdue_only: Skip complaints that are not past due_at (the scheduler's
+            view may be a tick behind a resolution or a new deadline)
+
+    Returns:
+        list: The escalated Complaint instances
+    """
+    from core.events import publish_instances
+    from .models import Complaint
+
+    now = now or timezone.now()
+    complaints = Complaint.objects.filter(id__in=complaint_ids, status__in=OPEN_STATUSES,
+                                          escalated_at__isnull=True)
+    if overdue_only:
+        complaints = complaints.filter(due_at__lte=now)
+    complaints = list(complaints.select_related('category', 'citizen', 'assigned_to__user'))
+    for complaint in complaints:
+        complaint.priority = raised(complaint.priority)
+        complaint.escalated_at = now
+        # bulk_update() skips auto_now; delta sync needs the new stamp
+        complaint.updated_at = now
+    if complaints:
+        Complaint.objects.bulk_update(complaints, ['priority', 'escalated_at', 'updated_at'])
+        publish_instances(complaints)
+    return complaints
+
+
+def staff_metrics(now=None):
+    """
+    SLA performance per assignee.
+
+    Returns:
+        list: One dict per staff member with open, breached (open and past
+        due), escalated, resolved and resolved_late counts, most breaches first
+    """
+    from .models import Complaint
+
+    now = now or timezone.now()
+    is_open = Q(status__in=OPEN_STATUSES)
+    rows = (
+        Complaint.objects.filter(assigned_to__isnull=False)
+        .values('assigned_to', 'assigned_to__user__username', 'assigned_to__user__first_name',
+                'assigned_to__user__last_name', 'assigned_to__department')
+        .annotate(
+            open=Count('id', filter=is_open),
+            breached=Count('id', filter=is_open & Q(due_at__lt=now)),
+            escalated=Count('id', filter=Q(escalated_at__isnull=False)),
+            resolved=Count('id', filter=Q(resolved_at__isnull=False)),
+            resolved_late=Count('id', filter=Q(resolved_at__gt=F('due_at'))),
+        )
+        .order_by('-breached', '-open', 'assigned_to')
+    )
+    return [
+        {
+            'staff_id': row['assigned_to'],
+            'username': row['assigned_to__user__username'],
+            'name': f"{row['assigned_to__user__first_name']} {row['assigned_to__user__last_name']}".strip(),
+            'department': row['assigned_to__department'],
+            'open': row['open'],
+            'breached': row['breached'],
+            'escalated': row['escalated'],
+            'resolved': row['resolved'],
+            'resolved_late': row['resolved_late'],
+        }
+        for row in rows
+    ]
@@ -0,0 +1,84 @@
+"""
+Staff dashboard figures.
+
+All figures come from one conditional-aggregation query over complaints:
+city-wide counts, the month's resolutions and response times, and the
+requesting staff member's own workload.
+"""
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from core.stats import cached, hours, month_start
+
+from .routing import OPEN_STATUSES
+
+
+def compute(user=None, now=None):
+    """
+    Dashboard figures for a staff member.
+
+    Args:
+        user: Staff user whose own assignments are reported under "mine"
+        now: Reference time (default: now)
+
+    Returns:
+        dict: pending_complaints, under_review, in_progress, open,
+        sla_breached, filed_this_month, resolved_this_month,
+        avg_response_hours (filing to first staff response, complaints
+        filed this month), avg_resolution_hours (complaints resolved this
+        month) and mine (assigned_open, breached, escalated,
+        resolved_this_month, avg_resolution_hours)
+    """
+    from .models import Complaint, ComplaintResponse
+
+    now = now or timezone.now()
+    since = month_start(now)
+    is_open = Q(status__in=OPEN_STATUSES)
+    breached = is_open & Q(due_at__lt=now)
+    resolved = Q(resolved_at__gte=since)
+    mine = Q(assigned_to__user=user) if user is not None else Q(pk__in=[])
+    first_response = Subquery(
+        ComplaintResponse.objects.filter(complaint=OuterRef('pk')).order_by('created_at').values('created_at')[:1]
+    )
+    response_time = ExpressionWrapper(first_response - F('created_at'), output_field=DurationField())
+    resolution_time = ExpressionWrapper(F('resolved_at') - F('created_at'), output_field=DurationField())
+
+    row = Complaint.objects.aggregate(
+        pending_complaints=Count('id', filter=Q(status='submitted')),
+        under_review=Count('id', filter=Q(status='under_review')),
+        in_progress=Count('id', filter=Q(status='in_progress')),
+        open=Count('id', filter=is_open),
+        sla_breached=Count('id', filter=breached),
+        filed_this_month=Count('id', filter=Q(created_at__gte=since)),
+        resolved_this_month=Count('id', filter=resolved),
+        avg_response=Avg(response_time, filter=Q(created_at__gte=since)),
+        avg_resolution=Avg(resolution_time, filter=resolved),
+        mine_open=Count('id', filter=mine & is_open),
+        mine_breached=Count('id', filter=mine & breached),
+        mine_escalated=Count('id', filter=mine & is_open & Q(escalated_at__isnull=False)),
+        mine_resolved=Count('id', filter=mine & resolved),
+        mine_resolution=Avg(resolution_time, filter=mine & resolved),
+    )
+    return {
+        'pending_complaints': row['pending_complaints'],
+        'under_review': row['under_review'],
+        'in_progress': row['in_progress'],
+        'open': row['open'],
+        'sla_breached': row['sla_breached'],
+        'filed_this_month': row['filed_this_month'],
+        'resolved_this_month': row['resolved_this_month'],
+        'avg_response_hours': hours(row['avg_response']),
+        'avg_resolution_hours': hours(row['avg_resolution']),
+        'mine': {
+            'assigned_open': row['mine_open'],
+            'breached': row['mine_breached'],
+            'escalated': row['mine_escalated'],
+            'resolved_this_month': row['mine_resolved'],
+            'avg_resolution_hours': hours(row['mine_resolution']),
+        },
+    }
+
+
+def dashboard_stats(user):
+    """compute() for a user, cached for core.stats.STATS_TTL seconds"""
+    return cached('city', user, compute)
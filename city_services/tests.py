@@ -1,3 +1,223 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import CustomUser
+from core.models import PushEvent, StatusTransition
+
+from . import bulk, dedup, rollup, sla, stats
+from .routing import LoadIndex
+from .models import CityStaff, Complaint, ComplaintAreaDaily, ComplaintCategory, ComplaintResponse
+
+
+class CityTestCase(TestCase):
+
+    def setUp(self):
+        self.citizen = CustomUser.objects.create_user(username='cit', password='pw123456xx', role='citizen')
+        staff_user = CustomUser.objects.create_user(username='staff', password='pw123456xx', role='city_staff',
+                                                    is_approved=True)
+        self.staff = CityStaff.objects.create(user=staff_user, department='Roads', designation='Engineer',
+                                              employee_id='C1', jurisdiction='Zone A')
+        self.roads = ComplaintCategory.objects.create(name='Roads', description='r')
+        self.client = APIClient()
+        self.client.force_authenticate(staff_user)
+
+    def complaint(self, location='Street 1, Area A', **fields):
+        fields = {'category': self.roads, 'title': 'Pothole', 'description': 'Deep pothole', **fields}
+        return Complaint.objects.create(citizen=self.citizen, location=location,
+                                        complaint_id=f'CMP-{Complaint.objects.count() + 1}', **fields)
+
+
+def rollup_rows():
+    rows = ComplaintAreaDaily.objects.filter(count__gt=0).values_list(
+        'day', 'area_key', 'category_id', 'status', 'count', 'located', 'latitude_sum', 'longitude_sum')
+    # Coordinate sums built by deltas differ from a fresh SUM in the last bits
+    return sorted((*row[:6], round(row[6], 6), round(row[7], 6)) for row in rows)
+
+
+class HeatmapRollupTests(CityTestCase):
+
+    def test_incremental_rollup_matches_a_rebuild(self):
+        first = self.complaint(latitude=12.9, longitude=77.6)
+        second = self.complaint(location='Lane 3, Area B')
+        self.complaint(latitude=13.1, longitude=77.8)
+        first.status = 'resolved'
+        first.save()
+        second.location = 'Area C'
+        second.save()
+        self.complaint().delete()
+
+        incremental = rollup_rows()
+        rollup.rebuild(Complaint, ComplaintAreaDaily)
+        self.assertEqual(incremental, rollup_rows())
+        self.assertEqual(sum(row[4] for row in incremental), 3)
+
+    def test_impossible_dates_are_rejected(self):
+        response = self.client.get('/api/city/heatmap/', {'from': '2024-02-30'})
+        self.assertEqual(response.status_code, 400)
+
+
+class SLASchedulerTests(CityTestCase):
+
+    def test_pops_due_complaints_earliest_first(self):
+        now = timezone.now()
+        late = self.complaint(due_at=now - timedelta(hours=1))
+        early = self.complaint(due_at=now - timedelta(hours=3))
+        self.complaint(due_at=now + timedelta(hours=1))
+        scheduler = sla.SLAScheduler()
+        scheduler.poll()
+        self.assertEqual(len(scheduler), 3)
+        self.assertEqual(scheduler.pop_due(now), [early.id, late.id])
+        self.assertEqual(scheduler.pop_due(now), [])
+        self.assertEqual(len(scheduler), 1)
+
+    def test_stale_entries_are_skipped(self):
+        now = timezone.now()
+        resolved = self.complaint(due_at=now - timedelta(hours=2))
+        moved = self.complaint(due_at=now - timedelta(hours=1))
+        scheduler = sla.SLAScheduler()
+        scheduler.poll()
+        resolved.status = 'resolved'
+        resolved.save()
+        moved.due_at = now + timedelta(hours=1)
+        moved.save()
+        scheduler.poll()
+        self.assertEqual(scheduler.pop_due(now), [])
+        self.assertEqual(scheduler.pop_due(now + timedelta(hours=2)), [moved.id])
+
+
+class DuplicateClusteringTests(CityTestCase):
+
+    def filed(self, title, description, location, category=None):
+        complaint = self.complaint(location, title=title, description=description, category=category or self.roads)
+        if dedup.index_complaint(complaint):
+            complaint.save(update_fields=['cluster'])
+        return complaint
+
+    def test_near_duplicates_share_a_cluster(self):
+        text = 'Large pothole on main road causing accidents near the bus stop'
+        first = self.filed('Pothole on main road', text, 'MG Road, Indiranagar')
+        second = self.filed('Pothole on the main road', text + ' again', 'MG Road, Indiranagar')
+        third = self.filed('Pothole on main road', text, 'MG Road, Indiranagar')
+        elsewhere = self.filed('Streetlight broken', 'Streetlight out for a week on the corner', 'Park Street, Jayanagar')
+        water = ComplaintCategory.objects.create(name='Water', description='w')
+        other_category = self.filed('Pothole on main road', text, 'MG Road, Indiranagar', category=water)
+
+        first.refresh_from_db()
+        self.assertIsNotNone(first.cluster_id)
+        self.assertEqual({first.cluster_id}, {second.cluster_id, third.cluster_id})
+        self.assertIsNone(elsewhere.cluster_id)
+        self.assertIsNone(other_category.cluster_id)
+
+
+class BulkTransitionTests(CityTestCase):
+
+    def test_skips_complaints_the_action_does_not_apply_to(self):
+        open_ = self.complaint()
+        resolved = self.complaint(status='resolved')
+        closed = self.complaint(status='closed')
+        response = self.client.post('/api/city/complaints/bulk/', {
+            'action': 'resolve', 'ids': [open_.id, resolved.id, closed.id]}, format='json')
+        self.assertEqual(response.json(), {'updated': [open_.id], 'skipped': [resolved.id, closed.id]})
+
+        self.assertEqual(bulk.apply([open_, closed], 'set_priority', 'urgent'), [])
+        self.assertEqual([c.pk for c in bulk.apply([open_, resolved, closed], 'close')], [open_.id, resolved.id])
+
+    def test_stale_selections_are_not_applied_twice(self):
+        complaints = [self.complaint(), self.complaint()]
+        self.assertEqual(len(bulk.apply(complaints, 'resolve')), 2)
+        # The same in-memory objects still say "submitted"
+        self.assertEqual(bulk.apply(complaints, 'resolve'), [])
+        self.assertEqual(StatusTransition.objects.filter(to_status='resolved').count(), 2)
+        incremental = rollup_rows()
+        rollup.rebuild(Complaint, ComplaintAreaDaily)
+        self.assertEqual(incremental, rollup_rows())
+
+
+class RoutingTests(CityTestCase):
+
+    def add_staff(self, name, department, jurisdiction):
+        user = CustomUser.objects.create_user(username=name, password='pw123456xx', role='city_staff',
+                                              is_approved=True)
+        return CityStaff.objects.create(user=user, department=department, designation='Engineer',
+                                        employee_id=name, jurisdiction=jurisdiction)
+
+    def choose(self, location, department='Roads'):
+        index = LoadIndex()
+        return index.choose(department, location)
+
+    def test_department_and_jurisdiction_both_count(self):
+        zone_b = self.add_staff('roads_b', 'Roads', 'Zone B')
+        water_a = self.add_staff('water_a', 'Water', 'Zone A')
+        self.assertEqual(self.choose('Street 4, Zone B'), zone_b.id)
+        # self.staff is Roads in Zone A: department and jurisdiction beat either alone
+        self.assertEqual(self.choose('Street 4, Zone A'), self.staff.id)
+        self.assertEqual(self.choose('Street 4, Zone A', department='Water'), water_a.id)
+
+    def test_least_loaded_of_equally_suitable_staff_wins(self):
+        twin = self.add_staff('roads_a2', 'Roads', 'Zone A')
+        self.complaint(assigned_to=self.staff)
+        self.assertEqual(self.choose('Street 1, Zone A'), twin.id)
+
+    def test_falls_back_to_anyone_and_to_unassigned_without_staff(self):
+        self.assertEqual(self.choose('Somewhere else', department='Parks'), self.staff.id)
+        CityStaff.objects.all().delete()
+        self.assertIsNone(self.choose('Street 1, Zone A'))
+
+    def test_rebalance_moves_queued_work_off_an_overloaded_member(self):
+        complaints = [self.complaint(location='Street 1, Zone A', assigned_to=self.staff) for _ in range(6)]
+        twin = self.add_staff('roads_a2', 'Roads', 'Zone A')
+        call_command('rebalance_complaints', reassign=True, slack=1, stdout=StringIO())
+
+        moved = Complaint.objects.filter(assigned_to=twin)
+        self.assertEqual(moved.count(), 3)
+        # The newest move, so the oldest keep their place in the queue
+        self.assertEqual(set(moved.values_list('id', flat=True)), {c.id for c in complaints[3:]})
+        for complaint in moved:
+            self.assertGreater(complaint.updated_at, complaints[-1].updated_at)
+        published = PushEvent.objects.filter(topic='complaint', action='updated', role='city_staff')
+        self.assertEqual(sorted(published.values_list('object_id', flat=True)), sorted(c.id for c in moved))
+
+
+class DashboardStatsTests(CityTestCase):
+
+    def test_figures(self):
+        now = datetime(2026, 10, 15, 12, tzinfo=dt_timezone.utc)
+        filed = now - timedelta(hours=10)
+        breached = self.complaint(assigned_to=self.staff, due_at=now - timedelta(hours=1))
+        self.complaint(status='under_review', due_at=now + timedelta(hours=5))
+        self.complaint(status='in_progress', assigned_to=self.staff, escalated_at=now, due_at=now + timedelta(hours=5))
+        resolved = self.complaint(status='resolved', assigned_to=self.staff)
+        last_month = self.complaint(status='closed', assigned_to=self.staff)
+        Complaint.objects.update(created_at=filed)
+        Complaint.objects.filter(pk=resolved.pk).update(resolved_at=filed + timedelta(hours=4))
+        Complaint.objects.filter(pk=last_month.pk).update(created_at=now - timedelta(days=40),
+                                                          resolved_at=now - timedelta(days=39))
+        for complaint, hours in ((breached, 2), (resolved, 4)):
+            response = ComplaintResponse.objects.create(complaint=complaint, staff=self.staff, message='On it')
+            ComplaintResponse.objects.filter(pk=response.pk).update(created_at=filed + timedelta(hours=hours))
 
-# Create your tests here.
+        self.assertEqual(stats.compute(self.staff.user, now), {
+            'pending_complaints': 1,
+            'under_review': 1,
+            'in_progress': 1,
+            'open': 3,
+            'sla_breached': 1,
+            'filed_this_month': 4,
+            'resolved_this_month': 1,
+            'avg_response_hours': 3.0,
+            'avg_resolution_hours': 4.0,
+            'mine': {
+                'assigned_open': 2,
+                'breached': 1,
+                'escalated': 1,
+                'resolved_this_month': 1,
+                'avg_resolution_hours': 4.0,
+            },
+        })
+        # Another staff member's "mine" is empty
+        self.assertEqual(stats.compute(self.citizen, now)['mine']['assigned_open'], 0)
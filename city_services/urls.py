@@ -5,9 +5,12 @@ from . import views
 router = DefaultRouter()
 router.register('categories', views.ComplaintCategoryViewSet, basename='complaint-category')
 router.register('complaints', views.ComplaintViewSet, basename='complaint')
+router.register('clusters', views.ComplaintClusterViewSet, basename='complaint-cluster')
 router.register('responses', views.ComplaintResponseViewSet, basename='complaint-response')
 
 urlpatterns = [
     path('stats/', views.dashboard_stats, name='dashboard-stats'),
+    path('sla/', views.sla_metrics, name='sla-metrics'),
+    path('heatmap/', views.heatmap, name='complaint-heatmap'),
     path('', include(router.urls)),
 ]
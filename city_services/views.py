@@ -2,26 +2,42 @@ from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action, api_view
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from .models import CityStaff, ComplaintCategory, Complaint, ComplaintResponse
+from django.db import transaction
+from django.db.models import Count, Prefetch, Q
+from .models import CityStaff, ComplaintCategory, Complaint, ComplaintCluster, ComplaintResponse
 from .serializers import (
     CityStaffSerializer, ComplaintCategorySerializer,
-    ComplaintSerializer, ComplaintResponseSerializer
+    ComplaintSerializer, ComplaintClusterSerializer, ComplaintResponseSerializer
 )
 from .ai_utils import analyze_complaint_priority
+from .routing import assign_complaint
+from . import bulk, dedup, rollup, sla, stats
+from datetime import timedelta
+from django.utils import timezone
+from core import transitions
+from core.mixins import BulkActionMixin, ConditionalListMixin, FieldProjectionMixin
+from core.pagination import StandardPagination
+from core.params import date_params
 import logging
 
 logger = logging.getLogger(__name__)
 
-class ComplaintCategoryViewSet(viewsets.ModelViewSet):
+class ComplaintCategoryViewSet(ConditionalListMixin, FieldProjectionMixin, viewsets.ModelViewSet):
     """Complaint category management"""
     queryset = ComplaintCategory.objects.all()
     serializer_class = ComplaintCategorySerializer
     permission_classes = [IsAuthenticated]
+    version_collections = ['complaint_categories']
 
-class ComplaintViewSet(viewsets.ModelViewSet):
+class ComplaintViewSet(BulkActionMixin, FieldProjectionMixin, viewsets.ModelViewSet):
     """Complaint management"""
     queryset = Complaint.objects.all()
     serializer_class = ComplaintSerializer
+    compact_fields = [
+        'id', 'complaint_id', 'title', 'category_name', 'citizen_name', 'location',
+        'status', 'priority', 'priority_display', 'created_at', 'image_thumbnail',
+        'assigned_to', 'assigned_to_name', 'assigned_to_username', 'due_at', 'escalated_at', 'cluster'
+    ]
     
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -33,11 +49,18 @@ class ComplaintViewSet(viewsets.ModelViewSet):
         if not user.is_authenticated:
             return Complaint.objects.none()
             
-        queryset = Complaint.objects.all().order_by('-created_at')
+        queryset = Complaint.objects.select_related('category', 'citizen', 'assigned_to__user').order_by('-created_at')
         
         if user.role == 'citizen':
             queryset = queryset.filter(citizen=user)
         
+        # Staff work queues: ?assigned=me or ?assigned=none
+        assigned = self.request.query_params.get('assigned')
+        if assigned == 'me':
+            queryset = queryset.filter(assigned_to__user=user)
+        elif assigned == 'none':
+            queryset = queryset.filter(assigned_to__isnull=True)
+        
         # Category filtering
         category = self.request.query_params.get('category')
         if category:
@@ -51,8 +74,10 @@ class ComplaintViewSet(viewsets.ModelViewSet):
         return queryset
     
     def perform_create(self, serializer):
-        """Create complaint and automatically assign AI-generated priority"""
-        complaint = serializer.save(citizen=self.request.user)
+        """Create complaint, assign AI-generated priority and route it to a staff member"""
+        with transaction.atomic():
+            complaint = serializer.save(citizen=self.request.user)
+            transitions.record('complaint', [(complaint.pk, '', complaint.status)], self.request.user)
         
         # Analyze and assign priority using AI
         try:
@@ -63,36 +88,48 @@ class ComplaintViewSet(viewsets.ModelViewSet):
                 category=category_name
             )
             complaint.priority = ai_priority
-            complaint.save(update_fields=['priority'])
             logger.info(f"Assigned AI priority '{ai_priority}' to complaint {complaint.complaint_id}")
         except Exception as e:
             logger.error(f"Failed to assign AI priority: {str(e)}")
             # Complaint is still created with default priority
+        
+        try:
+            assign_complaint(complaint)
+        except Exception as e:
+            logger.error(f"Failed to route complaint {complaint.complaint_id}: {str(e)}")
+            # Left unassigned for rebalance_complaints to pick up
+        complaint.due_at = sla.deadline(complaint)
+        
+        try:
+            dedup.index_complaint(complaint)
+        except Exception as e:
+            logger.error(f"Failed to check complaint {complaint.complaint_id} for duplicates: {str(e)}")
+        complaint.save(update_fields=['priority', 'assigned_to', 'due_at', 'cluster', 'updated_at'])
+    
+    def perform_update(self, serializer):
+        previous = serializer.instance.status
+        with transaction.atomic():
+            complaint = serializer.save()
+            transitions.record('complaint', [(complaint.pk, previous, complaint.status)], self.request.user)
     
     @action(detail=True, methods=['post'])
     def respond(self, request, pk=None):
         """Add response to complaint"""
+        if request.user.role != 'city_staff':
+            return Response({'error': 'Only city staff can respond to complaints'}, status=status.HTTP_403_FORBIDDEN)
         complaint = self.get_object()
-        
-        # Ensure staff profile exists
-        staff, created = CityStaff.objects.get_or_create(
-            user=request.user,
-            defaults={
-                'department': 'Operations',
-                'designation': 'Field Officer',
-                'employee_id': f"CITY-{request.user.username}",
-                'jurisdiction': 'Central'
-            }
-        )
+        staff = request.role_profile
         
         response_serializer = ComplaintResponseSerializer(data=request.data)
         if response_serializer.is_valid():
             try:
-                response_serializer.save(complaint=complaint, staff=staff)
-                
-                # Update complaint status
-                complaint.status = 'in_progress'
-                complaint.save()
+                with transaction.atomic():
+                    response_serializer.save(complaint=complaint, staff=staff)
+                    
+                    # Update complaint status
+                    previous, complaint.status = complaint.status, 'in_progress'
+                    complaint.save()
+                    transitions.record('complaint', [(complaint.pk, previous, complaint.status)], request.user)
                 
                 return Response(response_serializer.data, status=status.HTTP_201_CREATED)
             except Exception as e:
@@ -103,9 +140,83 @@ class ComplaintViewSet(viewsets.ModelViewSet):
     def resolve(self, request, pk=None):
         """Mark complaint as resolved"""
         complaint = self.get_object()
-        complaint.status = 'resolved'
-        complaint.save()
+        bulk.apply([complaint], 'resolve', actor=request.user)
         return Response({'message': 'Complaint resolved'})
+    
+    @action(detail=True, methods=['post'])
+    def escalate(self, request, pk=None):
+        """Escalate a complaint ahead of its SLA deadline"""
+        if request.user.role != 'city_staff':
+            return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
+        complaint = self.get_object()
+        escalated = sla.escalate([complaint.pk], overdue_only=False)
+        if not escalated:
+            return Response({'error': 'Complaint is closed or already escalated'}, status=status.HTTP_409_CONFLICT)
+        return Response(self.get_serializer(escalated[0]).data)
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Resolve, close, assign or re-prioritise many complaints at once"""
+        if request.user.role != 'city_staff':
+            return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
+        name = request.data.get('action')
+        if name not in bulk.ACTIONS:
+            return Response({'error': f"action must be one of {', '.join(bulk.ACTIONS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        ids = self.bulk_ids(request)
+        if ids is None:
+            return Response({'error': f'ids must be a list of 1 to {self.max_bulk_ids} complaint ids'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        value = None
+        if name == 'assign':
+            try:
+                value = CityStaff.objects.get(pk=int(request.data.get('assigned_to')))
+            except (TypeError, ValueError, CityStaff.DoesNotExist):
+                return Response({'error': 'assigned_to must be a staff member id'}, status=status.HTTP_400_BAD_REQUEST)
+        elif name == 'set_priority':
+            value = request.data.get('priority')
+            if value not in dict(Complaint.PRIORITY_CHOICES):
+                return Response({'error': 'Invalid priority'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        complaints = list(self.get_queryset().filter(pk__in=ids))
+        missing = set(ids) - {complaint.pk for complaint in complaints}
+        if missing:
+            return Response({'error': 'Complaints not found', 'missing': sorted(missing)}, status=status.HTTP_404_NOT_FOUND)
+        updated = {complaint.pk for complaint in bulk.apply(complaints, name, value, actor=request.user)}
+        return Response({'updated': sorted(updated), 'skipped': sorted(set(ids) - updated)})
+
+class ComplaintClusterViewSet(viewsets.ReadOnlyModelViewSet):
+    """Groups of complaints about the same incident, for staff to handle as one"""
+    serializer_class = ComplaintClusterSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = StandardPagination
+    
+    def get_queryset(self):
+        if self.request.user.role not in ('city_staff', 'admin'):
+            return ComplaintCluster.objects.none()
+        members = Complaint.objects.select_related('category', 'citizen', 'assigned_to__user').order_by('created_at', 'id')
+        queryset = (
+            ComplaintCluster.objects
+            .annotate(
+                size=Count('complaints'),
+                open_count=Count('complaints', filter=Q(complaints__status__in=sla.OPEN_STATUSES)),
+            )
+            .filter(size__gt=1)
+            .prefetch_related(Prefetch('complaints', queryset=members))
+            .order_by('-updated_at', '-id')
+        )
+        # Clusters with work left unless ?status=all
+        if self.request.query_params.get('status') != 'all':
+            queryset = queryset.filter(open_count__gt=0)
+        return queryset
+    
+    @action(detail=True, methods=['post'])
+    def resolve(self, request, pk=None):
+        """Resolve every open complaint in the cluster"""
+        if request.user.role != 'city_staff':
+            return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
+        cluster = self.get_object()
+        complaints = bulk.apply(cluster.complaints.all(), 'resolve', actor=request.user)
+        return Response({'message': f'Resolved {len(complaints)} complaints', 'resolved': len(complaints)})
 
 @api_view(['GET'])
 def dashboard_stats(request):
@@ -113,25 +224,46 @@ def dashboard_stats(request):
     if not request.user.is_authenticated or request.user.role != 'city_staff':
         return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
     
-    staff, created = CityStaff.objects.get_or_create(
-        user=request.user,
-        defaults={
-            'department': 'Operations',
-            'designation': 'Field Officer',
-            'employee_id': f"CITY-{request.user.username}",
-            'jurisdiction': 'Central'
-        }
-    )
+    return Response(stats.dashboard_stats(request.user))
+
+@api_view(['GET'])
+def sla_metrics(request):
+    """SLA breaches and late resolutions per staff member"""
+    if not request.user.is_authenticated or request.user.role not in ('city_staff', 'admin'):
+        return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
+    return Response(sla.staff_metrics())
+
+@api_view(['GET'])
+def heatmap(request):
+    """Complaint counts per area from the daily rollup (default: filed in the last 30 days)"""
+    if not request.user.is_authenticated or request.user.role not in ('city_staff', 'admin'):
+        return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
+    
+    try:
+        dates = date_params(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    end = dates.get('to') or timezone.localdate()
+    start = dates.get('from') or end - timedelta(days=29)
+    if end < start:
+        return Response({'error': 'to must be on or after from'}, status=status.HTTP_400_BAD_REQUEST)
     
-    stats = {
-        'pending_complaints': Complaint.objects.filter(status='submitted').count(),
-        'in_progress': Complaint.objects.filter(status='in_progress').count(),
-        'resolved_this_month': Complaint.objects.filter(status='resolved').count(), # Simplified for now
-    }
+    category_id = None
+    category = request.query_params.get('category')
+    if category:
+        category_id = ComplaintCategory.objects.filter(name__iexact=category).values_list('id', flat=True).first()
+        if category_id is None:
+            return Response({'error': 'Unknown category'}, status=status.HTTP_400_BAD_REQUEST)
     
-    return Response(stats)
+    areas = rollup.heatmap(start, end, category_id, request.query_params.get('status'))
+    return Response({
+        'from': start,
+        'to': end,
+        'total': sum(area['total'] for area in areas),
+        'areas': areas,
+    })
 
-class ComplaintResponseViewSet(viewsets.ModelViewSet):
+class ComplaintResponseViewSet(FieldProjectionMixin, viewsets.ModelViewSet):
     """Complaint response management"""
     queryset = ComplaintResponse.objects.all()
     serializer_class = ComplaintResponseSerializer
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Service, ServiceProvider, ServiceRequest, DataExchange, SystemMetrics
+from .models import Service, ServiceProvider, ServiceRequest, DataExchange, SystemMetrics, StatusTransition
 
 @admin.register(Service)
 class ServiceAdmin(admin.ModelAdmin):
@@ -28,3 +28,16 @@ class DataExchangeAdmin(admin.ModelAdmin):
 class SystemMetricsAdmin(admin.ModelAdmin):
     list_display = ['timestamp', 'active_users', 'total_requests', 'avg_response_time']
     list_filter = ['timestamp']
+
+@admin.register(StatusTransition)
+class StatusTransitionAdmin(admin.ModelAdmin):
+    list_display = ['entity', 'object_id', 'from_status', 'to_status', 'actor', 'created_at']
+    list_filter = ['entity', 'to_status']
+    search_fields = ['object_id']
+    
+    # Append-only
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
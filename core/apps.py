@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import events, outbox, sync, versioning
+        versioning.connect_signals()
+        events.connect_signals()
+        sync.connect_signals()
+        outbox.connect_signals()
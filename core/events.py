@@ -0,0 +1,171 @@
+"""
+Server-push notifications for the staff, doctor and officer dashboards.
+
+Writes to complaints, appointments, farmer queries and approval requests are
+recorded as PushEvent rows addressed to a role (e.g. every city_staff user)
+or to a single user (the citizen, patient or doctor involved). The
+``/api/core/events/`` Server-Sent Events stream tails that log for the
+connected user, so dashboards apply row deltas instead of refetching whole
+collections. Because the log lives in the database, events reach clients
+connected to any worker process and resume from ``Last-Event-ID`` after a
+reconnect.
+"""
+import json
+import logging
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
+from django.utils import timezone
+
+from . import outbox
+from .models import PushEvent
+
+logger = logging.getLogger(__name__)
+
+# Events older than this are pruned; clients offline longer do a full reload
+EVENT_RETENTION = timedelta(days=1)
+
+
+def _complaint_payload(instance):
+    from city_services.serializers import ComplaintSerializer
+    from city_services.views import ComplaintViewSet
+    return ComplaintSerializer(instance, fields=ComplaintViewSet.compact_fields).data
+
+
+def _appointment_payload(instance):
+    from healthcare.serializers import AppointmentSerializer
+    return AppointmentSerializer(instance).data
+
+
+def _farmer_query_payload(instance):
+    from agriculture.serializers import FarmerQuerySerializer
+    from agriculture.views import FarmerQueryViewSet
+    return FarmerQuerySerializer(instance, fields=FarmerQueryViewSet.compact_fields).data
+
+
+def _approval_request_payload(instance):
+    from accounts.serializers import ApprovalRequestSerializer
+    from accounts.views import ApprovalRequestViewSet
+    return ApprovalRequestSerializer(instance, fields=ApprovalRequestViewSet.compact_fields).data
+
+
+# Model label -> (topic, audiences of an instance, payload of an instance)
+EVENT_SOURCES = {
+    'city_services.Complaint': (
+        'complaint',
+        lambda obj: [{'role': 'city_staff'}, {'user_id': obj.citizen_id}],
+        _complaint_payload,
+    ),
+    'healthcare.Appointment': (
+        'appointment',
+        lambda obj: [{'user_id': obj.doctor.user_id}, {'user_id': obj.patient_id}],
+        _appointment_payload,
+    ),
+    'agriculture.FarmerQuery': (
+        'farmer_query',
+        lambda obj: [{'role': 'agri_officer'}, {'user_id': obj.farmer_id}],
+        _farmer_query_payload,
+    ),
+    'accounts.ApprovalRequest': (
+        'approval_request',
+        lambda obj: [{'role': 'admin'}, {'user_id': obj.user_id}],
+        _approval_request_payload,
+    ),
+}
+
+
+def publish(topic, action, object_id, payload, audiences):
+    """
+    Record an event for each audience.
+
+    Args:
+        topic: Event name seen by the client (complaint, appointment, ...)
+        action: created, updated or deleted
+        object_id: Primary key of the changed row
+        payload: JSON-serializable representation of the row
+        audiences: List of {'role': ...} or {'user_id': ...} dicts
+    """
+    with transaction.atomic():
+        PushEvent.objects.bulk_create(_events(topic, action, object_id, payload, audiences))
+
+
+def _events(topic, action, object_id, payload, audiences):
+    # Round-trip through JSON so ReturnDicts and lazy strings are stored plainly
+    payload = json.loads(json.dumps(payload, default=str))
+    return [
+        PushEvent(topic=topic, action=action, object_id=object_id, payload=payload,
+                  role=audience.get('role', ''), user_id=audience.get('user_id'))
+        for audience in audiences
+    ]
+
+
+def publish_instances(instances, action='updated'):
+    """
+    Record events for rows written without post_save, e.g. by bulk_update().
+
+    All events are inserted in one batch. Load the relations the payload
+    reads (select_related) beforehand to keep this to a single query. The
+    rows are also queued for their ServiceRequest refresh (see core.outbox).
+    """
+    events = []
+    for instance in instances:
+        topic, audiences, payload = EVENT_SOURCES[instance._meta.label]
+        events += _events(topic, action, instance.pk, payload(instance), audiences(instance))
+    PushEvent.objects.bulk_create(events, batch_size=500)
+    outbox.enqueue_instances(instances)
+
+
+def _instance_saved(sender, instance, created, **kwargs):
+    topic, audiences, payload = EVENT_SOURCES[sender._meta.label]
+    try:
+        publish(topic, 'created' if created else 'updated', instance.pk, payload(instance), audiences(instance))
+    except Exception as e:
+        # Notifications must never break the write that triggered them
+        logger.error(f"Failed to publish {sender._meta.label} event: {e}")
+
+
+def _instance_deleted(sender, instance, **kwargs):
+    topic, audiences, _ = EVENT_SOURCES[sender._meta.label]
+    try:
+        publish(topic, 'deleted', instance.pk, {'id': instance.pk}, audiences(instance))
+    except Exception as e:
+        logger.error(f"Failed to publish {sender._meta.label} delete event: {e}")
+
+
+def connect_signals():
+    for label in EVENT_SOURCES:
+        model = apps.get_model(label)
+        post_save.connect(_instance_saved, sender=model, dispatch_uid=f'events-{label}-save')
+        post_delete.connect(_instance_deleted, sender=model, dispatch_uid=f'events-{label}-delete')
+
+
+def events_for_user(user, after_id, limit=100):
+    """Events addressed to the user or their role with id greater than after_id"""
+    return list(
+        PushEvent.objects.filter(id__gt=after_id)
+        .filter(Q(user=user) | Q(role=user.role))
+        .order_by('id')[:limit]
+    )
+
+
+def latest_event_id():
+    return PushEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def prune_events():
+    """Delete events past the retention window; returns the number removed"""
+    deleted, _ = PushEvent.objects.filter(created_at__lt=timezone.now() - EVENT_RETENTION).delete()
+    return deleted
+
+
+def format_sse(event):
+    """Serialize a PushEvent as a Server-Sent Events message"""
+    data = json.dumps({
+        'action': event.action,
+        'id': event.object_id,
+        'data': event.payload,
+    })
+    return f"id: {event.id}\nevent: {event.topic}\ndata: {data}\n\n"
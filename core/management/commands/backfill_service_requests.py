@@ -0,0 +1,27 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from core import outbox
+
+
+class Command(BaseCommand):
+    help = 'Creates or refreshes the ServiceRequest row of every complaint, appointment and farmer query'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', choices=sorted(outbox.SOURCES), help='Only this kind of row')
+        parser.add_argument('--batch-size', type=int, default=outbox.DRAIN_BATCH)
+
+    def handle(self, *args, **options):
+        sources = [options['source']] if options['source'] else list(outbox.SOURCES)
+        services = {}
+        for source in sources:
+            model = apps.get_model(outbox.SOURCES[source][0])
+            ids = model.objects.order_by('id').values_list('id', flat=True)
+            batch, written = [], 0
+            for pk in ids.iterator(chunk_size=options['batch_size']):
+                batch.append(pk)
+                if len(batch) >= options['batch_size']:
+                    written, batch = written + outbox.sync(source, batch, services), []
+            if batch:
+                written += outbox.sync(source, batch, services)
+            self.stdout.write(self.style.SUCCESS(f'Synced {written} {source} service requests'))
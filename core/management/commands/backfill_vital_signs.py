@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from healthcare.models import MedicalRecord, VitalSign
+from healthcare.vitals import backfill
+
+
+class Command(BaseCommand):
+    help = 'Re-parses MedicalRecord.vital_signs into the VitalSign time-series table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Records read and written per batch')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        written = backfill(MedicalRecord, VitalSign, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote vitals for {written} medical records in {time.perf_counter() - started:.1f}s'
+        ))
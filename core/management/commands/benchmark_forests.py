@@ -0,0 +1,53 @@
+import time
+import warnings
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from dpi_platform.lookup import CATEGORICAL_FEATURES
+from dpi_platform.utils import crop_model, yield_model, crop_forest, yield_forest, encoders
+
+
+def _sample_rows(count, rng):
+    """Random label-encoded FarmerForm rows"""
+    columns = [rng.integers(0, len(encoders[name].classes_), count) for name in CATEGORICAL_FEATURES]
+    columns.append(rng.uniform(0.5, 50, count))  # land_size in acres
+    return np.column_stack(columns).astype(np.float64)
+
+
+def _median_seconds(fn, X, budget):
+    """Median wall time of fn(X), repeated until the time budget is spent"""
+    timings = []
+    deadline = time.perf_counter() + budget
+    while len(timings) < 3 or (time.perf_counter() < deadline and len(timings) < 1000):
+        start = time.perf_counter()
+        fn(X)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+class Command(BaseCommand):
+    help = 'Compares FlatForest and sklearn predict latency and throughput for the crop and yield models'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', default='1,100,100000', help='Comma-separated batch sizes')
+        parser.add_argument('--budget', type=float, default=2.0, help='Seconds spent per measurement')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['rows'].split(',')]
+        rng = np.random.default_rng(0)
+        warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+        for name, model, flat in [('crop_model', crop_model, crop_forest), ('yield_model', yield_model, yield_forest)]:
+            self.stdout.write(f'{name}: {len(model.estimators_)} trees, {flat.node_count} nodes')
+            for size in sizes:
+                X = _sample_rows(size, rng)
+                if not np.array_equal(flat.predict(X), model.predict(X)):
+                    self.stdout.write(self.style.ERROR(f'  {size} rows: predictions differ from sklearn'))
+                sklearn_time = _median_seconds(model.predict, X, options['budget'])
+                flat_time = _median_seconds(flat.predict, X, options['budget'])
+                self.stdout.write(
+                    f'  {size:>7} rows  sklearn {sklearn_time * 1e3:9.3f} ms ({size / sklearn_time:>10,.0f} rows/s)'
+                    f'  flat {flat_time * 1e3:9.3f} ms ({size / flat_time:>10,.0f} rows/s)'
+                    f'  speedup {sklearn_time / flat_time:5.1f}x'
+                )
@@ -0,0 +1,49 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from dpi_platform.benchmark import append_history, environment, find_regressions, load_history, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks model load time, single-row latency and batch throughput, and fails on regressions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--history', default=os.path.join(settings.BASE_DIR, 'benchmarks', 'ml_history.json'),
+            help='JSON file the results are appended to and compared against'
+        )
+        parser.add_argument('--tolerance', type=float, default=0.5, help='Allowed relative slowdown (0.5 = 50%%)')
+        parser.add_argument('--baseline-runs', type=int, default=5, help='Recent runs the baseline is the median of')
+        parser.add_argument('--iterations', type=int, default=500, help='Single-row calls timed per model')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Rows per throughput batch')
+        parser.add_argument('--no-record', action='store_true', help='Compare only; do not append a passing run to the history')
+        parser.add_argument('--json', action='store_true', help='Print the metrics as JSON')
+
+    def handle(self, *args, **options):
+        env = environment()
+        metrics = run_benchmarks(iterations=options['iterations'], batch_size=options['batch_size'])
+        history = load_history(options['history'])
+
+        if options['json']:
+            self.stdout.write(json.dumps({'environment': env, 'metrics': metrics}, indent=2))
+        else:
+            self.stdout.write(f"python {env['python']}, numpy {env['numpy']}, sklearn {env['sklearn']}, models {env['models']}")
+            for key, value in sorted(metrics.items()):
+                unit = 'rows/s' if key.endswith('rows_per_s') else 'ms'
+                self.stdout.write(f'  {key:<32} {value:>14,.3f} {unit}')
+
+        regressions = find_regressions(
+            metrics, history, tolerance=options['tolerance'],
+            baseline_runs=options['baseline_runs'], machine=env['machine']
+        )
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(self.style.ERROR(f'  {regression}'))
+            raise CommandError(f'{len(regressions)} benchmark regressions')
+        # Only passing runs join the baseline, so a regression never becomes the norm
+        if not options['no_record']:
+            append_history(options['history'], metrics, env)
+        self.stdout.write(self.style.SUCCESS(f'No regressions against {min(len(history), options["baseline_runs"])} recent runs'))
@@ -0,0 +1,54 @@
+import os
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from dpi_platform.lookup import CATEGORICAL_FEATURES, CropLookup, model_fingerprint
+from dpi_platform.utils import BASE_DIR, CROP_LOOKUP_PATH, crop_forest, yield_forest, encoders
+
+
+class Command(BaseCommand):
+    help = 'Precomputes crop/yield recommendations for every categorical combination and land-size interval'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=CROP_LOOKUP_PATH, help='Where to write the .npz table')
+        parser.add_argument('--check-rows', type=int, default=20000, help='Random inputs compared against the forests')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        fingerprint = model_fingerprint(os.path.join(BASE_DIR, 'ml'))
+        lookup = CropLookup.build(encoders, crop_forest, yield_forest, fingerprint)
+        self.stdout.write(
+            f'Evaluated {lookup.crop_codes.shape[0]} combinations x {lookup.crop_codes.shape[1]} '
+            f'land-size intervals in {time.perf_counter() - started:.1f}s'
+        )
+
+        # Spot-check against the forests before replacing the served table
+        rng = np.random.default_rng(0)
+        count = options['check_rows']
+        samples = [
+            {
+                **{name: rng.choice(encoders[name].classes_) for name in CATEGORICAL_FEATURES},
+                'land_size': float(rng.uniform(0, 6)),
+            }
+            for _ in range(count)
+        ]
+        if samples:
+            X = np.column_stack(
+                [encoders[name].transform([sample[name] for sample in samples]) for name in CATEGORICAL_FEATURES]
+                + [[sample['land_size'] for sample in samples]]
+            )
+            expected = zip(crop_forest.predict(X), yield_forest.predict(X))
+            mismatches = sum(
+                lookup.predict(sample) != (str(crop), str(yield_level))
+                for sample, (crop, yield_level) in zip(samples, expected)
+            )
+            if mismatches:
+                raise CommandError(f'{mismatches} of {count} lookups disagree with the models; table not written')
+
+        lookup.save(options['output'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {options["output"]} ({os.path.getsize(options["output"]) / 1024:.0f} KB on disk, '
+            f'{lookup.nbytes / 1024:.0f} KB in memory), checked {count} inputs'
+        ))
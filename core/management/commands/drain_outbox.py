@@ -0,0 +1,44 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from core import outbox
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Refreshes ServiceRequest rows from the outbox of changed complaints, appointments and farmer queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to wait when the outbox is empty')
+        parser.add_argument('--max-backoff', type=float, default=300,
+                            help='Longest wait between retries after consecutive failed batches')
+        parser.add_argument('--batch-size', type=int, default=outbox.DRAIN_BATCH)
+        parser.add_argument('--once', action='store_true', help='Drain what is queued now and exit')
+
+    def handle(self, *args, **options):
+        drained = failures = 0
+        while True:
+            close_old_connections()
+            try:
+                applied = outbox.drain(options['batch_size'])
+            except Exception as e:
+                # A failed batch is rolled back and stays queued
+                if options['once']:
+                    raise CommandError(f'Outbox drain failed after {drained} entries: {e}') from e
+                failures += 1
+                delay = min(options['interval'] * 2 ** (failures - 1), options['max_backoff'])
+                logger.error(f"Outbox drain failed ({failures} in a row), retrying in {delay:.0f}s: {e}")
+                time.sleep(delay)
+                continue
+            failures = 0
+            drained += applied
+            if applied:
+                continue
+            if options['once']:
+                self.stdout.write(self.style.SUCCESS(f'Applied {drained} outbox entries'))
+                return
+            time.sleep(options['interval'])
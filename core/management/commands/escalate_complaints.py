@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from city_services.sla import SLAScheduler, escalate
+
+
+class Command(BaseCommand):
+    help = 'Escalates complaints that miss their SLA deadline (runs as a long-lived worker, or once from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=60, help='Seconds between checks')
+        parser.add_argument('--once', action='store_true', help='Check once and exit')
+
+    def handle(self, *args, **options):
+        scheduler = SLAScheduler()
+        while True:
+            close_old_connections()
+            scheduler.poll()
+            now = timezone.now()
+            escalated = escalate(scheduler.pop_due(now), now)
+            if escalated or options['once']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Escalated {len(escalated)} complaints; {len(scheduler)} open deadlines scheduled'
+                ))
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from core.events import prune_events, EVENT_RETENTION
+from core.sync import prune_tombstones, TOMBSTONE_RETENTION
+
+
+class Command(BaseCommand):
+    help = 'Deletes push notification events and sync tombstones older than their retention windows'
+
+    def handle(self, *args, **kwargs):
+        deleted = prune_events()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} events older than {EVENT_RETENTION}'))
+        deleted = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} tombstones older than {TOMBSTONE_RETENTION}'))
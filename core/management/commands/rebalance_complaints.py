@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from city_services.locations import location_tokens
+from city_services.models import CityStaff, Complaint
+from city_services.routing import OPEN_STATUSES, LoadIndex
+from core.events import publish_instances
+
+
+def _department(complaint):
+    return complaint.category.name.strip().lower() if complaint.category else ''
+
+
+class Command(BaseCommand):
+    help = 'Assigns unassigned open complaints to staff and optionally evens out staff queues'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reassign', action='store_true',
+                            help='Also move complaints nobody has started on off overloaded staff')
+        parser.add_argument('--slack', type=int, default=3,
+                            help='Move a complaint only if its assignee has more than this many open '
+                                 'complaints above an equally suitable colleague')
+        parser.add_argument('--batch-size', type=int, default=500, help='Complaints written per query')
+        parser.add_argument('--dry-run', action='store_true', help='Report the moves without saving them')
+
+    def handle(self, *args, **options):
+        index = LoadIndex()
+        index.refresh()
+        complaints = Complaint.objects.select_related('category', 'citizen')
+        changed = []
+
+        backlog = complaints.filter(assigned_to__isnull=True, status__in=OPEN_STATUSES).order_by('created_at', 'id')
+        for complaint in backlog.iterator(chunk_size=options['batch_size']):
+            staff_id = index.assign(_department(complaint), complaint.location)
+            if staff_id is None:
+                self.stdout.write(self.style.WARNING('No city staff to assign complaints to'))
+                return
+            complaint.assigned_to_id = staff_id
+            changed.append(complaint)
+        assigned = len(changed)
+
+        if options['reassign']:
+            # Newest first, so the oldest complaints keep their place in a queue
+            queued = complaints.filter(assigned_to__isnull=False, status='submitted').order_by('-created_at', '-id')
+            for complaint in queued.iterator(chunk_size=options['batch_size']):
+                current = complaint.assigned_to_id
+                department = _department(complaint)
+                target = index.choose(department, complaint.location, exclude=current)
+                if target is None:
+                    break
+                tokens = location_tokens(complaint.location)
+                if (index.match(target, department, tokens) >= index.match(current, department, tokens)
+                        and index.load(current) - index.load(target) > options['slack']):
+                    index.move(target, previous=current)
+                    complaint.assigned_to_id = target
+                    changed.append(complaint)
+
+        if not options['dry_run'] and changed:
+            self._save(changed, options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Dry run: ' if options['dry_run'] else ''}assigned {assigned} complaints, "
+            f"moved {len(changed) - assigned}"
+        ))
+
+    def _save(self, complaints, batch_size):
+        # bulk_update() skips auto_now and post_save, so stamp updated_at for
+        # delta sync and publish the dashboard events here
+        now = timezone.now()
+        staff = CityStaff.objects.select_related('user').in_bulk({c.assigned_to_id for c in complaints})
+        for complaint in complaints:
+            complaint.updated_at = now
+            complaint.assigned_to = staff[complaint.assigned_to_id]
+        for start in range(0, len(complaints), batch_size):
+            batch = complaints[start:start + batch_size]
+            Complaint.objects.bulk_update(batch, ['assigned_to', 'updated_at'])
+            publish_instances(batch)
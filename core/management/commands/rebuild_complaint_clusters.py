@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from city_services import dedup
+from city_services.models import Complaint, ComplaintBucket, ComplaintCluster
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the near-duplicate index and re-clusters recent complaints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=dedup.WINDOW.days,
+                            help='Index and cluster complaints filed in the last N days')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        since = now - timedelta(days=options['days'])
+        recent = Complaint.objects.filter(created_at__gte=since)
+
+        with transaction.atomic():
+            ComplaintBucket.objects.all().delete()
+            recent.filter(cluster__isnull=False).update(cluster=None, updated_at=now)
+            ComplaintCluster.objects.filter(complaints__isnull=True).delete()
+
+        complaints = recent.only('id', 'title', 'description', 'location', 'category_id', 'cluster_id', 'created_at')
+        indexed = clustered = 0
+        # Oldest first, so each complaint is compared with the ones filed before it
+        for complaint in complaints.order_by('created_at', 'id').iterator(chunk_size=500):
+            cluster_id = dedup.index_complaint(complaint)
+            indexed += 1
+            if cluster_id is not None:
+                Complaint.objects.filter(pk=complaint.pk).update(cluster_id=cluster_id, updated_at=timezone.now())
+                clustered += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {indexed} complaints; {clustered} joined a cluster of duplicates'
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from city_services.models import Complaint, ComplaintAreaDaily
+from city_services.rollup import backfill_area_keys, rebuild
+
+
+class Command(BaseCommand):
+    help = 'Re-derives complaint area keys and recomputes the heatmap rollup table'
+
+    def handle(self, *args, **options):
+        updated = backfill_area_keys(Complaint)
+        rows = rebuild(Complaint, ComplaintAreaDaily)
+        self.stdout.write(self.style.SUCCESS(f'Updated {updated} area keys; wrote {rows} rollup rows'))
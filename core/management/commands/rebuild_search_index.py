@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from healthcare.models import MedicalRecord
+from healthcare.search import is_indexed, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the medical record full-text index, e.g. after writes that bypassed signals'
+
+    def handle(self, *args, **options):
+        if not is_indexed():
+            self.stdout.write(f'{connection.vendor} has no full-text index; search scans the records instead')
+            return
+        with transaction.atomic():
+            rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {MedicalRecord.objects.count()} medical records'))
@@ -0,0 +1,99 @@
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from dpi_platform.lookup import model_fingerprint
+from dpi_platform.scoring import RISK_MODEL_FILES, init_worker, score_vitals
+from dpi_platform.utils import BASE_DIR, risk_scorer
+from healthcare.models import MedicalRecord, RiskScore
+
+
+def _latest_vitals(since, chunk_size):
+    """Yield (patient_id, record_id, vital_signs) of each patient's newest record with vitals"""
+    records = (
+        MedicalRecord.objects
+        .filter(created_at__gte=since)
+        .exclude(vital_signs={})
+        .order_by('patient_id', '-created_at', '-id')
+        .values_list('patient_id', 'id', 'vital_signs')
+    )
+    previous = None
+    for patient_id, record_id, vitals in records.iterator(chunk_size=chunk_size):
+        if patient_id != previous:
+            previous = patient_id
+            yield patient_id, record_id, vitals
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = 'Re-scores disease risks for every patient with recent vitals (run nightly from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365, help='Only use medical records from the last N days')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Patients scored and written per batch')
+        parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1),
+                            help='Scoring processes; 0 scores in this process')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        scored_at = timezone.now()
+        since = scored_at - timedelta(days=options['days'])
+        model_version = model_fingerprint(os.path.join(BASE_DIR, 'ml'), RISK_MODEL_FILES)[:16]
+        chunks = _chunks(_latest_vitals(since, options['chunk_size']), options['chunk_size'])
+
+        written = skipped = 0
+        if options['workers'] > 0:
+            # spawn: workers only need NumPy and never inherit the open DB cursor
+            with ProcessPoolExecutor(options['workers'], mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=init_worker, initargs=(risk_scorer,)) as pool:
+                # Bounded read-ahead so memory stays flat however many patients there are
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(pool.submit(score_vitals, chunk))
+                    if len(pending) >= 2 * options['workers']:
+                        count, missing = self._write(pending.popleft().result(), model_version, scored_at)
+                        written, skipped = written + count, skipped + missing
+                while pending:
+                    count, missing = self._write(pending.popleft().result(), model_version, scored_at)
+                    written, skipped = written + count, skipped + missing
+        else:
+            for chunk in chunks:
+                count, missing = self._write(score_vitals(chunk, risk_scorer), model_version, scored_at)
+                written, skipped = written + count, skipped + missing
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Scored {written} patients in {time.perf_counter() - started:.1f}s; '
+            f'skipped {skipped} whose latest vitals lack risk inputs'
+        ))
+
+    def _write(self, result, model_version, scored_at):
+        scores, skipped = result
+        RiskScore.objects.bulk_create(
+            [
+                RiskScore(
+                    patient_id=patient_id, medical_record_id=record_id, diabetes=diabetes, heart=heart,
+                    cancer=cancer, model_version=model_version, scored_at=scored_at,
+                )
+                for patient_id, record_id, diabetes, heart, cancer in scores
+            ],
+            update_conflicts=True,
+            unique_fields=['patient'],
+            update_fields=['medical_record', 'diabetes', 'heart', 'cancer', 'model_version', 'scored_at'],
+        )
+        return len(scores), skipped
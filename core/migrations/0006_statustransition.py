@@ -0,0 +1,72 @@
+# Generated by Django 5.1.5 on 2026-10-19 17:54
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Spelled out rather than calling into core.transitions, so later changes
+# there cannot change what this migration writes
+SOURCES = (
+    ('complaint', 'city_services', 'Complaint'),
+    ('farmer_query', 'agriculture', 'FarmerQuery'),
+    ('appointment', 'healthcare', 'Appointment'),
+)
+
+
+def seed_history(apps, schema_editor):
+    """
+    A creation transition to the model's default status at created_at and,
+    if the status has moved on, one to the current status at resolved_at
+    when the row has one, else updated_at.
+    """
+    StatusTransition = apps.get_model('core', 'StatusTransition')
+    for entity, app_label, model_name in SOURCES:
+        model = apps.get_model(app_label, model_name)
+        initial = model._meta.get_field('status').default
+        has_resolved_at = any(field.name == 'resolved_at' for field in model._meta.fields)
+        fields = ['id', 'status', 'created_at', 'updated_at'] + (['resolved_at'] if has_resolved_at else [])
+        batch = []
+        for row in model.objects.values(*fields).order_by('id').iterator(chunk_size=2000):
+            batch.append(StatusTransition(entity=entity, object_id=row['id'], from_status='', to_status=initial,
+                                          created_at=row['created_at']))
+            if row['status'] != initial:
+                batch.append(StatusTransition(entity=entity, object_id=row['id'], from_status=initial,
+                                              to_status=row['status'],
+                                              created_at=row.get('resolved_at') or row['updated_at']))
+            if len(batch) >= 2000:
+                StatusTransition.objects.bulk_create(batch)
+                batch = []
+        StatusTransition.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_tombstone'),
+        ('agriculture', '0003_farmerquery_lease'),
+        ('city_services', '0005_complaint_area_rollup'),
+        ('healthcare', '0007_doctorunavailability_calendar_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatusTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(max_length=30)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('from_status', models.CharField(blank=True, max_length=20)),
+                ('to_status', models.CharField(max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['entity', 'object_id', 'id'], name='core_status_entity_d33798_idx'), models.Index(fields=['entity', 'created_at'], name='core_status_entity_0c25c9_idx')],
+            },
+        ),
+        migrations.RunPython(seed_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,166 @@
+"""
+Reusable serializer and viewset mixins shared across the service apps.
+"""
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework import serializers
+
+from .versioning import get_collection_stamp
+
+
+def _split_paths(paths):
+    """Split ``['a', 'b.c', 'b.d']`` into ``({'a'}, {'b': ['c', 'd']})``"""
+    top, nested = set(), {}
+    for path in paths or []:
+        head, _, rest = path.partition('.')
+        if rest:
+            nested.setdefault(head, []).append(rest)
+        else:
+            top.add(head)
+    return top, nested
+
+
+def _collapse_to_pk(field):
+    """Read-only primary key field standing in for a nested serializer"""
+    kwargs = {'read_only': True}
+    if field.source != field.field_name:
+        kwargs['source'] = field.source
+    if isinstance(field, serializers.ListSerializer):
+        kwargs['many'] = True
+    return serializers.PrimaryKeyRelatedField(**kwargs)
+
+
+class DynamicFieldsMixin:
+    """
+    Serializer mixin for sparse fieldsets.
+
+    ``fields`` keeps only the named fields; dotted names such as
+    ``doctor_profile.full_name`` are passed on to nested serializers.
+    ``Meta.expandable_fields`` lists heavy nested representations. Once a
+    client asks for a sparse response (``fields`` or ``expand`` given) those
+    collapse to primary keys unless named in ``expand``. Without either
+    argument the full representation is returned unchanged.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        expand = kwargs.pop('expand', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None or expand is not None:
+            self.apply_projection(fields, expand)
+
+    def apply_projection(self, fields=None, expand=None):
+        top_fields, nested_fields = _split_paths(fields)
+        top_expand, nested_expand = _split_paths(expand)
+
+        if fields is not None:
+            keep = top_fields | set(nested_fields)
+            for name in set(self.fields) - keep:
+                self.fields.pop(name)
+
+        expanded = top_expand | set(nested_expand) | set(nested_fields)
+        expandable = getattr(self.Meta, 'expandable_fields', ())
+        for name, field in list(self.fields.items()):
+            if name in expandable and name not in expanded:
+                self.fields[name] = _collapse_to_pk(field)
+                continue
+            nested = getattr(field, 'child', field)
+            if name in expanded and isinstance(nested, DynamicFieldsMixin):
+                nested.apply_projection(nested_fields.get(name), nested_expand.get(name, []))
+
+
+class FieldProjectionMixin:
+    """
+    Viewset mixin for ``?fields=``, ``?expand=`` and ``?view=compact``.
+
+    ``compact_fields`` lists the columns a list card needs; the serializer
+    must use DynamicFieldsMixin. Projections only apply to reads.
+    """
+    compact_fields = None
+
+    def _query_list(self, param):
+        value = self.request.query_params.get(param)
+        if value is None:
+            return None
+        return [name.strip() for name in value.split(',') if name.strip()]
+
+    def get_projection(self):
+        """Return the ``(fields, expand)`` pair requested by the client"""
+        if self.request is None or self.request.method != 'GET':
+            return None, None
+        fields = self._query_list('fields')
+        expand = self._query_list('expand')
+        if fields is None and self.request.query_params.get('view') == 'compact':
+            fields = self.compact_fields
+        return fields, expand
+
+    def get_serializer(self, *args, **kwargs):
+        fields, expand = self.get_projection()
+        if fields is not None:
+            kwargs.setdefault('fields', fields)
+        if expand is not None:
+            kwargs.setdefault('expand', expand)
+        return super().get_serializer(*args, **kwargs)
+
+
+class ConditionalListMixin:
+    """
+    Viewset mixin that serves ``list`` with ETag/Last-Modified validators.
+
+    ``version_collections`` names the CollectionVersion stamps the list
+    depends on. A matching If-None-Match/If-Modified-Since gets a 304 before
+    the queryset is evaluated or serialized.
+    """
+    version_collections = ()
+
+    def get_list_variant(self):
+        user = self.request.user
+        role = user.role if user.is_authenticated else 'anonymous'
+        return '|'.join([
+            self.request.get_full_path(),
+            self.request.META.get('HTTP_ACCEPT', ''),
+            role,
+        ])
+
+    def list(self, request, *args, **kwargs):
+        etag, last_modified = get_collection_stamp(self.version_collections, self.get_list_variant())
+        etag = quote_etag(etag)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Authorization', 'Cookie'])
+        return response
+
+
+class BulkActionMixin:
+    """
+    Id parsing for viewset actions that change many objects at once.
+
+    Objects should then be loaded through ``get_queryset()``, so a bulk action
+    reaches exactly the objects the caller could fetch one by one.
+    """
+    max_bulk_ids = 500
+
+    def bulk_ids(self, request):
+        """
+        Unique ids from the JSON body's ``ids`` list.
+
+        Returns:
+            list: The ids in request order, or None unless ``ids`` is a list
+            of 1 to max_bulk_ids integers
+        """
+        ids = request.data.get('ids')
+        if not isinstance(ids, list):
+            return None
+        try:
+            ids = list(dict.fromkeys(int(pk) for pk in ids))
+        except (TypeError, ValueError):
+            return None
+        return ids if 0 < len(ids) <= self.max_bulk_ids else None
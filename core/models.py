@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from accounts.models import CustomUser
 
 class Service(models.Model):
@@ -75,7 +76,7 @@ class ServiceRequest(models.Model):
     
     # Metadata
     reference_id = models.CharField(max_length=50, unique=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now)  # The source row's, when synced from a service
     updated_at = models.DateTimeField(auto_now=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     
@@ -117,3 +118,101 @@ class SystemMetrics(models.Model):
     
     class Meta:
         ordering = ['-timestamp']
+
+
+class CollectionVersion(models.Model):
+    """Change stamp for a read-mostly API collection, bumped on every write"""
+    name = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+    
+    class Meta:
+        ordering = ['name']
+
+
+class PushEvent(models.Model):
+    """Create/update notification fanned out to a role or a single user"""
+    
+    ACTION_CHOICES = (
+        ('created', 'Created'),
+        ('updated', 'Updated'),
+        ('deleted', 'Deleted'),
+    )
+    
+    topic = models.CharField(max_length=50)  # complaint, appointment, farmer_query, approval_request
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    payload = models.JSONField(default=dict)
+    role = models.CharField(max_length=20, blank=True, db_index=True)  # Audience role, if broadcast
+    # No DB constraint: deleting a user cascades to their rows, whose delete
+    # events are addressed to that same user
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, null=True, blank=True,
+                             db_constraint=False, related_name='push_events')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    def __str__(self):
+        return f"{self.topic} {self.object_id} {self.action}"
+    
+    class Meta:
+        ordering = ['id']
+
+
+class Tombstone(models.Model):
+    """Record of a deleted row, so delta sync clients can drop their copy"""
+    resource = models.CharField(max_length=50)  # complaints, appointments, ...
+    object_id = models.PositiveBigIntegerField()
+    # User whose scoped view contained the row; null when every reader saw it.
+    # Kept without a DB constraint because owners are often deleted with their rows.
+    owner = models.ForeignKey(CustomUser, on_delete=models.DO_NOTHING, null=True, blank=True,
+                              db_constraint=False, related_name='+')
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    def __str__(self):
+        return f"{self.resource} {self.object_id} deleted"
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [models.Index(fields=['resource', 'id'])]
+
+
+class StatusTransition(models.Model):
+    """Append-only log of status changes of complaints, farmer queries and appointments"""
+    entity = models.CharField(max_length=30)  # complaint, farmer_query, appointment
+    object_id = models.PositiveBigIntegerField()
+    from_status = models.CharField(max_length=20, blank=True)  # Empty for creation
+    to_status = models.CharField(max_length=20)
+    # No DB constraint: history outlives the users who made the changes
+    actor = models.ForeignKey(CustomUser, on_delete=models.DO_NOTHING, null=True, blank=True,
+                              db_constraint=False, related_name='+')
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"{self.entity} {self.object_id}: {self.from_status or '-'} -> {self.to_status}"
+    
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError('Status transitions are append-only')
+        super().save(*args, **kwargs)
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['entity', 'object_id', 'id']),  # One entity's history
+            models.Index(fields=['entity', 'created_at']),  # Per-day scans
+        ]
+
+
+class OutboxEntry(models.Model):
+    """A complaint, appointment or farmer query that changed and whose ServiceRequest is due a refresh"""
+    source = models.CharField(max_length=30)  # complaint, appointment, farmer_query
+    object_id = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.source} {self.object_id}"
+    
+    class Meta:
+        ordering = ['id']
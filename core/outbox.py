@@ -0,0 +1,212 @@
+"""
+Unified ServiceRequest rows for complaints, appointments and farmer queries.
+
+The platform dashboard counts ServiceRequest rows, so each domain row has a
+ServiceRequest mirror (reference_id ``"<source>:<id>"``). Domain writes do
+not touch it: they only add an OutboxEntry, from post_save/post_delete or,
+for rows written with bulk_update()/update(), from
+``events.publish_instances()``. ``manage.py drain_outbox`` then refreshes
+the mirrors in batches: entries for the same row collapse into one upsert,
+and rows that no longer exist lose their mirror.
+``manage.py backfill_service_requests`` mirrors rows written before the
+outbox existed.
+"""
+import logging
+from collections import defaultdict
+
+from django.apps import apps
+from django.db import connection, transaction
+from django.db.models import Min
+from django.db.models.signals import post_delete, post_save
+
+from .models import OutboxEntry, Service, ServiceProvider, ServiceRequest, StatusTransition
+from .transitions import TERMINAL_STATUSES
+
+logger = logging.getLogger(__name__)
+
+DRAIN_BATCH = 500
+
+# Service rows created on first sync if missing: service_type -> (name, icon)
+SERVICE_DEFAULTS = {
+    'healthcare': ('Healthcare', '🏥'),
+    'city': ('City Services', '🏙️'),
+    'agriculture': ('Agriculture', '🌾'),
+}
+
+
+def _complaint(complaint):
+    return {
+        'citizen_id': complaint.citizen_id,
+        'title': complaint.title,
+        'description': complaint.description,
+        'priority': complaint.priority,
+        'provider_user_id': complaint.assigned_to.user_id if complaint.assigned_to else None,
+    }
+
+
+def _appointment(appointment):
+    return {
+        'citizen_id': appointment.patient_id,
+        'title': f"Appointment on {appointment.appointment_date:%d %b %Y} at {appointment.appointment_time:%H:%M}",
+        'description': appointment.reason,
+        'priority': 'medium',
+        'provider_user_id': appointment.doctor.user_id,
+    }
+
+
+def _farmer_query(query):
+    return {
+        'citizen_id': query.farmer_id,
+        'title': query.title,
+        'description': query.description,
+        'priority': 'medium',
+        'provider_user_id': query.assigned_to.user_id if query.assigned_to else None,
+    }
+
+
+# source -> (model, service_type, select_related, domain status -> ServiceRequest status, fields)
+SOURCES = {
+    'complaint': ('city_services.Complaint', 'city', ['assigned_to'], {
+        'submitted': 'pending', 'under_review': 'pending', 'in_progress': 'in_progress',
+        'resolved': 'completed', 'closed': 'completed',
+    }, _complaint),
+    'appointment': ('healthcare.Appointment', 'healthcare', ['doctor'], {
+        'scheduled': 'pending', 'completed': 'completed', 'cancelled': 'cancelled', 'no_show': 'cancelled',
+    }, _appointment),
+    'farmer_query': ('agriculture.FarmerQuery', 'agriculture', ['assigned_to'], {
+        'submitted': 'pending', 'under_review': 'in_progress', 'answered': 'completed', 'closed': 'completed',
+    }, _farmer_query),
+}
+
+_SOURCE_BY_LABEL = {label: source for source, (label, *rest) in SOURCES.items()}
+
+# Fields refreshed on an existing ServiceRequest
+_SYNCED_FIELDS = ['service', 'citizen', 'provider', 'title', 'description', 'status', 'priority',
+                  'created_at', 'updated_at', 'completed_at']
+
+
+def reference_id(source, object_id):
+    return f'{source}:{object_id}'
+
+
+def enqueue(source, object_ids):
+    """Mark rows of a source as changed"""
+    OutboxEntry.objects.bulk_create([OutboxEntry(source=source, object_id=pk) for pk in object_ids], batch_size=500)
+
+
+def enqueue_instances(instances):
+    """enqueue() those of the instances that are rows of a SOURCES model"""
+    pending = defaultdict(list)
+    for instance in instances:
+        source = _SOURCE_BY_LABEL.get(instance._meta.label)
+        if source:
+            pending[source].append(instance.pk)
+    for source, object_ids in pending.items():
+        enqueue(source, object_ids)
+
+
+def _service(service_type, services):
+    if service_type not in services:
+        name, icon = SERVICE_DEFAULTS[service_type]
+        service = Service.objects.filter(service_type=service_type).order_by('id').first()
+        services[service_type] = service or Service.objects.create(
+            name=name, service_type=service_type, description=name, icon=icon)
+    return services[service_type]
+
+
+def sync(source, object_ids, services=None):
+    """
+    Upsert the ServiceRequest mirrors of some rows, and delete those of rows
+    that no longer exist.
+
+    Args:
+        source: A SOURCES key
+        object_ids: Ids of rows of that source
+        services: Dict reused across calls to cache Service lookups
+
+    Returns:
+        int: Mirrors written
+    """
+    label, service_type, related, statuses, fields = SOURCES[source]
+    object_ids = set(object_ids)
+    rows = list(apps.get_model(label).objects.filter(id__in=object_ids).select_related(*related))
+    service = _service(service_type, {} if services is None else services)
+
+    # A finished row completed when it first reached a final status
+    finished = dict(
+        StatusTransition.objects.filter(entity=source, object_id__in=object_ids,
+                                        to_status__in=TERMINAL_STATUSES[source])
+        .values_list('object_id').annotate(at=Min('created_at')).order_by()
+    )
+    values = {row.pk: fields(row) for row in rows}
+    providers = dict(
+        ServiceProvider.objects.filter(user_id__in={v['provider_user_id'] for v in values.values()} - {None})
+        .values_list('user_id', 'id')
+    )
+    requests = []
+    for row in rows:
+        value = values[row.pk]
+        status = statuses.get(row.status, 'pending')
+        completed_at = None
+        if status in ('completed', 'cancelled'):
+            completed_at = finished.get(row.pk) or getattr(row, 'resolved_at', None) or row.updated_at
+        requests.append(ServiceRequest(
+            service=service, citizen_id=value['citizen_id'], provider_id=providers.get(value['provider_user_id']),
+            title=value['title'][:200], description=value['description'], status=status,
+            priority=value['priority'], reference_id=reference_id(source, row.pk), created_at=row.created_at,
+            completed_at=completed_at,
+        ))
+    ServiceRequest.objects.bulk_create(requests, batch_size=500, update_conflicts=True,
+                                       unique_fields=['reference_id'], update_fields=_SYNCED_FIELDS)
+    gone = object_ids - set(values)
+    if gone:
+        ServiceRequest.objects.filter(reference_id__in=[reference_id(source, pk) for pk in gone]).delete()
+    return len(requests)
+
+
+def drain(batch_size=DRAIN_BATCH):
+    """
+    Apply the oldest outbox entries and delete them.
+
+    Returns:
+        int: Entries applied; 0 when the outbox is empty
+    """
+    entries = OutboxEntry.objects.order_by('id').values_list('id', 'source', 'object_id')
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    if not skip_locked:
+        # Read before the transaction: on SQLite a transaction that reads
+        # before it writes fails instead of waiting for a concurrent writer
+        entries = list(entries[:batch_size])
+        if not entries:
+            return 0
+    with transaction.atomic():
+        if skip_locked:
+            # Concurrent drainers lock and take different entries
+            entries = list(entries.select_for_update(skip_locked=True)[:batch_size])
+        # Deleting first makes this transaction the writer before it reads the
+        # rows; an entry another drainer applied meanwhile is already gone,
+        # and syncing its row again only rewrites the same mirror
+        OutboxEntry.objects.filter(id__in=[entry_id for entry_id, _, _ in entries]).delete()
+        pending = defaultdict(set)
+        for entry_id, source, object_id in entries:
+            pending[source].add(object_id)
+        services = {}
+        for source, object_ids in pending.items():
+            sync(source, object_ids, services)
+    return len(entries)
+
+
+def _instance_saved(sender, instance, **kwargs):
+    try:
+        with transaction.atomic():
+            enqueue(_SOURCE_BY_LABEL[sender._meta.label], [instance.pk])
+    except Exception as e:
+        # Analytics must never break the write that triggered them
+        logger.error(f"Failed to enqueue {sender._meta.label} {instance.pk}: {e}")
+
+
+def connect_signals():
+    for label, source in _SOURCE_BY_LABEL.items():
+        model = apps.get_model(label)
+        post_save.connect(_instance_saved, sender=model, dispatch_uid=f'outbox-{source}-save')
+        post_delete.connect(_instance_saved, sender=model, dispatch_uid=f'outbox-{source}-delete')
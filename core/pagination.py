@@ -0,0 +1,11 @@
+"""
+Pagination classes for endpoints that page their results.
+"""
+from rest_framework.pagination import PageNumberPagination
+
+
+class StandardPagination(PageNumberPagination):
+    """``?page=`` and ``?page_size=`` as documented under Pagination in API_DOCUMENTATION.md"""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
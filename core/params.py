@@ -0,0 +1,32 @@
+"""
+Parsing of query parameters shared by several endpoints.
+"""
+from django.utils.dateparse import parse_date
+
+
+def date_params(query_params, names=('from', 'to')):
+    """
+    Parse optional YYYY-MM-DD query parameters.
+
+    Args:
+        query_params: The request's query_params
+        names: Parameters to parse
+
+    Returns:
+        dict: Name -> date for each parameter given
+
+    Raises:
+        ValueError: For the first parameter that is malformed or not a real
+            date (e.g. 2024-02-30), with a message fit for a 400 response
+    """
+    dates = {}
+    for name in names:
+        value = query_params.get(name)
+        if value:
+            try:
+                dates[name] = parse_date(value)
+            except ValueError:
+                dates[name] = None
+            if dates[name] is None:
+                raise ValueError(f'{name} must be a valid YYYY-MM-DD date')
+    return dates
@@ -1,13 +1,14 @@
 from rest_framework import serializers
 from .models import Service, ServiceProvider, ServiceRequest, DataExchange, SystemMetrics
+from .mixins import DynamicFieldsMixin
 
-class ServiceSerializer(serializers.ModelSerializer):
+class ServiceSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Service
         fields = '__all__'
         read_only_fields = ['created_by', 'created_at', 'updated_at']
 
-class ServiceProviderSerializer(serializers.ModelSerializer):
+class ServiceProviderSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user_details = serializers.SerializerMethodField()
     
     class Meta:
@@ -21,7 +22,7 @@ class ServiceProviderSerializer(serializers.ModelSerializer):
             'email': obj.user.email
         }
 
-class ServiceRequestSerializer(serializers.ModelSerializer):
+class ServiceRequestSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     service_name = serializers.CharField(source='service.name', read_only=True)
     citizen_name = serializers.CharField(source='citizen.get_full_name', read_only=True)
     
@@ -36,12 +37,12 @@ class ServiceRequestSerializer(serializers.ModelSerializer):
         validated_data['reference_id'] = f"REQ-{uuid.uuid4().hex[:8].upper()}"
         return super().create(validated_data)
 
-class DataExchangeSerializer(serializers.ModelSerializer):
+class DataExchangeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = DataExchange
         fields = '__all__'
 
-class SystemMetricsSerializer(serializers.ModelSerializer):
+class SystemMetricsSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = SystemMetrics
         fields = '__all__'
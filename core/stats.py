@@ -0,0 +1,27 @@
+"""
+Shared pieces of the staff dashboard figures.
+
+Each app computes its figures in one conditional-aggregation query
+(city_services.stats, agriculture.stats), and the admin dashboard reads its
+own from the status history. Results are cached per user for STATS_TTL
+seconds, since the dashboards refetch them on every pushed event.
+"""
+from django.core.cache import cache
+from django.utils import timezone
+
+STATS_TTL = 30
+
+
+def month_start(now=None):
+    """Midnight on the first day of the current month, in the local time zone"""
+    return timezone.localtime(now).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def hours(value):
+    """A duration as hours to one decimal place, or None"""
+    return round(value.total_seconds() / 3600, 1) if value is not None else None
+
+
+def cached(app, user, compute):
+    """compute(user) for a dashboard, cached for STATS_TTL seconds"""
+    return cache.get_or_set(f'dashboard-stats:{app}:{user.pk}', lambda: compute(user), STATS_TTL)
@@ -0,0 +1,258 @@
+"""
+Delta sync for offline-first clients.
+
+The mobile app keeps local copies of the user's complaints, appointments,
+medical records, farmer queries and agri updates. Instead of refetching
+whole lists it sends back the opaque cursor it got for each resource and
+receives only rows changed since then, ordered by ``(updated_at, id)``, plus
+the ids of rows deleted since then (from the Tombstone log). Child rows
+(responses, advisories, prescriptions) touch their parent's ``updated_at``
+so a parent is re-sent when its nested data changes.
+
+``updated_at`` and tombstone ids are assigned when a transaction writes, not
+when it commits, so a change can become visible behind a cursor the client
+already holds. The first page after a finished sync therefore also re-reads
+everything written in the SYNC_OVERLAP before that cursor was issued;
+clients upsert by id, so rows and deletions seen twice are harmless.
+"""
+import base64
+import json
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.apps import apps
+from django.db.models import Max, Q
+from django.db.models.signals import post_save, post_delete
+from django.utils import timezone
+
+from .models import Tombstone
+
+logger = logging.getLogger(__name__)
+
+SYNC_PAGE_SIZE = 200
+SYNC_MAX_PAGE_SIZE = 500
+
+# Clients whose cursor is older than this must discard local data and resync
+TOMBSTONE_RETENTION = timedelta(days=30)
+
+# Longest a write transaction is expected to take between stamping a row
+# and committing it
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+def _complaints(user):
+    from city_services.models import Complaint
+    from city_services.serializers import ComplaintSerializer
+    from city_services.views import ComplaintViewSet
+    queryset = Complaint.objects.select_related('category', 'citizen', 'assigned_to__user')
+    if user.role == 'citizen':
+        queryset = queryset.filter(citizen=user)
+    return queryset, ComplaintSerializer, ComplaintViewSet.compact_fields
+
+
+def _appointments(user):
+    from healthcare.models import Appointment
+    from healthcare.serializers import AppointmentSerializer
+    from healthcare.views import AppointmentViewSet
+    queryset = Appointment.objects.select_related('doctor__user', 'patient__risk_score')
+    if user.role == 'doctor':
+        queryset = queryset.filter(doctor__user=user)
+    elif user.role == 'citizen':
+        queryset = queryset.filter(patient=user)
+    return queryset, AppointmentSerializer, AppointmentViewSet.compact_fields
+
+
+def _medical_records(user):
+    from healthcare.models import MedicalRecord
+    from healthcare.serializers import MedicalRecordSerializer
+    from healthcare.views import MedicalRecordViewSet
+    queryset = MedicalRecord.objects.select_related('doctor__user', 'patient')
+    if user.role == 'doctor':
+        queryset = queryset.filter(doctor__user=user)
+    elif user.role == 'citizen':
+        queryset = queryset.filter(patient=user)
+    return queryset, MedicalRecordSerializer, MedicalRecordViewSet.compact_fields
+
+
+def _farmer_queries(user):
+    from agriculture.models import FarmerQuery
+    from agriculture.serializers import FarmerQuerySerializer
+    from agriculture.views import FarmerQueryViewSet
+    queryset = FarmerQuery.objects.select_related('farmer', 'crop_category')
+    if user.role == 'citizen':
+        queryset = queryset.filter(farmer=user)
+    return queryset, FarmerQuerySerializer, FarmerQueryViewSet.compact_fields
+
+
+def _agri_updates(user):
+    from agriculture.models import AgriUpdate
+    from agriculture.serializers import AgriUpdateSerializer
+    from agriculture.views import AgriUpdateViewSet
+    queryset = AgriUpdate.objects.select_related('officer__user', 'crop_category')
+    return queryset, AgriUpdateSerializer, AgriUpdateViewSet.compact_fields
+
+
+# Resource -> (model label, scoped queryset loader, roles that only see their
+# own rows, owners of an instance for tombstones, prefetches for full rows)
+SYNC_RESOURCES = {
+    'complaints': (
+        'city_services.Complaint', _complaints, {'citizen'},
+        lambda obj: [obj.citizen_id],
+        ['responses__staff__user'],
+    ),
+    'appointments': (
+        'healthcare.Appointment', _appointments, {'doctor', 'citizen'},
+        lambda obj: [obj.patient_id, obj.doctor.user_id],
+        [],
+    ),
+    'medical_records': (
+        'healthcare.MedicalRecord', _medical_records, {'doctor', 'citizen'},
+        lambda obj: [obj.patient_id] + ([obj.doctor.user_id] if obj.doctor_id else []),
+        ['prescriptions'],
+    ),
+    'farmer_queries': (
+        'agriculture.FarmerQuery', _farmer_queries, {'citizen'},
+        lambda obj: [obj.farmer_id],
+        ['advisories__officer__user'],
+    ),
+    'agri_updates': (
+        'agriculture.AgriUpdate', _agri_updates, set(),
+        lambda obj: [None],
+        [],
+    ),
+}
+
+# Child model label -> foreign key of the synced parent it is nested in
+NESTED_CHILDREN = {
+    'city_services.ComplaintResponse': 'complaint',
+    'agriculture.AgriAdvisory': 'query',
+    'healthcare.Prescription': 'medical_record',
+}
+
+RESOURCE_BY_LABEL = {label: name for name, (label, *_) in SYNC_RESOURCES.items()}
+
+
+def encode_cursor(updated_at, last_id, tombstone_id, rescan=True):
+    state = {
+        't': updated_at.isoformat() if updated_at else None,
+        'i': last_id,
+        'd': tombstone_id,
+        'at': int(timezone.now().timestamp()),
+        'r': rescan,
+    }
+    return base64.urlsafe_b64encode(json.dumps(state).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return ``(updated_at, last_id, tombstone_id, issued_at, rescan)``; raises ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        updated_at = datetime.fromisoformat(state['t']) if state['t'] else None
+        issued_at = datetime.fromtimestamp(state['at'], tz=dt_timezone.utc)
+        return updated_at, int(state['i']), int(state['d']), issued_at, bool(state.get('r', True))
+    except (TypeError, KeyError, AttributeError, json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise ValueError(f"Malformed cursor: {e}")
+
+
+def sync_resource(name, user, cursor=None, limit=SYNC_PAGE_SIZE, full=False, request=None):
+    """
+    Collect one page of changes to a resource since a cursor.
+
+    Args:
+        name: Key of SYNC_RESOURCES
+        user: Authenticated user; rows are scoped like the resource's viewset
+        cursor: Cursor from a previous sync, or None for an initial sync
+        limit: Maximum number of changed rows and of deleted ids returned
+        full: Serialize full rows instead of the compact list projection
+        request: Request passed to serializers for absolute URLs
+
+    Returns:
+        dict: changed rows, deleted ids, the next cursor, has_more and reset
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    label, loader, scoped_roles, _, prefetch = SYNC_RESOURCES[name]
+    queryset, serializer_class, compact_fields = loader(user)
+
+    tombstones = Tombstone.objects.filter(resource=name)
+    if user.role in scoped_roles:
+        tombstones = tombstones.filter(owner=user)
+
+    state = decode_cursor(cursor) if cursor else None
+    reset = bool(state) and state[3] < timezone.now() - TOMBSTONE_RETENTION
+    if state is None or reset:
+        # A fresh copy has nothing to delete; start after the newest tombstone
+        updated_at, last_id, rescan_since = None, 0, None
+        tombstone_id = Tombstone.objects.filter(resource=name).aggregate(last=Max('id'))['last'] or 0
+    else:
+        updated_at, last_id, tombstone_id, issued_at, rescan = state
+        # Mid-catch-up pages only move forward, so paging always ends
+        rescan_since = issued_at - SYNC_OVERLAP if rescan else None
+
+    if updated_at is not None:
+        after = Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=last_id)
+        if rescan_since is not None:
+            after |= Q(updated_at__gte=rescan_since)
+        queryset = queryset.filter(after)
+    deleted_after = Q(id__gt=tombstone_id)
+    if rescan_since is not None:
+        deleted_after |= Q(deleted_at__gte=rescan_since)
+    if full and prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    rows = list(queryset.order_by('updated_at', 'id')[:limit + 1])
+    deletions = list(tombstones.filter(deleted_after).order_by('id').values_list('id', 'object_id')[:limit + 1])
+    has_more = len(rows) > limit or len(deletions) > limit
+    rows, deletions = rows[:limit], deletions[:limit]
+
+    if rows:
+        updated_at, last_id = rows[-1].updated_at, rows[-1].id
+    if deletions:
+        tombstone_id = max(tombstone_id, deletions[-1][0])
+
+    serializer = serializer_class(
+        rows, many=True, context={'request': request},
+        **({} if full else {'fields': compact_fields})
+    )
+    return {
+        'changed': serializer.data,
+        'deleted': sorted({object_id for _, object_id in deletions}),
+        'cursor': encode_cursor(updated_at, last_id, tombstone_id, rescan=not has_more),
+        'has_more': has_more,
+        'reset': state is None or reset,
+    }
+
+
+def prune_tombstones():
+    """Delete tombstones past the retention window; returns the number removed"""
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=timezone.now() - TOMBSTONE_RETENTION).delete()
+    return deleted
+
+
+def _instance_deleted(sender, instance, **kwargs):
+    name = RESOURCE_BY_LABEL[sender._meta.label]
+    owners = SYNC_RESOURCES[name][3]
+    try:
+        Tombstone.objects.bulk_create([
+            Tombstone(resource=name, object_id=instance.pk, owner_id=owner_id)
+            for owner_id in set(owners(instance))
+        ])
+    except Exception as e:
+        logger.error(f"Failed to record tombstone for {sender._meta.label} {instance.pk}: {e}")
+
+
+def _child_changed(sender, instance, **kwargs):
+    field = sender._meta.get_field(NESTED_CHILDREN[sender._meta.label])
+    parent_id = getattr(instance, field.attname)
+    if parent_id:
+        field.related_model.objects.filter(pk=parent_id).update(updated_at=timezone.now())
+
+
+def connect_signals():
+    for label in RESOURCE_BY_LABEL:
+        post_delete.connect(_instance_deleted, sender=apps.get_model(label), dispatch_uid=f'sync-{label}-delete')
+    for label in NESTED_CHILDREN:
+        model = apps.get_model(label)
+        post_save.connect(_child_changed, sender=model, dispatch_uid=f'sync-{label}-save')
+        post_delete.connect(_child_changed, sender=model, dispatch_uid=f'sync-{label}-delete')
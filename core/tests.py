@@ -1,3 +1,404 @@
-from django.test import TestCase
+import json
+import shutil
+import tempfile
+import warnings
+from datetime import timedelta
+from io import BytesIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from accounts.models import CustomUser
+from city_services.models import CityStaff, Complaint, ComplaintCategory, ComplaintResponse
+from city_services.views import ComplaintViewSet
+from dpi_platform import benchmark, utils
+from dpi_platform.lookup import CATEGORICAL_FEATURES
+
+from . import events, outbox, thumbnails
+from .models import OutboxEntry, Service, ServiceRequest
+
+
+class ModelEquivalenceTests(SimpleTestCase):
+    """The fast inference paths must answer exactly like the sklearn models"""
+
+    def test_risk_scorer_matches_sklearn(self):
+        models = [utils.diabetes_model, utils.heart_model, utils.cancer_model]
+        self.assertIsNone(utils.risk_scorer.fallback)
+        self.assertLess(utils.risk_scorer.verify(utils.scaler, models), 1e-9)
+
+    def test_flat_forests_match_sklearn(self):
+        for forest in (utils.crop_forest, utils.yield_forest):
+            self.assertIsNone(forest.fallback)
+            self.assertEqual(forest.verify(), (0.0, 0))
+
+    def test_crop_lookup_matches_forests(self):
+        if utils.crop_lookup is None:
+            self.skipTest('crop_lookup.npz missing or stale; run build_crop_lookup')
+        rng = np.random.default_rng(1)
+        farms = [
+            {
+                **{name: rng.choice(utils.encoders[name].classes_) for name in CATEGORICAL_FEATURES},
+                'land_size': float(rng.uniform(0.5, 6)),
+            }
+            for _ in range(2000)
+        ]
+        X = np.column_stack(
+            [utils.encoders[name].transform([farm[name] for farm in farms]) for name in CATEGORICAL_FEATURES]
+            + [[farm['land_size'] for farm in farms]]
+        )
+        expected = zip(utils.crop_forest.predict(X), utils.yield_forest.predict(X))
+        for farm, (crop, yield_level) in zip(farms, expected):
+            self.assertEqual(utils.crop_lookup.predict(farm), (crop, yield_level))
+
+
+class MLBenchmarkTests(SimpleTestCase):
+
+    def test_every_path_is_measured(self):
+        # Timings are judged by manage.py benchmark_ml, not the unit suite;
+        # a few calls per path are enough to see each metric is produced
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            metrics = benchmark.run_benchmarks(iterations=5, batch_size=10, load_repeats=1)
+        keys = list(benchmark.LATENCY_BUDGETS_MS) + [f'{path}.p50_ms' for pair in benchmark.FAST_PATHS for path in pair]
+        for key in keys:
+            if key.startswith('crop_lookup') and utils.crop_lookup is None:
+                continue
+            self.assertIn(key, metrics)
+
+    def test_fast_path_no_faster_than_its_model_is_a_regression(self):
+        metrics = {'calibration_ms': 10.0, 'crop_forest.p50_ms': 0.1, 'crop_model.p50_ms': 0.15}
+        regressions = benchmark.find_regressions(metrics, [])
+        self.assertEqual(len(regressions), 1)
+        self.assertIn('crop_forest', regressions[0])
+
+    def test_slowdown_against_history_is_a_regression(self):
+        baseline = {'calibration_ms': 10.0, 'crop_forest.p50_ms': 0.1, 'crop_forest.rows_per_s': 100000.0}
+        history = [{'environment': {}, 'metrics': baseline}] * 3
+
+        self.assertEqual(benchmark.find_regressions(dict(baseline), history), [])
+        slower = dict(baseline, **{'crop_forest.p50_ms': 0.3, 'crop_forest.rows_per_s': 40000.0})
+        regressions = benchmark.find_regressions(slower, history)
+        self.assertEqual(len(regressions), 2)
+
+    def test_slower_host_is_not_a_regression(self):
+        baseline = {'calibration_ms': 10.0, 'crop_forest.p50_ms': 0.1, 'crop_forest.rows_per_s': 100000.0}
+        history = [{'environment': {}, 'metrics': baseline}] * 3
+        busy_host = {'calibration_ms': 20.0, 'crop_forest.p50_ms': 0.2, 'crop_forest.rows_per_s': 50000.0}
+        self.assertEqual(benchmark.find_regressions(busy_host, history), [])
+
+    def test_latency_budget_is_enforced_without_history(self):
+        regressions = benchmark.find_regressions({'calibration_ms': 10.0, 'risk_scorer.p99_ms': 5.0}, [])
+        self.assertEqual(len(regressions), 1)
+
+
+class OutboxDrainTests(TestCase):
+
+    def setUp(self):
+        citizen = CustomUser.objects.create_user(username='cit', password='pw123456xx', role='citizen')
+        self.complaint = Complaint.objects.create(
+            citizen=citizen, category=ComplaintCategory.objects.create(name='Roads', description='r'),
+            title='Pothole', description='Deep pothole', location='Area A', complaint_id='CMP-1')
+
+    def mirrors(self):
+        return list(ServiceRequest.objects.values_list('reference_id', 'status'))
+
+    def test_changes_collapse_into_one_upserted_mirror(self):
+        reference = outbox.reference_id('complaint', self.complaint.pk)
+        self.complaint.status = 'in_progress'
+        self.complaint.save()
+        self.assertEqual(OutboxEntry.objects.count(), 2)
+        self.assertEqual(outbox.drain(), 2)
+        self.assertEqual(self.mirrors(), [(reference, 'in_progress')])
+
+        self.complaint.status = 'resolved'
+        self.complaint.save()
+        outbox.drain()
+        self.assertEqual(self.mirrors(), [(reference, 'completed')])
+        self.complaint.delete()
+        outbox.drain()
+        self.assertEqual(self.mirrors(), [])
+        self.assertEqual(outbox.drain(), 0)
+
+    def test_failed_batch_stays_queued(self):
+        with mock.patch.object(outbox, 'sync', side_effect=OperationalError('database is locked')):
+            with self.assertRaises(OperationalError):
+                outbox.drain()
+        self.assertEqual(OutboxEntry.objects.count(), 1)
+
+    def test_worker_backs_off_after_failures(self):
+        drains = [OperationalError('database is locked'), OperationalError('database is locked'), 1, 0,
+                  KeyboardInterrupt]
+        with mock.patch.object(outbox, 'drain', side_effect=drains), \
+                mock.patch('core.management.commands.drain_outbox.time.sleep') as sleep:
+            with self.assertRaises(KeyboardInterrupt), self.assertLogs('core.management.commands.drain_outbox'):
+                call_command('drain_outbox', interval=5)
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [5, 10, 5])
+
+
+class DeltaSyncTests(TestCase):
+
+    def setUp(self):
+        self.citizen = CustomUser.objects.create_user(username='cit', password='pw123456xx', role='citizen')
+        other = CustomUser.objects.create_user(username='other', password='pw123456xx', role='citizen')
+        self.roads = ComplaintCategory.objects.create(name='Roads', description='r')
+        self.complaints = [self.complaint(index) for index in range(3)]
+        self.complaint(3, citizen=other)
+        self.client = APIClient()
+        self.client.force_authenticate(self.citizen)
+
+    def complaint(self, index, citizen=None):
+        return Complaint.objects.create(citizen=citizen or self.citizen, category=self.roads, title='Pothole',
+                                        description='Deep pothole', location='Area A', complaint_id=f'CMP-{index}')
+
+    def sync(self, cursor=None, limit=200):
+        params = {'resources': 'complaints', 'limit': limit}
+        if cursor:
+            params['complaints'] = cursor
+        response = self.client.get('/api/sync/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['resources']['complaints']
+
+    def ids(self, page):
+        return [row['id'] for row in page['changed']]
+
+    def test_initial_sync_returns_the_users_rows(self):
+        page = self.sync()
+        self.assertTrue(page['reset'])
+        self.assertFalse(page['has_more'])
+        self.assertEqual(self.ids(page), [complaint.id for complaint in self.complaints])
+
+    def test_cursor_pages_until_has_more_is_false(self):
+        first = self.sync(limit=2)
+        self.assertTrue(first['has_more'])
+        second = self.sync(first['cursor'], limit=2)
+        self.assertFalse(second['reset'])
+        self.assertFalse(second['has_more'])
+        self.assertEqual(self.ids(first) + self.ids(second), [complaint.id for complaint in self.complaints])
+
+    def test_deletions_are_delivered_as_tombstones(self):
+        cursor = self.sync()['cursor']
+        deleted = self.complaints.pop().pk
+        Complaint.objects.filter(pk=deleted).delete()
+        page = self.sync(cursor)
+        self.assertEqual(page['deleted'], [deleted])
+        self.assertNotIn(deleted, self.ids(page))
+
+    def test_late_commits_behind_the_cursor_are_resent(self):
+        late = self.complaints[0]
+        cursor = self.sync()['cursor']
+        # Stamped before the sync's newest row but committed after it
+        Complaint.objects.filter(pk=late.pk).update(status='in_progress',
+                                                    updated_at=self.complaints[-1].updated_at - timedelta(seconds=1))
+        page = self.sync(cursor)
+        self.assertIn(late.id, self.ids(page))
+
+    def test_old_rows_are_not_resent(self):
+        Complaint.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        cursor = self.sync()['cursor']
+        self.assertEqual(self.sync(cursor)['changed'], [])
+
+    def test_garbage_cursor_is_rejected(self):
+        response = self.client.get('/api/sync/', {'resources': 'complaints', 'complaints': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Invalid cursor for complaints'})
+
+
+class AdminDashboardTests(TestCase):
+
+    def test_status_history_figures_are_cached(self):
+        admin = CustomUser.objects.create_user(username='admin', password='pw123456xx', role='admin')
+        client = APIClient()
+        client.force_authenticate(admin)
+        with mock.patch('core.views.transitions.resolution_time', return_value=None) as resolution_time:
+            first = client.get('/api/core/dashboard/stats/').json()
+            second = client.get('/api/core/dashboard/stats/').json()
+        self.assertEqual(resolution_time.call_count, 3)
+        self.assertEqual(first['performance'], {'healthcare': 0, 'city_services': 0, 'agriculture': 0})
+        self.assertEqual(second['time_in_state'], first['time_in_state'])
+
+    def tearDown(self):
+        cache.clear()
+
+
+class ConditionalListTests(TestCase):
+
+    def setUp(self):
+        Service.objects.create(name='Clinic', service_type='healthcare', description='c', icon='+')
+        Service.objects.create(name='Retired', service_type='city', description='r', icon='-', is_active=False)
+        self.client = APIClient()
+
+    def get(self, **headers):
+        return self.client.get('/api/core/services/', headers=headers)
+
+    def test_matching_etag_is_not_modified(self):
+        etag = self.get()['ETag']
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_writes_change_the_etag(self):
+        etag = self.get()['ETag']
+        Service.objects.create(name='Farm help', service_type='agriculture', description='f', icon='*')
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_varies_by_role_and_accept(self):
+        citizen_etag = self.get()['ETag']
+        self.assertNotEqual(self.get(accept='text/html')['ETag'], citizen_etag)
+
+        admin = CustomUser.objects.create_user(username='admin', password='pw123456xx', role='admin')
+        self.client.force_authenticate(admin)
+        # The admin's list includes inactive services, so a citizen's validator must not match it
+        response = self.get(if_none_match=citizen_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Retired', response.content.decode())
+        self.assertIn('Authorization', response['Vary'])
+
+
+class EventStreamTests(TestCase):
+
+    def setUp(self):
+        self.staff = CustomUser.objects.create_user(username='staff', password='pw123456xx', role='city_staff',
+                                                    is_approved=True)
+
+    def ticket(self):
+        api = APIClient()
+        api.force_authenticate(self.staff)
+        response = api.post('/api/core/events/ticket/')
+        self.assertEqual(response.status_code, 204)
+        return response.cookies['event_stream']
+
+    def stream(self, cookie=None, **headers):
+        if cookie is not None:
+            self.client.cookies['event_stream'] = cookie
+        return self.client.get('/api/core/events/', headers=headers)
+
+    def messages(self, response):
+        body = b''.join(response.streaming_content).decode()
+        return [message for message in body.split('\n\n') if message.startswith('id: ') and 'data:' in message]
+
+    def test_missing_or_tampered_cookie_is_unauthorized(self):
+        self.assertEqual(self.stream().status_code, 401)
+        cookie = self.ticket().value
+        self.assertEqual(self.stream(cookie[:-1] + ('0' if cookie[-1] != '0' else '1')).status_code, 401)
+
+    def test_ticket_cookie_authenticates(self):
+        cookie = self.ticket()
+        self.assertTrue(cookie['httponly'])
+        self.assertEqual(cookie['path'], '/api/core/events/')
+        response = self.stream(cookie.value)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+    def test_resumes_after_last_event_id_with_own_events_only(self):
+        citizen = CustomUser.objects.create_user(username='cit', password='pw123456xx', role='citizen')
+        events.publish('complaint', 'created', 1, {}, [{'role': 'city_staff'}])
+        seen = events.latest_event_id()
+        events.publish('complaint', 'updated', 1, {}, [{'role': 'city_staff'}])
+        events.publish('complaint', 'updated', 2, {}, [{'user_id': self.staff.id}])
+        events.publish('complaint', 'updated', 3, {}, [{'role': 'agri_officer'}, {'user_id': citizen.id}])
+
+        messages = self.messages(self.stream(self.ticket().value, last_event_id=str(seen)))
+        self.assertEqual([json.loads(message.split('data: ', 1)[1])['id'] for message in messages], [1, 2])
+        self.assertTrue(all(int(message.split('\n')[0][4:]) > seen for message in messages))
+
+
+class FieldProjectionTests(TestCase):
+
+    def setUp(self):
+        citizen = CustomUser.objects.create_user(username='cit', password='pw123456xx', role='citizen')
+        staff_user = CustomUser.objects.create_user(username='staff', password='pw123456xx', role='city_staff',
+                                                    is_approved=True)
+        staff = CityStaff.objects.create(user=staff_user, department='Roads', designation='Engineer',
+                                         employee_id='C1', jurisdiction='Zone A')
+        category = ComplaintCategory.objects.create(name='Roads', description='r')
+        self.complaint = Complaint.objects.create(
+            citizen=citizen, category=category, title='Pothole', description='Deep', location='Street 1',
+            complaint_id='CMP-1', assigned_to=staff
+        )
+        self.response = ComplaintResponse.objects.create(complaint=self.complaint, staff=staff, message='On it')
+        self.client = APIClient()
+        self.client.force_authenticate(staff_user)
+
+    def get(self, **params):
+        return self.client.get(f'/api/city/complaints/{self.complaint.pk}/', params).json()
+
+    def test_full_representation_without_arguments(self):
+        data = self.get()
+        self.assertEqual(data['responses'][0]['message'], 'On it')
+        self.assertIn('description', data)
+
+    def test_fields_keeps_only_the_named_fields(self):
+        self.assertEqual(self.get(fields='id,title'), {'id': self.complaint.pk, 'title': 'Pothole'})
+
+    def test_expandable_fields_collapse_to_pks_unless_expanded(self):
+        self.assertEqual(self.get(fields='id,responses')['responses'], [self.response.pk])
+        self.assertEqual(self.get(expand='responses')['responses'][0]['message'], 'On it')
+        # Dotted fields project the nested serializer and imply expanding it
+        self.assertEqual(self.get(fields='id,responses.message')['responses'], [{'message': 'On it'}])
+
+    def test_compact_view_returns_the_list_card_fields(self):
+        data = self.client.get('/api/city/complaints/', {'view': 'compact'}).json()
+        results = data['results'] if isinstance(data, dict) else data
+        self.assertEqual(set(results[0]), set(ComplaintViewSet.compact_fields))
+        # An explicit ?fields= wins over the compact view
+        data = self.client.get('/api/city/complaints/', {'view': 'compact', 'fields': 'id'}).json()
+        results = data['results'] if isinstance(data, dict) else data
+        self.assertEqual(results, [{'id': self.complaint.pk}])
+
+
+class ThumbnailTests(TestCase):
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media))
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def upload(self, name, color='red', size=(1200, 800)):
+        buffer = BytesIO()
+        Image.new('RGB', size, color).save(buffer, format='PNG')
+        return default_storage.save(f'complaints/{name}', ContentFile(buffer.getvalue()))
+
+    def field(self, name):
+        complaint = Complaint(image=name)
+        return complaint.image
+
+    def test_renders_a_bounded_jpeg(self):
+        name = thumbnails.get_thumbnail_name(self.field(self.upload('a.png')))
+        self.assertTrue(name.startswith('thumbnails/') and name.endswith('_320x320.jpg'))
+        with default_storage.open(name) as f:
+            image = Image.open(f)
+            self.assertEqual((image.format, image.size), ('JPEG', (320, 213)))
+
+    def test_identical_uploads_share_a_rendition(self):
+        first = thumbnails.get_thumbnail_name(self.field(self.upload('a.png')))
+        second = thumbnails.get_thumbnail_name(self.field(self.upload('b.png')))
+        other = thumbnails.get_thumbnail_name(self.field(self.upload('c.png', color='blue')))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+
+    def test_later_calls_do_not_reread_the_image(self):
+        field = self.field(self.upload('a.png'))
+        name = thumbnails.get_thumbnail_name(field)
+        with mock.patch.object(thumbnails, '_render') as render, \
+                mock.patch.object(type(field), 'open', side_effect=AssertionError('re-read')):
+            self.assertEqual(thumbnails.get_thumbnail_name(field), name)
+        render.assert_not_called()
+
+    def test_missing_or_broken_images_give_no_thumbnail(self):
+        self.assertIsNone(thumbnails.get_thumbnail_name(self.field(None)))
+        broken = default_storage.save('complaints/broken.png', ContentFile(b'not an image'))
+        with self.assertLogs('core.thumbnails', 'WARNING'):
+            self.assertIsNone(thumbnails.get_thumbnail_name(self.field(broken)))
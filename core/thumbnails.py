@@ -0,0 +1,85 @@
+"""
+Thumbnail renditions for uploaded images.
+
+List cards only need a small preview, so images are rendered once into a
+JPEG thumbnail named after the SHA-1 of the original file's content and
+stored under MEDIA_ROOT/thumbnails/. Identical uploads share a rendition and
+a re-uploaded image gets a fresh one automatically.
+"""
+import hashlib
+import logging
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZE = (320, 320)
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_DIR = 'thumbnails'
+
+
+def _rendition_name(digest, size):
+    width, height = size
+    return f"{THUMBNAIL_DIR}/{digest[:2]}/{digest}_{width}x{height}.jpg"
+
+
+def _render(data, size):
+    image = Image.open(BytesIO(data))
+    image.thumbnail(size)
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, format='JPEG', quality=THUMBNAIL_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def get_thumbnail_name(image_field, size=THUMBNAIL_SIZE):
+    """
+    Return the storage name of the thumbnail for an image, creating it if needed.
+
+    Args:
+        image_field: FieldFile of an ImageField (may be empty)
+        size: (width, height) bounding box of the rendition
+
+    Returns:
+        str: Storage name of the thumbnail, or None if there is no usable image
+    """
+    if not image_field:
+        return None
+
+    # The original's storage name is unique, so the hash lookup is cached on it
+    # to avoid re-reading the full image on every list request.
+    cache_key = f"thumbnail:{image_field.name}:{size[0]}x{size[1]}"
+    name = cache.get(cache_key)
+    if name:
+        return name
+
+    try:
+        image_field.open('rb')
+        try:
+            data = image_field.read()
+        finally:
+            image_field.close()
+
+        name = _rendition_name(hashlib.sha1(data).hexdigest(), size)
+        if not default_storage.exists(name):
+            name = default_storage.save(name, ContentFile(_render(data, size)))
+    except Exception as e:
+        logger.warning(f"Could not create thumbnail for {image_field.name}: {e}")
+        return None
+
+    cache.set(cache_key, name, None)
+    return name
+
+
+def get_thumbnail_url(image_field, request=None, size=THUMBNAIL_SIZE):
+    """Absolute (when a request is available) URL of an image's thumbnail"""
+    name = get_thumbnail_name(image_field, size)
+    if not name:
+        return None
+    url = default_storage.url(name)
+    return request.build_absolute_uri(url) if request else url
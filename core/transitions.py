@@ -0,0 +1,125 @@
+"""
+Append-only status history.
+
+Every status change of a complaint, farmer query or appointment is written
+as a StatusTransition in the same transaction as the change itself, with
+creation recorded as a transition from "" to the initial status. Time spent
+in each state and resolution latency are then read from the log instead of
+being guessed from each row's current status.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Avg, DurationField, ExpressionWrapper, F, Min, Q
+from django.utils import timezone
+
+# Statuses after which an entity needs no more work
+TERMINAL_STATUSES = {
+    'complaint': ('resolved', 'closed'),
+    'farmer_query': ('answered', 'closed'),
+    'appointment': ('completed', 'cancelled', 'no_show'),
+}
+
+
+def record(entity, changes, actor=None, at=None):
+    """
+    Log status changes; call inside the transaction that makes them.
+
+    Args:
+        entity: A TERMINAL_STATUSES key
+        changes: Iterable of (object_id, from_status, to_status); from_status
+            is "" for a new object, and entries whose status did not change
+            are ignored
+        actor: The user making the change, if any
+        at: Time of the change (default: now)
+
+    Returns:
+        int: Transitions written
+    """
+    from .models import StatusTransition
+
+    at = at or timezone.now()
+    rows = [
+        StatusTransition(entity=entity, object_id=object_id, from_status=from_status, to_status=to_status,
+                         actor=actor if actor is not None and actor.is_authenticated else None, created_at=at)
+        for object_id, from_status, to_status in changes
+        if from_status != to_status
+    ]
+    StatusTransition.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+def resolution_time(entity, since=None):
+    """
+    Average time from creation to the first terminal status.
+
+    Args:
+        entity: A TERMINAL_STATUSES key
+        since: Only objects that reached a terminal status after this time
+
+    Returns:
+        timedelta or None if none have
+    """
+    from .models import StatusTransition
+
+    spans = (
+        StatusTransition.objects.filter(entity=entity)
+        .values('object_id')
+        .annotate(
+            opened=Min('created_at', filter=Q(from_status='')),
+            finished=Min('created_at', filter=Q(to_status__in=TERMINAL_STATUSES[entity])),
+        )
+        .filter(opened__isnull=False, finished__isnull=False)
+        .order_by()
+    )
+    if since is not None:
+        spans = spans.filter(finished__gte=since)
+    span = ExpressionWrapper(F('finished') - F('opened'), output_field=DurationField())
+    return spans.aggregate(average=Avg(span))['average']
+
+
+def time_in_state(entity, since, now=None):
+    """
+    Average time objects spent in each status.
+
+    Counts every stay that ended, or is still running, after ``since``; a
+    stay still running is measured up to now.
+
+    Args:
+        entity: A TERMINAL_STATUSES key
+        since: Start of the window
+
+    Returns:
+        dict: status -> average timedelta; the terminal status an object
+        ended in is not a stay
+    """
+    from .models import StatusTransition
+
+    now = now or timezone.now()
+    # Whole histories of the objects that changed in the window
+    changed = StatusTransition.objects.filter(entity=entity, created_at__gte=since).values('object_id')
+    rows = (
+        StatusTransition.objects.filter(entity=entity, object_id__in=changed)
+        .order_by('object_id', 'id')
+        .values_list('object_id', 'to_status', 'created_at')
+    )
+    totals, stays = defaultdict(timedelta), defaultdict(int)
+    previous = None
+    for object_id, status, at in rows.iterator(chunk_size=2000):
+        if previous is not None and previous[0] == object_id and at >= since:
+            totals[previous[1]] += at - previous[2]
+            stays[previous[1]] += 1
+        if previous is not None and previous[0] != object_id:
+            _close_stay(previous, now, entity, totals, stays)
+        previous = (object_id, status, at)
+    if previous is not None:
+        _close_stay(previous, now, entity, totals, stays)
+    return {status: totals[status] / stays[status] for status in totals}
+
+
+def _close_stay(last, now, entity, totals, stays):
+    # An object's current status, unless it is finished, has lasted until now
+    object_id, status, at = last
+    if status not in TERMINAL_STATUSES[entity]:
+        totals[status] += now - at
+        stays[status] += 1
@@ -8,5 +8,7 @@ router.register('requests', views.ServiceRequestViewSet, basename='service-reque
 
 urlpatterns = [
     path('dashboard/stats/', views.dashboard_stats, name='dashboard-stats'),
+    path('events/', views.event_stream, name='event-stream'),
+    path('events/ticket/', views.event_ticket, name='event-ticket'),
     path('', include(router.urls)),
 ]
@@ -0,0 +1,120 @@
+"""
+Per-collection version stamps for conditional GET.
+
+Catalog endpoints (services, categories, doctors, agri updates) are polled on
+every portal load but change rarely. Each collection has a CollectionVersion
+row that is bumped from model signals whenever something it serializes
+changes; list views derive their ETag/Last-Modified from those rows instead
+of re-serializing the collection.
+"""
+import hashlib
+
+from django.apps import apps
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.utils import timezone
+
+from .models import CollectionVersion
+
+# Model label -> collections whose list payload includes that model's data
+TRACKED_MODELS = {
+    'core.Service': ['services'],
+    'city_services.ComplaintCategory': ['complaint_categories'],
+    'agriculture.CropCategory': ['crop_categories', 'agri_updates'],
+    'agriculture.AgriUpdate': ['agri_updates'],
+    'agriculture.AgriOfficer': ['agri_updates'],
+    'healthcare.Doctor': ['doctors'],
+}
+
+# Users and their profiles are embedded in doctor cards and agri update cards
+ROLE_COLLECTIONS = {
+    'doctor': ['doctors'],
+    'agri_officer': ['agri_updates'],
+}
+
+
+def bump_collections(*names):
+    """Advance the version stamp of each named collection"""
+    now = timezone.now()
+    for name in names:
+        updated = CollectionVersion.objects.filter(name=name).update(
+            version=F('version') + 1, updated_at=now
+        )
+        if updated:
+            continue
+        try:
+            with transaction.atomic():
+                CollectionVersion.objects.create(name=name, version=1, updated_at=now)
+        except IntegrityError:
+            # Another request created the row first
+            CollectionVersion.objects.filter(name=name).update(
+                version=F('version') + 1, updated_at=now
+            )
+
+
+def get_collection_stamp(names, variant=''):
+    """
+    Build conditional GET validators for a set of collections.
+
+    Args:
+        names: Collection names the response depends on
+        variant: Anything else the payload varies on (path, role, ...)
+
+    Returns:
+        tuple: (etag, last_modified) where last_modified is a datetime or None
+    """
+    versions = {
+        row.name: row
+        for row in CollectionVersion.objects.filter(name__in=names)
+    }
+    parts = [variant]
+    last_modified = None
+    for name in sorted(names):
+        row = versions.get(name)
+        if row is None:
+            parts.append(f"{name}:0")
+            continue
+        parts.append(f"{name}:{row.version}:{row.updated_at.timestamp()}")
+        if last_modified is None or row.updated_at > last_modified:
+            last_modified = row.updated_at
+    etag = hashlib.sha1('|'.join(parts).encode()).hexdigest()
+    return etag, last_modified
+
+
+def _model_changed(sender, instance, **kwargs):
+    bump_collections(*TRACKED_MODELS[sender._meta.label])
+
+
+def _user_changed(sender, instance, **kwargs):
+    update_fields = kwargs.get('update_fields')
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    names = ROLE_COLLECTIONS.get(instance.role)
+    if names:
+        bump_collections(*names)
+
+
+def _profile_changed(sender, instance, **kwargs):
+    # The user row may already be gone when a profile is deleted by cascade
+    role = apps.get_model('accounts.CustomUser').objects.filter(
+        pk=instance.user_id
+    ).values_list('role', flat=True).first()
+    names = ROLE_COLLECTIONS.get(role)
+    if names:
+        bump_collections(*names)
+
+
+def connect_signals():
+    for label in TRACKED_MODELS:
+        model = apps.get_model(label)
+        post_save.connect(_model_changed, sender=model, dispatch_uid=f'versioning-{label}-save')
+        post_delete.connect(_model_changed, sender=model, dispatch_uid=f'versioning-{label}-delete')
+
+    user_model = apps.get_model('accounts.CustomUser')
+    post_save.connect(_user_changed, sender=user_model, dispatch_uid='versioning-user-save')
+    post_delete.connect(_user_changed, sender=user_model, dispatch_uid='versioning-user-delete')
+
+    profile_model = apps.get_model('accounts.UserProfile')
+    post_save.connect(_profile_changed, sender=profile_model, dispatch_uid='versioning-profile-save')
+    post_delete.connect(_profile_changed, sender=profile_model, dispatch_uid='versioning-profile-delete')
@@ -1,16 +1,35 @@
+import asyncio
+import time
+from asgiref.sync import sync_to_async
+from django.core import signing
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 from rest_framework import viewsets, status
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from . import events, sync, transitions
+from .mixins import ConditionalListMixin, FieldProjectionMixin
 from .models import Service, ServiceProvider, ServiceRequest, SystemMetrics
 from .serializers import (
     ServiceSerializer, ServiceProviderSerializer, 
     ServiceRequestSerializer, SystemMetricsSerializer
 )
+from .stats import cached
 
-class ServiceViewSet(viewsets.ModelViewSet):
+# Server-Sent Events stream tuning (seconds)
+EVENT_POLL_INTERVAL = 2
+EVENT_KEEPALIVE_INTERVAL = 15
+EVENT_STREAM_LIFETIME = 300  # Clients reconnect with Last-Event-ID after this
+EVENT_RETRY_MS = 3000
+EVENT_COOKIE = 'event_stream'
+EVENT_COOKIE_AGE = 3600  # Dashboards fetch a new cookie once it expires
+
+class ServiceViewSet(ConditionalListMixin, FieldProjectionMixin, viewsets.ModelViewSet):
     """Service registry management"""
     serializer_class = ServiceSerializer
+    version_collections = ['services']
     
     def get_queryset(self):
         user = self.request.user
@@ -26,7 +45,7 @@ class ServiceViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
-class ServiceRequestViewSet(viewsets.ModelViewSet):
+class ServiceRequestViewSet(FieldProjectionMixin, viewsets.ModelViewSet):
     """Unified service request tracking"""
     queryset = ServiceRequest.objects.all()
     serializer_class = ServiceRequestSerializer
@@ -45,6 +64,27 @@ class ServiceRequestViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(citizen=self.request.user)
 
+def _status_history(user):
+    """Admin dashboard figures read from the status history"""
+    from django.utils import timezone
+
+    # Average minutes from creation to a final status
+    performance = {}
+    for key, entity in (('healthcare', 'appointment'), ('city_services', 'complaint'),
+                        ('agriculture', 'farmer_query')):
+        average = transitions.resolution_time(entity)
+        performance[key] = int(average.total_seconds() / 60) if average else 0
+
+    # Average minutes spent in each status over the last 30 days
+    since = timezone.now() - timezone.timedelta(days=30)
+    time_in_state = {
+        entity: {state: int(average.total_seconds() / 60)
+                 for state, average in transitions.time_in_state(entity, since).items()}
+        for entity in transitions.TERMINAL_STATUSES
+    }
+    return {'performance': performance, 'time_in_state': time_in_state}
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def dashboard_stats(request):
@@ -91,7 +131,6 @@ def dashboard_stats(request):
     if request.user.is_authenticated and hasattr(request.user, 'role') and request.user.role == 'admin':
         from accounts.models import ApprovalRequest
         from django.utils import timezone
-        from django.db.models import Avg, F, ExpressionWrapper, DurationField
         from .models import SystemMetrics
         
         stats['pending_approvals'] = ApprovalRequest.objects.filter(status='pending').count()
@@ -120,24 +159,8 @@ def dashboard_stats(request):
             })
         stats['daily_activity'] = daily_activity
 
-        # Calculate performance metrics
-        performance = {}
-        for stype in ['healthcare', 'city', 'agriculture']:
-            avg_duration = ServiceRequest.objects.filter(
-                service__service_type=stype,
-                status='completed',
-                completed_at__isnull=False
-            ).annotate(
-                duration=ExpressionWrapper(F('completed_at') - F('created_at'), output_field=DurationField())
-            ).aggregate(avg_time=Avg('duration'))['avg_time']
-            
-            key = stype if stype != 'city' else 'city_services'
-            if avg_duration:
-                performance[key] = int(avg_duration.total_seconds() / 60)
-            else:
-                performance[key] = 0
-        
-        stats['performance'] = performance
+        # Both scan the status history, so they are cached like the staff dashboards
+        stats.update(cached('admin', request.user, _status_history))
 
         # Fetch latest system metrics
         latest_metrics = SystemMetrics.objects.first()
@@ -155,3 +178,121 @@ def dashboard_stats(request):
             }
     
     return Response(stats)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def delta_sync(request):
+    """
+    Changes since the client's per-resource cursors.
+    
+    ``?resources=complaints,appointments`` picks resources (default: all) and
+    ``?complaints=<cursor>`` passes the cursor returned by the last sync;
+    omit it for an initial sync.
+    """
+    names = request.query_params.get('resources')
+    names = [name.strip() for name in names.split(',') if name.strip()] if names else list(sync.SYNC_RESOURCES)
+    unknown = [name for name in names if name not in sync.SYNC_RESOURCES]
+    if unknown:
+        return Response({'error': f"Unknown resources: {', '.join(unknown)}"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        limit = min(int(request.query_params.get('limit', sync.SYNC_PAGE_SIZE)), sync.SYNC_MAX_PAGE_SIZE)
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    if limit < 1:
+        return Response({'error': 'limit must be positive'}, status=status.HTTP_400_BAD_REQUEST)
+    full = request.query_params.get('view') == 'full'
+    
+    results = {}
+    for name in names:
+        try:
+            results[name] = sync.sync_resource(
+                name, request.user, request.query_params.get(name) or None,
+                limit=limit, full=full, request=request
+            )
+        except ValueError:
+            return Response({'error': f'Invalid cursor for {name}'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({'resources': results})
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def event_ticket(request):
+    """
+    Let the browser open the event stream.
+
+    EventSource cannot send an Authorization header and a token in the URL
+    ends up in access logs, so the stream authenticates with a short-lived
+    signed cookie scoped to its own path instead.
+    """
+    response = Response(status=status.HTTP_204_NO_CONTENT)
+    response.set_signed_cookie(
+        EVENT_COOKIE, request.user.pk, salt=EVENT_COOKIE, max_age=EVENT_COOKIE_AGE,
+        path=reverse('event-stream'), secure=request.is_secure(), httponly=True, samesite='Strict'
+    )
+    return response
+
+
+def _stream_user(request):
+    """Resolve the stream's user from the session or the cookie set by event_ticket"""
+    if request.user.is_authenticated:
+        return request.user
+    from accounts.models import CustomUser
+    try:
+        user_id = request.get_signed_cookie(EVENT_COOKIE, salt=EVENT_COOKIE, max_age=EVENT_COOKIE_AGE)
+    except (KeyError, signing.BadSignature):
+        return None
+    return CustomUser.objects.filter(pk=user_id, is_active=True).first()
+
+
+async def _live_events(user, last_id):
+    fetch = sync_to_async(events.events_for_user)
+    yield f"retry: {EVENT_RETRY_MS}\n\n"
+    # Sets the resume point even if no event follows before a reconnect
+    yield f"id: {last_id}\n\n"
+    started = last_write = time.monotonic()
+    while time.monotonic() - started < EVENT_STREAM_LIFETIME:
+        batch = await fetch(user, last_id)
+        for event in batch:
+            last_id = event.id
+            yield events.format_sse(event)
+        if batch:
+            last_write = time.monotonic()
+        elif time.monotonic() - last_write >= EVENT_KEEPALIVE_INTERVAL:
+            yield ": keepalive\n\n"
+            last_write = time.monotonic()
+        await asyncio.sleep(EVENT_POLL_INTERVAL)
+
+
+def _pending_events(user, last_id):
+    # WSGI workers cannot hold connections open: send what is pending and let
+    # EventSource reconnect after EVENT_RETRY_MS, i.e. long-polling
+    yield f"retry: {EVENT_RETRY_MS}\n\n"
+    yield f"id: {last_id}\n\n"
+    for event in events.events_for_user(user, last_id):
+        yield events.format_sse(event)
+
+
+async def event_stream(request):
+    """Server-Sent Events stream of create/update events for the current user"""
+    user = await sync_to_async(_stream_user)(request)
+    if user is None:
+        return JsonResponse({'error': 'Unauthorized'}, status=401)
+    
+    try:
+        last_id = int(request.headers.get('Last-Event-ID') or request.GET['last_event_id'])
+    except (KeyError, ValueError):
+        # New subscription: only events from now on
+        last_id = await sync_to_async(events.latest_event_id)()
+    
+    if isinstance(request, ASGIRequest):
+        stream = _live_events(user, last_id)
+    else:
+        stream = _pending_events(user, last_id)
+    
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
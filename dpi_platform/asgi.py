@@ -3,6 +3,10 @@ ASGI config for dpi_platform project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the platform through this callable (e.g. ``uvicorn dpi_platform.asgi:application``)
+so the dashboard event stream at /api/core/events/ stays open and pushes
+changes as they happen; under WSGI it degrades to long-polling.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -0,0 +1,279 @@
+"""
+Micro-benchmarks for the ML models in dpi_platform.utils.
+
+Measures how long each pickle takes to load, single-row latency (p50/p99) of
+every inference path the API uses, and batch throughput. Passing runs are appended
+to a JSON history file together with library versions and a fingerprint of
+the model files, and each new run is compared with the median of recent runs
+so a slower model file or library upgrade fails loudly instead of quietly
+slowing down predict_disease and recommend_crop.
+"""
+import json
+import os
+import platform
+import time
+import warnings
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+import sklearn
+
+from . import utils
+from .lookup import CATEGORICAL_FEATURES, model_fingerprint
+from .scoring import patient_features
+
+MODEL_DIR = os.path.join(utils.BASE_DIR, 'ml')
+PICKLES = (
+    'diabetes_model', 'heart_model', 'cancer_model', 'scaler',
+    'crop_model', 'yield_model', 'agri_encoders',
+)
+
+# Absolute p99 budgets (ms) for the per-request paths, independent of history
+LATENCY_BUDGETS_MS = {
+    'risk_scorer.p99_ms': 1.0,
+    'crop_lookup.p99_ms': 1.0,
+    'crop_forest.p99_ms': 5.0,
+    'yield_forest.p99_ms': 5.0,
+}
+
+# Metrics where larger is better; everything else is a duration
+HIGHER_IS_BETTER = ('rows_per_s',)
+
+# p99 of a few hundred calls is dominated by scheduler noise, so it is only
+# held to the absolute budgets above, not compared between runs
+UNCOMPARED = ('p99_ms',)
+
+# Duration changes smaller than this are timer noise, whatever the ratio
+NOISE_FLOOR_MS = 0.05
+
+# (fast path, the model it replaces): the fast path's p50 must be at least
+# MIN_SPEEDUP times lower, or it no longer earns its place
+FAST_PATHS = (
+    ('risk_scorer', 'diabetes_model'),
+    ('crop_forest', 'crop_model'),
+    ('yield_forest', 'yield_model'),
+    ('crop_lookup', 'crop_forest'),
+)
+MIN_SPEEDUP = 2
+
+
+def _sample_patients(count, rng):
+    return [
+        patient_features({
+            'age': int(rng.integers(18, 90)),
+            'gender': rng.choice(['M', 'F']),
+            'bmi': float(rng.uniform(16, 40)),
+            'smoking': rng.choice(['low', 'moderate', 'high']),
+            'alcohol': rng.choice(['low', 'moderate', 'high']),
+            'activity': rng.choice(['low', 'moderate', 'high']),
+            'family_diabetes': bool(rng.integers(0, 2)),
+            'family_heart': bool(rng.integers(0, 2)),
+            'family_cancer': bool(rng.integers(0, 2)),
+        })
+        for _ in range(count)
+    ]
+
+
+def _sample_farms(count, rng):
+    """Cleaned FarmerForm dicts and the matching label-encoded rows"""
+    farms = [
+        {
+            **{name: rng.choice(utils.encoders[name].classes_) for name in CATEGORICAL_FEATURES},
+            'land_size': float(rng.uniform(0.5, 6)),
+        }
+        for _ in range(count)
+    ]
+    X = np.column_stack(
+        [utils.encoders[name].transform([farm[name] for farm in farms]) for name in CATEGORICAL_FEATURES]
+        + [[farm['land_size'] for farm in farms]]
+    ).astype(np.float64)
+    return farms, X
+
+
+def _percentiles_ms(fn, args, iterations):
+    timings = np.empty(iterations)
+    for index in range(iterations):
+        start = time.perf_counter()
+        fn(args[index % len(args)])
+        timings[index] = time.perf_counter() - start
+    return float(np.percentile(timings, 50) * 1e3), float(np.percentile(timings, 99) * 1e3)
+
+
+def _throughput(fn, batch, repeats):
+    # Best of several runs: interference only ever makes a run slower
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(batch)
+        timings.append(time.perf_counter() - start)
+    return len(batch) / min(timings)
+
+
+def _calibration_ms(repeats=5):
+    """
+    Time a fixed reference workload.
+
+    Small NumPy calls and a pure-Python loop stand in for the mix of call
+    overhead and arithmetic in model inference. Metrics are compared in units
+    of this time, so a run on a busier or slower host is not a regression.
+    """
+    a = np.random.default_rng(0).random((64, 64))
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(300):
+            np.sort(a @ a, axis=1)
+        total = 0
+        for value in range(50000):
+            total += value % 7
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1e3
+
+
+def run_benchmarks(iterations=500, batch_size=10000, load_repeats=5, seed=0):
+    """
+    Measure every model.
+
+    Args:
+        iterations: Single-row calls timed per inference path
+        batch_size: Rows per throughput batch
+        load_repeats: joblib.load calls timed per pickle (fastest is kept)
+        seed: Seed for the synthetic inputs
+
+    Returns:
+        dict: Flat ``{"<model>.<metric>": value}`` mapping
+    """
+    rng = np.random.default_rng(seed)
+    metrics = {'calibration_ms': _calibration_ms()}
+
+    with warnings.catch_warnings():
+        # Unpickling with a newer sklearn and array inputs to DataFrame-fitted
+        # models both warn on every call
+        warnings.simplefilter('ignore')
+
+        for name in PICKLES:
+            path = os.path.join(MODEL_DIR, f'{name}.pkl')
+            timings = []
+            for _ in range(load_repeats):
+                start = time.perf_counter()
+                joblib.load(path)
+                timings.append(time.perf_counter() - start)
+            metrics[f'{name}.load_ms'] = min(timings) * 1e3
+
+        patients = np.array(_sample_patients(max(batch_size, 256), rng), dtype=np.float64)
+        farms, farm_rows = _sample_farms(max(batch_size, 256), rng)
+        single_patients = [patients[index:index + 1] for index in range(256)]
+        single_farms = [farm_rows[index:index + 1] for index in range(256)]
+
+        def sklearn_risk(model):
+            return lambda X: model.predict_proba(utils.scaler.transform(X))
+
+        paths = {
+            # name: (single-row callable, single-row inputs, batch callable, batch input)
+            'risk_scorer': (utils.risk_scorer.predict, single_patients, utils.risk_scorer.predict, patients),
+            'diabetes_model': (sklearn_risk(utils.diabetes_model), single_patients,
+                               sklearn_risk(utils.diabetes_model), patients),
+            'heart_model': (sklearn_risk(utils.heart_model), single_patients,
+                            sklearn_risk(utils.heart_model), patients),
+            'cancer_model': (sklearn_risk(utils.cancer_model), single_patients,
+                             sklearn_risk(utils.cancer_model), patients),
+            'crop_forest': (utils.crop_forest.predict, single_farms, utils.crop_forest.predict, farm_rows),
+            'yield_forest': (utils.yield_forest.predict, single_farms, utils.yield_forest.predict, farm_rows),
+            'crop_model': (utils.crop_model.predict, single_farms, utils.crop_model.predict, farm_rows),
+            'yield_model': (utils.yield_model.predict, single_farms, utils.yield_model.predict, farm_rows),
+        }
+        if utils.crop_lookup is not None:
+            lookup = utils.crop_lookup.predict
+            paths['crop_lookup'] = (lookup, farms[:256], lambda batch: [lookup(farm) for farm in batch], farms)
+
+        for name, (single, single_inputs, batch, batch_input) in paths.items():
+            # sklearn calls cost milliseconds; cap them so a run stays short
+            count = iterations if name.endswith(('_scorer', '_forest', '_lookup')) else min(iterations, 100)
+            single(single_inputs[0])  # warm up
+            p50, p99 = _percentiles_ms(single, single_inputs, count)
+            metrics[f'{name}.p50_ms'] = p50
+            metrics[f'{name}.p99_ms'] = p99
+            metrics[f'{name}.rows_per_s'] = _throughput(batch, batch_input[:batch_size], repeats=5)
+
+    return metrics
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__,
+        'machine': platform.machine(),
+        'models': model_fingerprint(MODEL_DIR, [f'{name}.pkl' for name in PICKLES])[:16],
+    }
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def append_history(path, metrics, env, keep=200):
+    history = load_history(path)
+    history.append({
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': env,
+        'metrics': metrics,
+    })
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(history[-keep:], f, indent=2)
+
+
+def find_regressions(metrics, history, tolerance=0.5, baseline_runs=5, machine=None):
+    """
+    Compare a run with the median of recent runs, the absolute budgets and
+    the models each fast path replaces.
+
+    Args:
+        metrics: Output of run_benchmarks()
+        history: Earlier runs from load_history()
+        tolerance: Allowed relative slowdown, e.g. 0.5 for 50%
+        baseline_runs: Number of most recent runs the baseline is taken from
+        machine: Only compare with runs recorded on this machine type
+
+    Returns:
+        list: Human-readable descriptions of each regression
+    """
+    if machine is not None:
+        history = [run for run in history if run['environment'].get('machine') == machine]
+    recent = [run for run in history if 'calibration_ms' in run['metrics']][-baseline_runs:]
+
+    regressions = []
+    for fast, slow in FAST_PATHS:
+        fast_ms, slow_ms = metrics.get(f'{fast}.p50_ms'), metrics.get(f'{slow}.p50_ms')
+        if fast_ms is not None and slow_ms is not None and fast_ms * MIN_SPEEDUP > slow_ms:
+            regressions.append(f'{fast}.p50_ms = {fast_ms:.3f} is not {MIN_SPEEDUP}x faster than {slow} ({slow_ms:.3f})')
+
+    for key, value in sorted(metrics.items()):
+        budget = LATENCY_BUDGETS_MS.get(key)
+        if budget is not None and value > budget:
+            regressions.append(f'{key} = {value:.3f} exceeds the {budget} ms budget')
+
+        if key == 'calibration_ms' or key.endswith(UNCOMPARED):
+            continue
+        # Rescale earlier runs to this run's host speed
+        speed = metrics['calibration_ms']
+        if key.endswith(HIGHER_IS_BETTER):
+            previous = [run['metrics'][key] * run['metrics']['calibration_ms'] / speed
+                        for run in recent if key in run['metrics']]
+        else:
+            previous = [run['metrics'][key] * speed / run['metrics']['calibration_ms']
+                        for run in recent if key in run['metrics']]
+        if not previous:
+            continue
+        baseline = float(np.median(previous))
+        if key.endswith(HIGHER_IS_BETTER):
+            if value < baseline / (1 + tolerance):
+                regressions.append(f'{key} = {value:,.0f} dropped from a baseline of {baseline:,.0f}')
+        elif value > baseline * (1 + tolerance) and value - baseline > NOISE_FLOOR_MS:
+            regressions.append(f'{key} = {value:.3f} rose from a baseline of {baseline:.3f}')
+    return regressions
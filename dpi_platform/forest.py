@@ -0,0 +1,170 @@
+"""
+Array-based inference for the crop and yield random forests.
+
+sklearn walks each of the 120 trees separately and re-validates its input on
+every call, which dominates the cost of scoring one row. FlatForest copies
+every tree of a fitted RandomForestClassifier into one set of contiguous node
+arrays (feature, threshold, children, value) and walks a block of rows
+through all trees at once, one tree level per NumPy step.
+"""
+import logging
+import warnings
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Rows walked together; keeps the (trees x rows) node matrix cache-sized
+CHUNK_ROWS = 512
+
+
+def _sklearn_proba(forest, X):
+    with warnings.catch_warnings():
+        # The forests were fitted on DataFrames; plain arrays are expected here
+        warnings.filterwarnings('ignore', message='X does not have valid feature names')
+        return forest.predict_proba(np.asarray(X, dtype=np.float64))
+
+
+class FlatForest:
+    """Random forest classifier flattened into contiguous NumPy arrays"""
+
+    def __init__(self, forest):
+        """
+        Flatten a fitted single-output RandomForestClassifier.
+
+        Args:
+            forest: The sklearn forest; kept as the fallback if verification fails
+        """
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            # children[2 * node + went_left]; leaves point at themselves so rows
+            # that finish a shallow tree early stay on their leaf
+            pairs = np.empty(2 * tree.node_count, dtype=np.intp)
+            pairs[0::2] = np.where(is_leaf, nodes, tree.children_right) + offset
+            pairs[1::2] = np.where(is_leaf, nodes, tree.children_left) + offset
+            children.append(pairs)
+
+            # Same normalisation as DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :].astype(np.float64)
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(value / normalizer)
+
+            roots.append(offset)
+            offset += tree.node_count
+
+        # sklearn compares float32 features against float64 thresholds. For a
+        # float32 x, x <= t exactly when x <= t rounded down to float32.
+        threshold = np.concatenate(thresholds)
+        threshold32 = threshold.astype(np.float32)
+        rounded_up = threshold32.astype(np.float64) > threshold
+        threshold32[rounded_up] = np.nextafter(threshold32[rounded_up], np.float32(-np.inf))
+
+        # Deepest trees first, so each level only walks a prefix of the trees
+        depths = np.array([estimator.tree_.max_depth for estimator in forest.estimators_])
+        order = np.argsort(-depths, kind='stable')
+
+        self.feature = np.concatenate(features).astype(np.intp)
+        self.threshold = threshold32
+        self.children = np.concatenate(children)
+        self.value = np.ascontiguousarray(np.concatenate(values).T)  # (classes, nodes)
+        self.roots = np.array(roots, dtype=np.intp)[order]
+        self.active_trees = [int(np.sum(depths > level)) for level in range(int(depths.max()))]
+        self.classes = np.asarray(forest.classes_)
+        self.n_features = forest.n_features_in_
+        self.fallback = None
+        self._forest = forest
+
+    @classmethod
+    def from_estimator(cls, forest):
+        """Flatten a forest and verify it, falling back to sklearn on any mismatch"""
+        flat = cls(forest)
+        error, mismatches = flat.verify()
+        if error > 1e-9 or mismatches:
+            logger.error(
+                f"Flattened forest differs from sklearn (max error {error:.3g}, "
+                f"{mismatches} labels); using sklearn predict"
+            )
+            flat.fallback = forest
+        return flat
+
+    @property
+    def node_count(self):
+        return len(self.feature)
+
+    def predict_proba(self, X):
+        """
+        Class probabilities averaged over all trees.
+
+        Args:
+            X: Array-like of shape (n, features), already label-encoded
+
+        Returns:
+            ndarray: (n, classes) probabilities in ``classes`` order
+        """
+        if self.fallback is not None:
+            return _sklearn_proba(self.fallback, X)
+
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        X = np.ascontiguousarray(X)
+        proba = np.empty((len(X), len(self.value)))
+        for start in range(0, len(X), CHUNK_ROWS):
+            flat = X[start:start + CHUNK_ROWS].ravel()
+            base = np.arange(len(flat) // self.n_features) * self.n_features
+            nodes = np.repeat(self.roots[:, None], len(base), axis=1)  # (trees, rows)
+            for count in self.active_trees:
+                current = nodes[:count]
+                went_left = flat[base + self.feature[current]] <= self.threshold[current]
+                nodes[:count] = self.children[2 * current + went_left]
+            for index, class_value in enumerate(self.value):
+                proba[start:start + CHUNK_ROWS, index] = class_value[nodes].sum(axis=0)
+        proba /= len(self.roots)
+        return proba
+
+    def predict(self, X):
+        """Most probable class label for each row"""
+        return self.classes[np.argmax(self.predict_proba(X), axis=1)]
+
+    def _probe_inputs(self, size=2048):
+        # Values on, just above and around split thresholds exercise the
+        # float32 comparison boundaries
+        rng = np.random.default_rng(0)
+        X = np.empty((size, self.n_features))
+        for feature in range(self.n_features):
+            splits = self.threshold[(self.feature == feature) & (self.children[1::2] != np.arange(self.node_count))]
+            if len(splits) == 0:
+                X[:, feature] = rng.uniform(-1, 1, size)
+                continue
+            candidates = np.concatenate([
+                splits,
+                np.nextafter(splits, np.float32(np.inf)),
+                rng.uniform(splits.min() - 1, splits.max() + 1, len(splits)),
+            ])
+            X[:, feature] = rng.choice(candidates, size)
+        return X
+
+    def verify(self, X=None):
+        """
+        Compare against the sklearn forest.
+
+        Args:
+            X: Rows to compare on; defaults to probes around the split thresholds
+
+        Returns:
+            tuple: (max absolute probability difference, number of differing labels)
+        """
+        if X is None:
+            X = self._probe_inputs()
+        expected = _sklearn_proba(self._forest, X)
+        actual = self.predict_proba(X)
+        mismatches = int(np.sum(np.argmax(actual, axis=1) != np.argmax(expected, axis=1)))
+        return float(np.max(np.abs(actual - expected))), mismatches
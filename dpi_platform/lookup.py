@@ -0,0 +1,146 @@
+"""
+Precomputed crop and yield recommendations.
+
+Five of the six recommend_crop inputs are small categorical domains
+(28 districts x 2 seasons x 6 soils x 2 irrigation x 3 rainfall = 2016
+combinations) and the forests only look at land_size through their split
+thresholds. Between two consecutive thresholds every tree takes the same
+path, so evaluating each combination once per threshold interval gives a
+table that reproduces the forests exactly. It is built offline with
+``manage.py build_crop_lookup`` and is tied to the model files by a
+fingerprint, so a retrained model is never answered from a stale table.
+"""
+import hashlib
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CATEGORICAL_FEATURES = ('location', 'season', 'soil_type', 'irrigation', 'rainfall')
+LAND_SIZE_FEATURE = len(CATEGORICAL_FEATURES)
+MODEL_FILES = ('crop_model.pkl', 'yield_model.pkl', 'agri_encoders.pkl')
+
+
+def model_fingerprint(model_dir, files=MODEL_FILES):
+    """SHA-256 over the given pickles; by default the ones the table is derived from"""
+    digest = hashlib.sha256()
+    for name in files:
+        with open(os.path.join(model_dir, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _land_breakpoints(*forests):
+    """Sorted float32 land_size split thresholds across FlatForests"""
+    splits = []
+    for forest in forests:
+        is_split = forest.children[1::2] != np.arange(forest.node_count)
+        splits.append(forest.threshold[is_split & (forest.feature == LAND_SIZE_FEATURE)])
+    return np.unique(np.concatenate(splits)).astype(np.float32)
+
+
+class CropLookup:
+    """Crop and yield class per categorical combination and land_size interval"""
+
+    def __init__(self, categories, breakpoints, crop_codes, yield_codes, crop_classes, yield_classes, fingerprint):
+        self.categories = [list(values) for values in categories]
+        self.breakpoints = breakpoints
+        self.crop_codes = crop_codes
+        self.yield_codes = yield_codes
+        self.crop_classes = crop_classes
+        self.yield_classes = yield_classes
+        self.fingerprint = str(fingerprint)
+        self._index = [{value: code for code, value in enumerate(values)} for values in self.categories]
+        self._radix = np.cumprod([1] + [len(values) for values in self.categories[:0:-1]])[::-1]
+
+    @classmethod
+    def build(cls, encoders, crop_forest, yield_forest, fingerprint):
+        """
+        Evaluate both forests over the full grid.
+
+        Interval i holds land sizes with exactly i breakpoints below them. A
+        tree sends x <= t left, so the breakpoint itself is a representative
+        of its own interval and the last interval is represented by the next
+        float32 above the largest breakpoint.
+
+        Args:
+            encoders: LabelEncoders keyed by feature name
+            crop_forest: FlatForest of crop_model
+            yield_forest: FlatForest of yield_model
+            fingerprint: model_fingerprint() of the files they were loaded from
+
+        Returns:
+            CropLookup
+        """
+        categories = [encoders[name].classes_ for name in CATEGORICAL_FEATURES]
+        breakpoints = _land_breakpoints(crop_forest, yield_forest)
+        land_sizes = np.append(breakpoints, np.nextafter(breakpoints[-1], np.float32(np.inf)))
+
+        grid = np.stack(np.meshgrid(*[np.arange(len(values)) for values in categories], indexing='ij'), -1)
+        combos = grid.reshape(-1, len(categories))
+        X = np.empty((len(combos) * len(land_sizes), len(categories) + 1), dtype=np.float32)
+        X[:, :-1] = np.repeat(combos, len(land_sizes), axis=0)
+        X[:, -1] = np.tile(land_sizes, len(combos))
+
+        shape = (len(combos), len(land_sizes))
+        crop_codes = np.argmax(crop_forest.predict_proba(X), axis=1).astype(np.uint8).reshape(shape)
+        yield_codes = np.argmax(yield_forest.predict_proba(X), axis=1).astype(np.uint8).reshape(shape)
+        return cls(categories, breakpoints, crop_codes, yield_codes,
+                   crop_forest.classes, yield_forest.classes, fingerprint)
+
+    def save(self, path):
+        # Labels are stored as unicode arrays so loading never needs pickle
+        arrays = {f'category_{index}': np.asarray(values, dtype=str) for index, values in enumerate(self.categories)}
+        np.savez_compressed(
+            path, breakpoints=self.breakpoints, crop_codes=self.crop_codes, yield_codes=self.yield_codes,
+            crop_classes=np.asarray(self.crop_classes, dtype=str),
+            yield_classes=np.asarray(self.yield_classes, dtype=str),
+            fingerprint=np.asarray(self.fingerprint), **arrays
+        )
+
+    @classmethod
+    def load(cls, path, fingerprint=None):
+        """
+        Load a saved table.
+
+        Args:
+            path: .npz written by save()
+            fingerprint: Expected model_fingerprint(); a mismatch discards the table
+
+        Returns:
+            CropLookup or None if the file is missing, unreadable or stale
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if fingerprint is not None and str(data['fingerprint']) != fingerprint:
+                    logger.warning(f"Ignoring {path}: built from different models; rerun build_crop_lookup")
+                    return None
+                categories = [data[f'category_{index}'] for index in range(len(CATEGORICAL_FEATURES))]
+                return cls(categories, data['breakpoints'], data['crop_codes'], data['yield_codes'],
+                           data['crop_classes'], data['yield_classes'], data['fingerprint'])
+        except Exception as e:
+            logger.error(f"Could not load crop lookup table {path}: {e}")
+            return None
+
+    @property
+    def nbytes(self):
+        return self.crop_codes.nbytes + self.yield_codes.nbytes + self.breakpoints.nbytes
+
+    def predict(self, data):
+        """
+        Look up the crop and yield level for cleaned FarmerForm data.
+
+        Returns:
+            tuple: (crop, yield_level), or None for a combination not in the table
+        """
+        try:
+            codes = [index[data[name]] for index, name in zip(self._index, CATEGORICAL_FEATURES)]
+        except KeyError:
+            return None
+        row = int(np.dot(codes, self._radix))
+        column = int(np.searchsorted(self.breakpoints, np.float32(data['land_size']), side='left'))
+        return str(self.crop_classes[self.crop_codes[row, column]]), str(self.yield_classes[self.yield_codes[row, column]])
@@ -0,0 +1,212 @@
+"""
+Fused NumPy scorer for the healthcare risk models.
+
+The diabetes, heart and cancer models are logistic regressions over the same
+StandardScaler output, so ``sigmoid(coef @ ((x - mean) / scale) + intercept)``
+folds into one affine map: ``sigmoid(x @ W + b)`` with ``W = coef.T / scale``
+and ``b = intercept - (mean / scale) @ coef.T``. Scoring any number of
+patients is then one (n x 9) @ (9 x 3) product, without sklearn's per-call
+input validation.
+"""
+import logging
+import warnings
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RISK_OUTPUTS = ('diabetes', 'heart', 'cancer')
+
+# Same encoding the models were trained with
+LEVEL_MAP = {"low": 0, "moderate": 1, "high": 2}
+
+# Probability above which a risk is flagged for follow-up checkups
+RISK_FLAG_THRESHOLDS = {'diabetes': 0.6, 'heart': 0.5, 'cancer': 0.4}
+
+# Pickles the scorer is built from, for tagging stored scores
+RISK_MODEL_FILES = ('scaler.pkl', 'diabetes_model.pkl', 'heart_model.pkl', 'cancer_model.pkl')
+
+# Largest acceptable difference from sklearn's predict_proba
+VERIFY_TOLERANCE = 1e-9
+
+
+def patient_features(data):
+    """
+    Encode cleaned PatientForm data as a model input row.
+
+    Args:
+        data: dict with age, gender, bmi, smoking, alcohol, activity and family_* flags
+
+    Returns:
+        list: The 9 features in training order
+    """
+    return [
+        data["age"],
+        1 if data["gender"] == "M" else 0,
+        data["bmi"],
+        LEVEL_MAP[data["smoking"]],
+        LEVEL_MAP[data["alcohol"]],
+        LEVEL_MAP[data["activity"]],
+        int(data["family_diabetes"]),
+        int(data["family_heart"]),
+        int(data["family_cancer"]),
+    ]
+
+
+def risk_flags(risks):
+    """Names of the RISK_OUTPUTS whose probability is over its flag threshold"""
+    return [name for name, risk in zip(RISK_OUTPUTS, risks) if risk > RISK_FLAG_THRESHOLDS[name]]
+
+
+def vitals_features(vitals):
+    """
+    Encode the risk inputs recorded in a MedicalRecord's vital_signs.
+
+    Uses the PatientForm keys; bmi may instead be derived from weight_kg and
+    height_cm, and missing family_* flags count as no family history.
+
+    Args:
+        vitals: The vital_signs JSON of one record
+
+    Returns:
+        list: The 9 features in training order, or None if any input is missing or invalid
+    """
+    if not isinstance(vitals, dict):
+        return None
+    try:
+        bmi = vitals.get('bmi')
+        if bmi is None:
+            bmi = float(vitals['weight_kg']) / (float(vitals['height_cm']) / 100) ** 2
+        data = {
+            'age': int(vitals['age']),
+            'gender': str(vitals['gender'])[:1].upper(),
+            'bmi': float(bmi),
+            'smoking': str(vitals['smoking']).lower(),
+            'alcohol': str(vitals['alcohol']).lower(),
+            'activity': str(vitals['activity']).lower(),
+            **{name: bool(vitals.get(name, False)) for name in ('family_diabetes', 'family_heart', 'family_cancer')},
+        }
+    except (KeyError, TypeError, ValueError, ZeroDivisionError):
+        return None
+    if data['gender'] not in ('M', 'F') or not np.isfinite(data['bmi']) or data['bmi'] <= 0 or data['age'] < 0:
+        return None
+    if not all(data[name] in LEVEL_MAP for name in ('smoking', 'alcohol', 'activity')):
+        return None
+    return patient_features(data)
+
+
+# Scorer of a worker process, set by init_worker
+_worker_scorer = None
+
+
+def init_worker(scorer):
+    """ProcessPoolExecutor initializer handing each worker a RiskScorer"""
+    global _worker_scorer
+    _worker_scorer = scorer
+
+
+def score_vitals(rows, scorer=None):
+    """
+    Score a chunk of stored vitals.
+
+    Runs in pool workers, so it only depends on NumPy and the scorer.
+
+    Args:
+        rows: (patient_id, medical_record_id, vital_signs) tuples
+        scorer: RiskScorer; defaults to the one set by init_worker
+
+    Returns:
+        tuple: ([(patient_id, medical_record_id, diabetes, heart, cancer), ...], rows skipped)
+    """
+    scorer = scorer or _worker_scorer
+    kept, features = [], []
+    for patient_id, record_id, vitals in rows:
+        row = vitals_features(vitals)
+        if row is not None:
+            kept.append((patient_id, record_id))
+            features.append(row)
+    if not features:
+        return [], len(rows)
+    risks = scorer.predict(features)
+    scores = [(patient_id, record_id, *map(float, risk)) for (patient_id, record_id), risk in zip(kept, risks)]
+    return scores, len(rows) - len(kept)
+
+
+def _sklearn_predict(scaler, models, X):
+    with warnings.catch_warnings():
+        # The scaler was fitted on a DataFrame; plain arrays are expected here
+        warnings.filterwarnings('ignore', message='X does not have valid feature names')
+        X_scaled = scaler.transform(X)
+    return np.column_stack([model.predict_proba(X_scaled)[:, 1] for model in models])
+
+
+def _sigmoid(z):
+    # exp overflows to inf for very negative z, giving the correct limit 0
+    with np.errstate(over='ignore'):
+        return 1.0 / (1.0 + np.exp(-z))
+
+
+class RiskScorer:
+    """Diabetes, heart and cancer probabilities from one fused affine map"""
+
+    def __init__(self, weights, bias, fallback=None):
+        self.weights = np.ascontiguousarray(weights, dtype=np.float64)
+        self.bias = np.ascontiguousarray(bias, dtype=np.float64)
+        # (scaler, models) used instead of the fused map when verification fails
+        self.fallback = fallback
+
+    @classmethod
+    def from_models(cls, scaler, models):
+        """
+        Fold a fitted StandardScaler into binary LogisticRegression models.
+
+        Args:
+            scaler: StandardScaler shared by the models
+            models: Models in RISK_OUTPUTS order
+
+        Returns:
+            RiskScorer: Verified against the sklearn models, or falling back to them
+        """
+        coef = np.vstack([model.coef_[0] for model in models]).T  # (features, outputs)
+        intercept = np.array([model.intercept_[0] for model in models])
+        mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(coef.shape[0])
+        scale = scaler.scale_ if scaler.scale_ is not None else np.ones(coef.shape[0])
+
+        scorer = cls(coef / scale[:, None], intercept - (mean / scale) @ coef)
+        error = scorer.verify(scaler, models)
+        if error > VERIFY_TOLERANCE:
+            logger.error(f"Fused risk scorer differs from sklearn by {error:.3g}; using sklearn models")
+            scorer.fallback = (scaler, models)
+        return scorer
+
+    def verify(self, scaler, models, X=None):
+        """Largest absolute difference from the sklearn models on probe inputs"""
+        if X is None:
+            X = self._probe_inputs(scaler)
+        return float(np.max(np.abs(self.predict(X) - _sklearn_predict(scaler, models, X))))
+
+    @staticmethod
+    def _probe_inputs(scaler, size=512):
+        rng = np.random.default_rng(0)
+        n_features = scaler.n_features_in_
+        X = rng.integers(0, 3, size=(size, n_features)).astype(np.float64)
+        X[:, 0] = rng.uniform(1, 100, size)   # age
+        X[:, 2] = rng.uniform(12, 50, size)   # bmi
+        return np.vstack([X, scaler.mean_[None, :]]) if scaler.mean_ is not None else X
+
+    def predict(self, X):
+        """
+        Score patients.
+
+        Args:
+            X: Array-like of shape (n, 9) from patient_features
+
+        Returns:
+            ndarray: (n, 3) probabilities in RISK_OUTPUTS order
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        if self.fallback is not None:
+            return _sklearn_predict(*self.fallback, X)
+        return _sigmoid(X @ self.weights + self.bias)
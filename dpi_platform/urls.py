@@ -7,6 +7,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic import TemplateView
 from accounts.views import user_logout
+import core.views
 import healthcare.views
 
 urlpatterns = [
@@ -19,6 +20,7 @@ urlpatterns = [
     path('api/healthcare/', include('healthcare.urls')),
     path('api/city/', include('city_services.urls')),
     path('api/agriculture/', include('agriculture.urls')),
+    path('api/sync/', core.views.delta_sync, name='sync'),
     
     path('social-auth/', include('social_django.urls', namespace='social')),
     
@@ -2,6 +2,10 @@ import joblib
 import numpy as np
 import os
 
+from .forest import FlatForest
+from .lookup import CropLookup, model_fingerprint
+from .scoring import RiskScorer
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # Load Patient Models
@@ -10,7 +14,19 @@ heart_model = joblib.load(os.path.join(BASE_DIR, "ml/heart_model.pkl"))
 cancer_model = joblib.load(os.path.join(BASE_DIR, "ml/cancer_model.pkl"))
 scaler = joblib.load(os.path.join(BASE_DIR, "ml/scaler.pkl"))
 
+# All three models evaluated as one matrix product
+risk_scorer = RiskScorer.from_models(scaler, [diabetes_model, heart_model, cancer_model])
+
 # Load Agriculture Models
 crop_model = joblib.load(os.path.join(BASE_DIR, "ml/crop_model.pkl"))
 yield_model = joblib.load(os.path.join(BASE_DIR, "ml/yield_model.pkl"))
-encoders = joblib.load(os.path.join(BASE_DIR, "ml/agri_encoders.pkl"))
\ No newline at end of file
+encoders = joblib.load(os.path.join(BASE_DIR, "ml/agri_encoders.pkl"))
+
+# Flattened copies of the forests for fast per-request inference
+crop_forest = FlatForest.from_estimator(crop_model)
+yield_forest = FlatForest.from_estimator(yield_model)
+
+# Precomputed answers for every categorical combination (manage.py build_crop_lookup);
+# None when the table is missing or was built from different model files
+CROP_LOOKUP_PATH = os.path.join(BASE_DIR, "ml/crop_lookup.npz")
+crop_lookup = CropLookup.load(CROP_LOOKUP_PATH, model_fingerprint(os.path.join(BASE_DIR, "ml")))
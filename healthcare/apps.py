@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class HealthcareConfig(AppConfig):
     name = 'healthcare'
+
+    def ready(self):
+        from . import schedule, search, vitals
+        schedule.connect_signals()
+        search.connect_signals()
+        vitals.connect_signals()
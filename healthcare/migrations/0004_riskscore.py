@@ -0,0 +1,32 @@
+# Generated by Django 5.1.5 on 2026-10-19 17:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('healthcare', '0003_appointment_healthcare__updated_079beb_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RiskScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('diabetes', models.FloatField()),
+                ('heart', models.FloatField()),
+                ('cancer', models.FloatField()),
+                ('model_version', models.CharField(max_length=16)),
+                ('scored_at', models.DateTimeField(db_index=True)),
+                ('medical_record', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='healthcare.medicalrecord')),
+                ('patient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='risk_score', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-scored_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+from django.db import migrations
+
+# The DDL is spelled out here rather than imported from healthcare.search,
+# so later changes to that module cannot change what this migration did.
+TABLE = 'healthcare_medicalrecord_search'
+
+SQLITE_CREATE = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+    f"diagnosis, symptoms, treatment_plan, medications, tokenize='porter unicode61')",
+    f"""
+    INSERT INTO {TABLE} (rowid, diagnosis, symptoms, treatment_plan, medications)
+    SELECT m.id, m.diagnosis, m.symptoms, m.treatment_plan,
+           COALESCE((SELECT group_concat(p.medication_name, ' ') FROM healthcare_prescription p
+                     WHERE p.medical_record_id = m.id), '')
+    FROM healthcare_medicalrecord m
+    """,
+]
+
+POSTGRES_CREATE = [
+    f"CREATE TABLE IF NOT EXISTS {TABLE} (record_id bigint PRIMARY KEY, document tsvector NOT NULL)",
+    f"CREATE INDEX IF NOT EXISTS {TABLE}_document ON {TABLE} USING GIN (document)",
+    f"""
+    INSERT INTO {TABLE} (record_id, document)
+    SELECT m.id,
+           setweight(to_tsvector('english', m.diagnosis), 'A')
+           || setweight(to_tsvector('english', m.symptoms), 'B')
+           || setweight(to_tsvector('english', m.treatment_plan), 'C')
+           || setweight(to_tsvector('english', COALESCE(
+                  (SELECT string_agg(p.medication_name, ' ') FROM healthcare_prescription p
+                   WHERE p.medical_record_id = m.id), '')), 'C')
+    FROM healthcare_medicalrecord m
+    """,
+]
+
+
+def create_index(apps, schema_editor):
+    # A no-op on databases without full-text support
+    statements = {'sqlite': SQLITE_CREATE, 'postgresql': POSTGRES_CREATE}.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('healthcare', '0004_riskscore'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,136 @@
+# Generated by Django 5.1.5 on 2026-10-19 17:29
+
+import re
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# A frozen copy of healthcare.vitals.parse_vitals as of this migration, so
+# later changes to the parser cannot change what it wrote. Re-parse with
+# manage.py backfill_vital_signs after changing the parser.
+ALIASES = {
+    'systolic_bp': ('systolic_bp', 'systolic', 'sbp'),
+    'diastolic_bp': ('diastolic_bp', 'diastolic', 'dbp'),
+    'pulse': ('pulse', 'heart_rate', 'hr'),
+    'respiratory_rate': ('respiratory_rate', 'resp_rate', 'rr'),
+    'temperature': ('temperature', 'temp'),
+    'spo2': ('spo2', 'oxygen_saturation', 'o2_sat'),
+    'weight_kg': ('weight_kg', 'weight'),
+    'height_cm': ('height_cm', 'height'),
+    'bmi': ('bmi',),
+    'blood_sugar': ('blood_sugar', 'blood_glucose', 'glucose'),
+}
+UNITS = {
+    'systolic_bp': {'mmhg': float},
+    'diastolic_bp': {'mmhg': float},
+    'pulse': {'bpm': float, '/min': float},
+    'respiratory_rate': {'/min': float, 'breaths/min': float},
+    'temperature': {'c': float, 'f': lambda f: (f - 32) * 5 / 9},
+    'spo2': {'%': float},
+    'weight_kg': {'kg': float, 'lb': lambda lb: lb * 0.45359237, 'lbs': lambda lb: lb * 0.45359237},
+    'height_cm': {'cm': float, 'm': lambda m: m * 100, 'in': lambda inches: inches * 2.54},
+    'bmi': {'kg/m2': float},
+    'blood_sugar': {'mg/dl': float, 'mmol/l': lambda mmol: mmol * 18.0},
+}
+RANGES = {
+    'systolic_bp': (40, 300), 'diastolic_bp': (20, 200), 'pulse': (20, 300), 'respiratory_rate': (4, 80),
+    'temperature': (25, 46), 'spo2': (50, 100), 'weight_kg': (0.5, 500), 'height_cm': (30, 260),
+    'bmi': (5, 100), 'blood_sugar': (10, 1000),
+}
+INTEGER_FIELDS = ('systolic_bp', 'diastolic_bp', 'pulse', 'respiratory_rate')
+NUMBER = re.compile(r'\d+(?:\.\d+)?')
+READING = re.compile(r'(\d+(?:\.\d+)?)\s*(.*)')
+
+
+def reading(field, value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        number, unit = float(value), ''
+    else:
+        match = READING.fullmatch(str(value).strip())
+        if not match:
+            return None
+        number, unit = float(match.group(1)), match.group(2).lower().replace('°', '').replace(' ', '')
+    if not unit:
+        if field != 'temperature' or number <= 50:
+            return number
+        unit = 'f'
+    convert = UNITS[field].get(unit)
+    return convert(number) if convert else None
+
+
+def parse_vitals(vital_signs):
+    if not isinstance(vital_signs, dict):
+        return {}
+    raw = {str(key).strip().lower(): value for key, value in vital_signs.items()}
+    values = {}
+    for key in ('bp', 'blood_pressure'):
+        parts = NUMBER.findall(str(raw.get(key, '')))
+        if len(parts) >= 2:
+            values['systolic_bp'], values['diastolic_bp'] = float(parts[0]), float(parts[1])
+            break
+    for field, aliases in ALIASES.items():
+        for alias in aliases:
+            if alias in raw:
+                number = reading(field, raw[alias])
+                if number is not None:
+                    values[field] = number
+                break
+    if 'bmi' not in values and 'weight_kg' in values and 'height_cm' in values:
+        values['bmi'] = values['weight_kg'] / (values['height_cm'] / 100) ** 2
+    return {
+        field: round(value) if field in INTEGER_FIELDS else value
+        for field, value in values.items()
+        if RANGES[field][0] <= value <= RANGES[field][1]
+    }
+
+
+def backfill_vitals(apps, schema_editor):
+    MedicalRecord = apps.get_model('healthcare', 'MedicalRecord')
+    VitalSign = apps.get_model('healthcare', 'VitalSign')
+    records = MedicalRecord.objects.exclude(vital_signs={}).order_by('id').values_list(
+        'id', 'patient_id', 'created_at', 'vital_signs')
+    rows = []
+    for record_id, patient_id, created_at, vital_signs in records.iterator(chunk_size=2000):
+        readings = parse_vitals(vital_signs)
+        if readings:
+            rows.append(VitalSign(medical_record_id=record_id, patient_id=patient_id, recorded_at=created_at,
+                                  **readings))
+    VitalSign.objects.bulk_create(rows, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('healthcare', '0005_medicalrecord_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VitalSign',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_at', models.DateTimeField()),
+                ('systolic_bp', models.PositiveSmallIntegerField(null=True)),
+                ('diastolic_bp', models.PositiveSmallIntegerField(null=True)),
+                ('pulse', models.PositiveSmallIntegerField(null=True)),
+                ('respiratory_rate', models.PositiveSmallIntegerField(null=True)),
+                ('temperature', models.FloatField(null=True)),
+                ('spo2', models.FloatField(null=True)),
+                ('weight_kg', models.FloatField(null=True)),
+                ('height_cm', models.FloatField(null=True)),
+                ('bmi', models.FloatField(null=True)),
+                ('blood_sugar', models.FloatField(null=True)),
+                ('medical_record', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='vital_reading', to='healthcare.medicalrecord')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vital_readings', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['recorded_at'],
+                'indexes': [models.Index(fields=['patient', 'recorded_at'], name='healthcare__patient_7a8aad_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_vitals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.5 on 2026-10-19 17:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('healthcare', '0006_vitalsign'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='doctorunavailability',
+            index=models.Index(fields=['doctor', 'start_date'], name='healthcare__doctor__602c66_idx'),
+        ),
+    ]
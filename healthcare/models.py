@@ -1,5 +1,6 @@
 from django.db import models
 from accounts.models import CustomUser
+from dpi_platform.scoring import risk_flags
 
 class Doctor(models.Model):
     """Doctor profiles with specialization"""
@@ -45,6 +46,7 @@ class Appointment(models.Model):
     class Meta:
         ordering = ['-appointment_date', '-appointment_time']
         unique_together = ['doctor', 'appointment_date', 'appointment_time']
+        indexes = [models.Index(fields=['updated_at', 'id'])]  # Delta sync keyset
 
 
 class MedicalRecord(models.Model):
@@ -68,6 +70,7 @@ class MedicalRecord(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['updated_at', 'id'])]  # Delta sync keyset
 
 
 class Prescription(models.Model):
@@ -122,3 +125,49 @@ class DoctorUnavailability(models.Model):
     
     class Meta:
         ordering = ['-start_date']
+        indexes = [models.Index(fields=['doctor', 'start_date'])]  # Calendar range query
+
+
+class RiskScore(models.Model):
+    """Latest disease risk scores of a patient, refreshed by score_patient_risks"""
+    patient = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='risk_score')
+    medical_record = models.ForeignKey(MedicalRecord, on_delete=models.SET_NULL, null=True, related_name='+')
+    diabetes = models.FloatField()
+    heart = models.FloatField()
+    cancer = models.FloatField()
+    model_version = models.CharField(max_length=16)  # Fingerprint of the risk model pickles
+    scored_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Risk scores - {self.patient.username} on {self.scored_at.date()}"
+
+    @property
+    def flags(self):
+        return risk_flags((self.diabetes, self.heart, self.cancer))
+
+    class Meta:
+        ordering = ['-scored_at']
+
+
+class VitalSign(models.Model):
+    """Typed vitals parsed from a MedicalRecord's vital_signs, one row per record"""
+    patient = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='vital_readings')
+    medical_record = models.OneToOneField(MedicalRecord, on_delete=models.CASCADE, related_name='vital_reading')
+    recorded_at = models.DateTimeField()
+    systolic_bp = models.PositiveSmallIntegerField(null=True)
+    diastolic_bp = models.PositiveSmallIntegerField(null=True)
+    pulse = models.PositiveSmallIntegerField(null=True)
+    respiratory_rate = models.PositiveSmallIntegerField(null=True)
+    temperature = models.FloatField(null=True)
+    spo2 = models.FloatField(null=True)
+    weight_kg = models.FloatField(null=True)
+    height_cm = models.FloatField(null=True)
+    bmi = models.FloatField(null=True)
+    blood_sugar = models.FloatField(null=True)
+
+    def __str__(self):
+        return f"Vitals - {self.patient.username} at {self.recorded_at}"
+
+    class Meta:
+        ordering = ['recorded_at']
+        indexes = [models.Index(fields=['patient', 'recorded_at'])]
@@ -0,0 +1,163 @@
+"""
+Server-side day calendar for doctors.
+
+A calendar covers a date range: each day lists its appointments, its blocked
+intervals (recurring unavailability expanded to the days it applies to) and
+the free gaps left in the working day. It is built from one range query on
+appointments and one on unavailability periods, and cached per doctor under
+a generation number that is bumped whenever one of that doctor's
+appointments or unavailability periods changes, so stale entries are simply
+never read again. The generation is a CollectionVersion row rather than a
+cache key, because the default cache is per process and every worker must
+see the bump.
+"""
+from datetime import time, timedelta
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+
+from core.models import CollectionVersion
+from core.versioning import bump_collections
+
+# Bookable hours; appointments only store a start time
+WORKDAY = (time(9, 0), time(17, 0))
+APPOINTMENT_MINUTES = 30
+
+# Statuses that occupy their slot
+BUSY_STATUSES = ('scheduled', 'completed')
+
+CACHE_TIMEOUT = 600
+MAX_RANGE_DAYS = 62
+
+DAY_MINUTES = 24 * 60
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def _clock(minutes):
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+
+def _collection(doctor_id):
+    return f'doctor-calendar:{doctor_id}'
+
+
+def _generation(doctor_id):
+    return CollectionVersion.objects.filter(name=_collection(doctor_id)).values_list('version', flat=True).first() or 0
+
+
+def invalidate(doctor_id):
+    """Start a new cache generation for a doctor, in the transaction of the change"""
+    bump_collections(_collection(doctor_id))
+
+
+def _free_gaps(busy):
+    """Gaps of at least one appointment inside WORKDAY, given busy (start, end) minute pairs"""
+    day_start, day_end = _minutes(WORKDAY[0]), _minutes(WORKDAY[1])
+    gaps, cursor = [], day_start
+    for start, end in sorted(busy):
+        start, end = max(start, day_start), min(end, day_end)
+        if start >= end:
+            continue
+        if start - cursor >= APPOINTMENT_MINUTES:
+            gaps.append((cursor, start))
+        cursor = max(cursor, end)
+    if day_end - cursor >= APPOINTMENT_MINUTES:
+        gaps.append((cursor, day_end))
+    return [{'start': _clock(start), 'end': _clock(end)} for start, end in gaps]
+
+
+def _applies_on(period, day):
+    if period.is_recurring and period.recurrence_pattern == 'weekly':
+        return day.weekday() == period.start_date.weekday()
+    # One-off and daily periods block their time window on every day of the range
+    return True
+
+
+def build_calendar(doctor_id, start, end):
+    """
+    Compute a doctor's schedule.
+
+    Args:
+        doctor_id: Doctor id
+        start: First date, inclusive
+        end: Last date, inclusive
+
+    Returns:
+        list: One ``{"date", "appointments", "blocked", "free"}`` dict per day
+    """
+    from .models import Appointment, DoctorUnavailability
+
+    days = {
+        start + timedelta(days=offset): {'appointments': [], 'blocked': [], 'busy': []}
+        for offset in range((end - start).days + 1)
+    }
+
+    appointments = (
+        Appointment.objects
+        .filter(doctor_id=doctor_id, appointment_date__range=(start, end))
+        .order_by('appointment_date', 'appointment_time')
+        .values_list('id', 'appointment_date', 'appointment_time', 'status', 'reason',
+                     'patient_id', 'patient__first_name', 'patient__last_name')
+    )
+    for pk, date, at, status, reason, patient_id, first_name, last_name in appointments:
+        begin = _minutes(at)
+        finish = min(begin + APPOINTMENT_MINUTES, DAY_MINUTES)
+        day = days[date]
+        day['appointments'].append({
+            'id': pk, 'start': _clock(begin), 'end': _clock(finish), 'status': status, 'reason': reason,
+            'patient_id': patient_id, 'patient_name': f'{first_name} {last_name}'.strip(),
+        })
+        if status in BUSY_STATUSES:
+            day['busy'].append((begin, finish))
+
+    periods = DoctorUnavailability.objects.filter(doctor_id=doctor_id, start_date__lte=end, end_date__gte=start)
+    for period in periods:
+        if period.start_time and period.end_time:
+            begin, finish = _minutes(period.start_time), _minutes(period.end_time)
+        else:
+            begin, finish = 0, DAY_MINUTES
+        first, last = max(period.start_date, start), min(period.end_date, end)
+        for offset in range((last - first).days + 1):
+            date = first + timedelta(days=offset)
+            if not _applies_on(period, date):
+                continue
+            days[date]['blocked'].append({
+                'id': period.id, 'start': _clock(begin), 'end': _clock(finish), 'reason': period.reason,
+                'recurrence': period.recurrence_pattern if period.is_recurring else 'none',
+            })
+            days[date]['busy'].append((begin, finish))
+
+    return [
+        {
+            'date': date.isoformat(),
+            'appointments': day['appointments'],
+            'blocked': sorted(day['blocked'], key=lambda block: block['start']),
+            'free': _free_gaps(day['busy']),
+        }
+        for date, day in days.items()
+    ]
+
+
+def get_calendar(doctor_id, start, end):
+    """build_calendar() through the per-doctor cache"""
+    key = f'doctor-calendar:{doctor_id}:{_generation(doctor_id)}:{start.isoformat()}:{end.isoformat()}'
+    calendar = cache.get(key)
+    if calendar is None:
+        calendar = build_calendar(doctor_id, start, end)
+        cache.set(key, calendar, CACHE_TIMEOUT)
+    return calendar
+
+
+def _schedule_changed(sender, instance, **kwargs):
+    invalidate(instance.doctor_id)
+
+
+def connect_signals():
+    from .models import Appointment, DoctorUnavailability
+    for model in (Appointment, DoctorUnavailability):
+        label = model._meta.label
+        post_save.connect(_schedule_changed, sender=model, dispatch_uid=f'schedule-{label}-save')
+        post_delete.connect(_schedule_changed, sender=model, dispatch_uid=f'schedule-{label}-delete')
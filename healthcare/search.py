@@ -0,0 +1,196 @@
+"""
+Full-text search over medical records.
+
+Each record's diagnosis, symptoms, treatment plan and prescribed medication
+names are kept in a side table, ``healthcare_medicalrecord_search``
+(created by migration 0005): an FTS5 virtual table on SQLite and a tsvector
+column with a GIN index on PostgreSQL. Signals re-index a record whenever it
+or one of its prescriptions is saved or deleted, so the index never needs a
+batch job.
+Other databases fall back to an unindexed ``icontains`` scan. Writes that
+bypass signals (``QuerySet.update``, ``bulk_create``) must call
+``index_record`` or ``manage.py rebuild_search_index``.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+
+TABLE = 'healthcare_medicalrecord_search'
+
+# Query terms beyond this are ignored
+MAX_TERMS = 10
+
+# bm25 column weights: diagnosis, symptoms, treatment_plan, medications
+FTS5_WEIGHTS = (10.0, 5.0, 2.0, 2.0)
+
+_SQLITE_DOCUMENT = f"""
+    INSERT INTO {TABLE} (rowid, diagnosis, symptoms, treatment_plan, medications)
+    SELECT m.id, m.diagnosis, m.symptoms, m.treatment_plan,
+           COALESCE((SELECT group_concat(p.medication_name, ' ') FROM healthcare_prescription p
+                     WHERE p.medical_record_id = m.id), '')
+    FROM healthcare_medicalrecord m
+"""
+
+_POSTGRES_DOCUMENT = f"""
+    INSERT INTO {TABLE} (record_id, document)
+    SELECT m.id,
+           setweight(to_tsvector('english', m.diagnosis), 'A')
+           || setweight(to_tsvector('english', m.symptoms), 'B')
+           || setweight(to_tsvector('english', m.treatment_plan), 'C')
+           || setweight(to_tsvector('english', COALESCE(
+                  (SELECT string_agg(p.medication_name, ' ') FROM healthcare_prescription p
+                   WHERE p.medical_record_id = m.id), '')), 'C')
+    FROM healthcare_medicalrecord m
+"""
+
+
+def is_indexed(conn=connection):
+    """Whether the database has a full-text index for medical records"""
+    return conn.vendor in ('sqlite', 'postgresql')
+
+
+def rebuild_index(conn=connection):
+    """Re-index every medical record in one statement"""
+    if not is_indexed(conn):
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+        cursor.execute(_SQLITE_DOCUMENT if conn.vendor == 'sqlite' else _POSTGRES_DOCUMENT)
+
+
+def index_record(record_id):
+    """Refresh one record's entry; also removes it if the record no longer exists"""
+    if not is_indexed():
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [record_id])
+            cursor.execute(_SQLITE_DOCUMENT + " WHERE m.id = %s", [record_id])
+        else:
+            cursor.execute(_POSTGRES_DOCUMENT + " WHERE m.id = %s ON CONFLICT (record_id) DO UPDATE SET "
+                           "document = EXCLUDED.document", [record_id])
+
+
+def unindex_record(record_id):
+    if not is_indexed():
+        return
+    column = 'rowid' if connection.vendor == 'sqlite' else 'record_id'
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE {column} = %s", [record_id])
+
+
+def _terms(query):
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+class RecordSearch:
+    """
+    Lazily evaluated, ranked search results.
+
+    Supports ``count()`` and slicing, so it can be handed to a Django or DRF
+    paginator; each page is one ranked id query plus one query for the
+    records themselves.
+    """
+
+    def __init__(self, terms, scope):
+        self.scope = scope
+        self._count = None
+        if connection.vendor == 'sqlite':
+            # Every term must match; the last one may be a prefix of a word
+            self.match = ' '.join(f'"{term}"' for term in terms) + '*'
+        else:
+            self.match = ' & '.join(terms) + ':*'
+
+    def _sql(self, select, order=''):
+        where = ' AND '.join(f'm.{column} = %s' for column in self.scope)
+        if connection.vendor == 'sqlite':
+            sql = (f"SELECT {select} FROM {TABLE} JOIN healthcare_medicalrecord m ON m.id = {TABLE}.rowid "
+                   f"WHERE {TABLE} MATCH %s")
+        else:
+            sql = (f"SELECT {select} FROM {TABLE} JOIN healthcare_medicalrecord m ON m.id = {TABLE}.record_id "
+                   f"WHERE {TABLE}.document @@ to_tsquery('english', %s)")
+        return f"{sql} {'AND ' + where if where else ''} {order}", [self.match, *self.scope.values()]
+
+    def count(self):
+        if self._count is None:
+            sql, params = self._sql('COUNT(*)')
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.step is not None:
+            raise TypeError('RecordSearch only supports slices')
+        start = key.start or 0
+        limit = -1 if key.stop is None else max(key.stop - start, 0)
+        if connection.vendor == 'sqlite':
+            rank = f"bm25({TABLE}, {', '.join(map(str, FTS5_WEIGHTS))})"
+        else:
+            rank = f"-ts_rank_cd({TABLE}.document, to_tsquery('english', %s))"
+        sql, params = self._sql('m.id', f"ORDER BY {rank}, m.created_at DESC, m.id DESC LIMIT %s OFFSET %s")
+        if connection.vendor != 'sqlite':
+            params.append(self.match)
+            # PostgreSQL spells "no limit" as LIMIT NULL
+            limit = None if limit == -1 else limit
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params + [limit, start])
+            ids = [row[0] for row in cursor.fetchall()]
+
+        from .models import MedicalRecord
+        records = (MedicalRecord.objects.select_related('doctor__user__profile', 'patient__profile')
+                   .prefetch_related('prescriptions').in_bulk(ids))
+        return [records[record_id] for record_id in ids if record_id in records]
+
+
+def search_records(query, **scope):
+    """
+    Search medical records.
+
+    Args:
+        query: Free text; words are matched stemmed and the last one as a prefix
+        **scope: Column filters such as doctor_id=... or patient_id=...
+
+    Returns:
+        RecordSearch, or a QuerySet on databases without a full-text index
+    """
+    terms = _terms(query)
+    if not terms:
+        from .models import MedicalRecord
+        return MedicalRecord.objects.none()
+    if is_indexed():
+        return RecordSearch(terms, scope)
+
+    from .models import MedicalRecord
+    match = Q()
+    for term in terms:
+        match &= (Q(diagnosis__icontains=term) | Q(symptoms__icontains=term)
+                  | Q(treatment_plan__icontains=term) | Q(prescriptions__medication_name__icontains=term))
+    return (MedicalRecord.objects.filter(match, **scope).distinct()
+            .select_related('doctor__user__profile', 'patient__profile').prefetch_related('prescriptions')
+            .order_by('-created_at', '-id'))
+
+
+def _record_saved(sender, instance, **kwargs):
+    index_record(instance.pk)
+
+
+def _record_deleted(sender, instance, **kwargs):
+    unindex_record(instance.pk)
+
+
+def _prescription_changed(sender, instance, **kwargs):
+    index_record(instance.medical_record_id)
+
+
+def connect_signals():
+    from .models import MedicalRecord, Prescription
+    post_save.connect(_record_saved, sender=MedicalRecord, dispatch_uid='search-medicalrecord-save')
+    post_delete.connect(_record_deleted, sender=MedicalRecord, dispatch_uid='search-medicalrecord-delete')
+    post_save.connect(_prescription_changed, sender=Prescription, dispatch_uid='search-prescription-save')
+    post_delete.connect(_prescription_changed, sender=Prescription, dispatch_uid='search-prescription-delete')
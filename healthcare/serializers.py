@@ -1,32 +1,56 @@
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
 from rest_framework import serializers
 from .models import Doctor, Appointment, MedicalRecord, Prescription, FollowUp, DoctorUnavailability
+from .search import index_record
 
 from accounts.models import CustomUser
 from accounts.serializers import CustomUserSerializer
+from core.mixins import DynamicFieldsMixin
 
-class DoctorSerializer(serializers.ModelSerializer):
+class DoctorSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = CustomUserSerializer(read_only=True)
     full_name = serializers.CharField(source='user.get_full_name', read_only=True)
     
     class Meta:
         model = Doctor
         fields = '__all__'
+        expandable_fields = ['user']
 
-class AppointmentSerializer(serializers.ModelSerializer):
+class AppointmentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     doctor_name = serializers.CharField(source='doctor.user.get_full_name', read_only=True)
     patient_name = serializers.CharField(source='patient.get_full_name', read_only=True)
     patient_data = CustomUserSerializer(source='patient', read_only=True)
     medical_record_id = serializers.SerializerMethodField()
+    patient_risk = serializers.SerializerMethodField()
     
     class Meta:
         model = Appointment
         fields = '__all__'
         read_only_fields = ['patient', 'created_at', 'updated_at']
+        expandable_fields = ['patient_data']
 
     def get_medical_record_id(self, obj):
         record = obj.medical_record.last()
         return record.id if record else None
 
+    def get_patient_risk(self, obj):
+        """Stored risk scores (percent) and flags; list views select_related patient__risk_score"""
+        request = self.context.get('request')
+        if request is not None and not request.user.is_authenticated:
+            return None
+        try:
+            score = obj.patient.risk_score
+        except ObjectDoesNotExist:
+            return None
+        return {
+            'diabetes': round(score.diabetes * 100, 2),
+            'heart': round(score.heart * 100, 2),
+            'cancer': round(score.cancer * 100, 2),
+            'flags': score.flags,
+            'scored_at': score.scored_at,
+        }
+
     def validate(self, data):
         doctor = data.get('doctor')
         appointment_date = data.get('appointment_date')
@@ -53,13 +77,13 @@ class AppointmentSerializer(serializers.ModelSerializer):
         
         return data
 
-class PrescriptionSerializer(serializers.ModelSerializer):
+class PrescriptionSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Prescription
         fields = '__all__'
         read_only_fields = ['medical_record']
 
-class MedicalRecordSerializer(serializers.ModelSerializer):
+class MedicalRecordSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     prescriptions = PrescriptionSerializer(many=True, read_only=True)
     patient = CustomUserSerializer(read_only=True)
     patient_id = serializers.PrimaryKeyRelatedField(
@@ -73,22 +97,45 @@ class MedicalRecordSerializer(serializers.ModelSerializer):
         model = MedicalRecord
         fields = '__all__'
         read_only_fields = ['created_at', 'updated_at', 'doctor']
+        expandable_fields = ['patient', 'doctor_profile', 'prescriptions']
+
+    def validate(self, data):
+        # Prescriptions are written together with a new record only
+        if self.instance is None:
+            prescriptions = PrescriptionSerializer(data=self.initial_data.get('prescriptions', []), many=True)
+            if not prescriptions.is_valid():
+                raise serializers.ValidationError({'prescriptions': prescriptions.errors})
+            data['prescriptions'] = prescriptions.validated_data
+        return data
 
     def create(self, validated_data):
-        prescriptions_data = self.context['request'].data.get('prescriptions', [])
-        medical_record = MedicalRecord.objects.create(**validated_data)
-        
-        for prescription_data in prescriptions_data:
-            Prescription.objects.create(medical_record=medical_record, **prescription_data)
-            
+        prescriptions_data = validated_data.pop('prescriptions', [])
+        with transaction.atomic():
+            medical_record = MedicalRecord.objects.create(**validated_data)
+            Prescription.objects.bulk_create([
+                Prescription(medical_record=medical_record, **prescription_data)
+                for prescription_data in prescriptions_data
+            ])
+            if prescriptions_data:
+                # bulk_create skips the signals that keep the search index current
+                index_record(medical_record.id)
         return medical_record
 
-class FollowUpSerializer(serializers.ModelSerializer):
+class MedicalRecordSummarySerializer(serializers.ModelSerializer):
+    """One timeline entry; the queryset annotates prescription_count"""
+    doctor_name = serializers.CharField(source='doctor.user.get_full_name', read_only=True, default=None)
+    prescription_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = MedicalRecord
+        fields = ['id', 'created_at', 'diagnosis', 'doctor_name', 'appointment', 'prescription_count']
+
+class FollowUpSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = FollowUp
         fields = '__all__'
 
-class DoctorUnavailabilitySerializer(serializers.ModelSerializer):
+class DoctorUnavailabilitySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = DoctorUnavailability
         fields = '__all__'
@@ -1,3 +1,196 @@
+import datetime
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import IntegrityError
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from accounts.models import CustomUser
+from core.models import CollectionVersion
+
+from .models import Appointment, Doctor, FollowUp, MedicalRecord, Prescription
+from .serializers import AppointmentSerializer
+from .vitals import parse_vitals
+
+
+class FinalizeConsultationTests(TestCase):
+
+    def setUp(self):
+        user = CustomUser.objects.create_user(username='doc', password='pw123456xx', role='doctor', is_approved=True)
+        self.doctor = Doctor.objects.create(user=user, specialization='GP', qualification='MBBS', license_number='L1')
+        self.patient = CustomUser.objects.create_user(username='pat', password='pw123456xx', role='citizen')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def _appointment(self, hour, day=datetime.date(2026, 11, 2)):
+        return Appointment.objects.create(doctor=self.doctor, patient=self.patient, reason='r',
+                                          appointment_date=day, appointment_time=datetime.time(hour))
+
+    def _finalize(self, appointment, prescriptions=1, follow_up_time=None):
+        body = {
+            'patient_id': self.patient.id, 'appointment': appointment.id,
+            'diagnosis': 'flu', 'symptoms': 'fever', 'treatment_plan': 'rest',
+            'prescriptions': [{'medication_name': f'Drug{i}', 'dosage': '1', 'frequency': 'od', 'duration': '5d'}
+                              for i in range(prescriptions)],
+        }
+        if follow_up_time:
+            body['follow_up'] = {'appointment_date': '2026-11-09', 'appointment_time': follow_up_time, 'reason': 'check'}
+        return self.client.post('/api/healthcare/medical-records/finalize/', body, format='json')
+
+    def test_query_count_does_not_grow_with_prescriptions(self):
+        for prescriptions, hour in ((1, 9), (10, 10)):
+            appointment = self._appointment(hour)
+            with self.assertNumQueries(49):
+                response = self._finalize(appointment, prescriptions, follow_up_time=f'{hour}:30')
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(len(response.json()['medical_record']['prescriptions']), prescriptions)
+            appointment.refresh_from_db()
+            self.assertEqual(appointment.status, 'completed')
+            self.assertTrue(FollowUp.objects.filter(original_appointment=appointment).exists())
+
+    def test_follow_up_slot_taken_after_validation_is_a_conflict(self):
+        appointment = self._appointment(9)
+        self._appointment(11, day=datetime.date(2026, 11, 9))
+        # Validation passes as if the slot were booked in between
+        with mock.patch.object(AppointmentSerializer, 'get_validators', return_value=[]):
+            response = self._finalize(appointment, follow_up_time='11:00')
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(MedicalRecord.objects.exists())
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.status, 'scheduled')
+
+    def test_other_integrity_errors_are_not_reported_as_slot_conflicts(self):
+        appointment = self._appointment(9)
+        with mock.patch('healthcare.serializers.Prescription.objects.bulk_create', side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                self._finalize(appointment, follow_up_time='9:30')
+        self.assertFalse(MedicalRecord.objects.exists())
+
+
+class VitalsParsingTests(TestCase):
+    """Each column holds one unit, whatever unit a reading was written in"""
+
+    def test_temperatures_are_stored_in_celsius(self):
+        for value in ('98.6 F', '98.6°F', 98.6, 37, '37 C', '37.0'):
+            self.assertAlmostEqual(parse_vitals({'temperature': value})['temperature'], 37.0, places=5, msg=value)
+
+    def test_weights_are_stored_in_kg(self):
+        self.assertAlmostEqual(parse_vitals({'weight': '154 lbs'})['weight_kg'], 69.85, places=2)
+        self.assertEqual(parse_vitals({'weight': '70 kg', 'height': '1.75 m'}),
+                         {'weight_kg': 70.0, 'height_cm': 175.0, 'bmi': 70 / 1.75 ** 2})
+
+    def test_unknown_units_are_dropped(self):
+        self.assertEqual(parse_vitals({'weight': '11 stone', 'temperature': '310 K', 'pulse': '72 bpm'}), {'pulse': 72})
+
+
+class DateParamTests(TestCase):
+
+    def test_impossible_dates_are_rejected(self):
+        patient = CustomUser.objects.create_user(username='pat', password='pw123456xx', role='citizen')
+        client = APIClient()
+        client.force_authenticate(patient)
+        response = client.get('/api/healthcare/medical-records/vital_trends/', {'from': '2024-02-30'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'from must be a valid YYYY-MM-DD date'})
+
+
+class DoctorCalendarTests(TestCase):
+
+    def setUp(self):
+        user = CustomUser.objects.create_user(username='doc', password='pw123456xx', role='doctor', is_approved=True)
+        self.doctor = Doctor.objects.create(user=user, specialization='GP', qualification='MBBS', license_number='L1')
+        self.patient = CustomUser.objects.create_user(username='pat', password='pw123456xx', role='citizen')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def _day(self):
+        response = self.client.get('/api/healthcare/doctors/me/calendar/', {'from': '2026-11-02', 'to': '2026-11-02'})
+        return response.json()['days'][0]
+
+    def test_changes_start_a_new_generation_in_the_database(self):
+        self.assertEqual(self._day()['appointments'], [])
+        Appointment.objects.create(doctor=self.doctor, patient=self.patient, reason='r',
+                                   appointment_date=datetime.date(2026, 11, 2), appointment_time=datetime.time(9))
+        # Every worker reads the generation from the database, not its own cache
+        self.assertTrue(CollectionVersion.objects.filter(name=f'doctor-calendar:{self.doctor.id}').exists())
+        self.assertEqual(len(self._day()['appointments']), 1)
+
+    def test_impossible_dates_are_rejected(self):
+        response = self.client.get('/api/healthcare/doctors/me/calendar/', {'to': '2026-02-30'})
+        self.assertEqual(response.status_code, 400)
+
+    def tearDown(self):
+        cache.clear()
+
+
+class RecordSearchTests(TestCase):
+
+    def setUp(self):
+        user = CustomUser.objects.create_user(username='doc', password='pw123456xx', role='doctor', is_approved=True)
+        self.doctor = Doctor.objects.create(user=user, specialization='GP', qualification='MBBS', license_number='L1')
+        other = CustomUser.objects.create_user(username='doc2', password='pw123456xx', role='doctor', is_approved=True)
+        self.other_doctor = Doctor.objects.create(user=other, specialization='GP', qualification='MBBS',
+                                                  license_number='L2')
+        self.patient = CustomUser.objects.create_user(username='pat', password='pw123456xx', role='citizen')
+        self.flu = self.record('Influenza', 'fever and cough', 'rest and fluids', 'Paracetamol')
+        self.asthma = self.record('Asthma', 'wheezing and cough', 'inhaler twice daily', 'Salbutamol')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def record(self, diagnosis, symptoms, treatment_plan, medication, doctor=None):
+        record = MedicalRecord.objects.create(patient=self.patient, doctor=doctor or self.doctor, diagnosis=diagnosis,
+                                              symptoms=symptoms, treatment_plan=treatment_plan)
+        Prescription.objects.create(medical_record=record, medication_name=medication, dosage='1',
+                                    frequency='od', duration='5d')
+        return record
+
+    def search(self, query, **params):
+        response = self.client.get('/api/healthcare/medical-records/search/', {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def ids(self, query):
+        return sorted(row['id'] for row in self.search(query)['results'])
+
+    def test_last_term_matches_as_a_prefix(self):
+        self.assertEqual(self.ids('influ'), [self.flu.id])
+        # Only the last term; earlier ones must be whole words
+        self.assertEqual(self.ids('influ fever'), [])
+        self.assertEqual(self.ids('fever influ'), [self.flu.id])
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.ids('cough'), [self.flu.id, self.asthma.id])
+        self.assertEqual(self.ids('cough wheezing'), [self.asthma.id])
+
+    def test_medication_names_match(self):
+        self.assertEqual(self.ids('salbutamol'), [self.asthma.id])
+
+    def test_edits_are_reindexed(self):
+        self.flu.diagnosis = 'Bronchitis'
+        self.flu.save()
+        self.assertEqual(self.ids('influenza'), [])
+        self.assertEqual(self.ids('bronchitis'), [self.flu.id])
+        prescription = self.asthma.prescriptions.get()
+        prescription.medication_name = 'Montelukast'
+        prescription.save()
+        self.assertEqual(self.ids('montelukast'), [self.asthma.id])
+        self.assertEqual(self.ids('salbutamol'), [])
+
+    def test_deleted_records_are_unindexed(self):
+        self.flu.delete()
+        self.assertEqual(self.ids('fever'), [])
+
+    def test_doctors_only_find_their_own_records(self):
+        theirs = self.record('Influenza', 'fever', 'rest', 'Oseltamivir', doctor=self.other_doctor)
+        self.assertEqual(self.ids('influenza'), [self.flu.id])
+        self.client.force_authenticate(self.other_doctor.user)
+        self.assertEqual(self.ids('influenza'), [theirs.id])
 
-# Create your tests here.
+    def test_pages_report_the_total_count(self):
+        for index in range(3):
+            self.record('Influenza', f'fever day {index}', 'rest', 'Paracetamol')
+        page = self.search('influenza', page_size=2)
+        self.assertEqual(page['count'], 4)
+        self.assertEqual(len(page['results']), 2)
+        self.assertEqual(len(self.search('influenza', page_size=2, page=2)['results']), 2)
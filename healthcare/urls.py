@@ -11,5 +11,6 @@ router.register('unavailability', views.DoctorUnavailabilityViewSet, basename='u
 
 urlpatterns = [
     path('predict-disease/', views.predict_disease, name='predict-disease'),
+    path('predict-disease/batch/', views.predict_disease_batch, name='predict-disease-batch'),
     path('', include(router.urls)),
 ]
@@ -1,17 +1,29 @@
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from django.db import IntegrityError, transaction
+from django.db.models import Count
+from django.utils import timezone
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from .models import Doctor, Appointment, MedicalRecord, Prescription, FollowUp, DoctorUnavailability
 from .serializers import (
-    DoctorSerializer, AppointmentSerializer, MedicalRecordSerializer,
+    DoctorSerializer, AppointmentSerializer, MedicalRecordSerializer, MedicalRecordSummarySerializer,
     PrescriptionSerializer, FollowUpSerializer, DoctorUnavailabilitySerializer
 )
+from .schedule import MAX_RANGE_DAYS, WORKDAY, get_calendar
+from .search import search_records
+from .vitals import DEFAULT_POINTS, VITAL_FIELDS, trend
+from core import transitions
+from core.mixins import ConditionalListMixin, FieldProjectionMixin
+from core.pagination import StandardPagination
+from core.params import date_params
 from dpi_platform.forms import PatientForm
-from dpi_platform.utils import diabetes_model, heart_model, cancer_model, scaler
-import numpy as np
+from dpi_platform.scoring import RISK_FLAG_THRESHOLDS, patient_features
+from dpi_platform.utils import risk_scorer
 
 @login_required
 def doctor_dashboard(request):
@@ -20,10 +32,11 @@ def doctor_dashboard(request):
         return render(request, 'error.html', {'message': 'Access denied. Doctor role required.'})
     return render(request, 'healthcare/doctor_dashboard.html')
 
-class DoctorViewSet(viewsets.ModelViewSet):
+class DoctorViewSet(ConditionalListMixin, FieldProjectionMixin, viewsets.ModelViewSet):
     """Doctor management"""
-    queryset = Doctor.objects.filter(user__is_approved=True)
+    queryset = Doctor.objects.filter(user__is_approved=True).select_related('user__profile')
     serializer_class = DoctorSerializer
+    version_collections = ['doctors']
     
     def get_permissions(self):
         if self.action in ['list', 'retrieve', 'available']:
@@ -47,10 +60,39 @@ class DoctorViewSet(viewsets.ModelViewSet):
         except Doctor.DoesNotExist:
             return Response({'error': 'Doctor profile not found'}, status=status.HTTP_404_NOT_FOUND)
 
-class AppointmentViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'], url_path='me/calendar', permission_classes=[IsAuthenticated])
+    def calendar(self, request):
+        """Current doctor's per-day schedule for ``from``..``to`` (default: the next 7 days)"""
+        doctor_id = Doctor.objects.filter(user=request.user).values_list('id', flat=True).first()
+        if doctor_id is None:
+            return Response({'error': 'Doctor profile not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            dates = date_params(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        start = dates.get('from') or timezone.localdate()
+        end = dates.get('to') or start + timedelta(days=6)
+        if end < start or (end - start).days >= MAX_RANGE_DAYS:
+            return Response(
+                {'error': f'to must be on or after from and at most {MAX_RANGE_DAYS} days later'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({
+            'from': start,
+            'to': end,
+            'workday': {'start': WORKDAY[0].strftime('%H:%M'), 'end': WORKDAY[1].strftime('%H:%M')},
+            'days': get_calendar(doctor_id, start, end),
+        })
+
+class AppointmentViewSet(FieldProjectionMixin, viewsets.ModelViewSet):
     """Appointment management"""
     queryset = Appointment.objects.all()
     serializer_class = AppointmentSerializer
+    compact_fields = [
+        'id', 'doctor', 'doctor_name', 'patient_name', 'appointment_date',
+        'appointment_time', 'reason', 'status', 'patient_risk'
+    ]
     
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -60,23 +102,34 @@ class AppointmentViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         print(f"DEBUG: AppointmentViewSet.get_queryset - User: {user}, Role: {getattr(user, 'role', 'None')}, Auth: {user.is_authenticated}")
+        queryset = Appointment.objects.select_related('doctor__user', 'patient__risk_score')
         if not user.is_authenticated:
-            return Appointment.objects.all()
+            return queryset
         if user.role == 'doctor':
-            return Appointment.objects.filter(doctor__user=user)
+            return queryset.filter(doctor__user=user)
         elif user.role == 'citizen':
-            return Appointment.objects.filter(patient=user)
-        return Appointment.objects.all()
+            return queryset.filter(patient=user)
+        return queryset
     
     def perform_create(self, serializer):
-        serializer.save(patient=self.request.user)
+        with transaction.atomic():
+            appointment = serializer.save(patient=self.request.user)
+            transitions.record('appointment', [(appointment.pk, '', appointment.status)], self.request.user)
+    
+    def perform_update(self, serializer):
+        previous = serializer.instance.status
+        with transaction.atomic():
+            appointment = serializer.save()
+            transitions.record('appointment', [(appointment.pk, previous, appointment.status)], self.request.user)
     
     @action(detail=True, methods=['post'])
     def complete(self, request, pk=None):
         """Mark appointment as completed"""
         appointment = self.get_object()
-        appointment.status = 'completed'
-        appointment.save()
+        with transaction.atomic():
+            previous, appointment.status = appointment.status, 'completed'
+            appointment.save()
+            transitions.record('appointment', [(appointment.pk, previous, appointment.status)], request.user)
         return Response({'message': 'Appointment completed'})
 
 from reportlab.pdfgen import canvas
@@ -89,10 +142,40 @@ from io import BytesIO
 
 # ... existing imports ...
 
-class MedicalRecordViewSet(viewsets.ModelViewSet):
+# Upper bound on points per vital-signs series
+MAX_TREND_POINTS = 1000
+
+
+def with_record_relations(queryset):
+    """Eager-load everything MedicalRecordSerializer nests"""
+    return queryset.select_related('patient__profile', 'doctor__user__profile').prefetch_related('prescriptions')
+
+
+def _patient_access_error(user, patient_id):
+    """
+    Error response if ``user`` may not read this patient's records, else None.
+
+    Patients see themselves, doctors the patients they have an appointment or
+    record with, and admins everyone.
+    """
+    if user.role == 'citizen':
+        if user.id == patient_id:
+            return None
+    elif user.role == 'doctor':
+        if (Appointment.objects.filter(doctor__user=user, patient_id=patient_id).exists()
+                or MedicalRecord.objects.filter(doctor__user=user, patient_id=patient_id).exists()):
+            return None
+        return Response({'error': 'Not your patient'}, status=status.HTTP_403_FORBIDDEN)
+    elif user.role == 'admin':
+        return None
+    return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
+
+
+class MedicalRecordViewSet(FieldProjectionMixin, viewsets.ModelViewSet):
     """Medical record management"""
     queryset = MedicalRecord.objects.all()
     serializer_class = MedicalRecordSerializer
+    compact_fields = ['id', 'appointment', 'doctor_name', 'patient_name', 'diagnosis', 'created_at']
     permission_classes = [IsAuthenticated]
     
     def get_permissions(self):
@@ -106,21 +189,163 @@ class MedicalRecordViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         user = self.request.user
+        queryset = with_record_relations(MedicalRecord.objects.all())
         if user.role == 'doctor':
-            return MedicalRecord.objects.filter(doctor__user=user)
+            return queryset.filter(doctor__user=user)
         elif user.role == 'citizen':
-            return MedicalRecord.objects.filter(patient=user)
-        return MedicalRecord.objects.all()
+            return queryset.filter(patient=user)
+        return queryset
     
     @action(detail=False, methods=['get'])
     def patient_history(self, request):
-        """Get patient medical history"""
+        """Paginated patient medical history, newest first; ``view=summary`` for timelines"""
         patient_id = request.query_params.get('patient_id')
-        if patient_id:
-            records = MedicalRecord.objects.filter(patient_id=patient_id).order_by('-created_at')
-            serializer = self.get_serializer(records, many=True)
-            return Response(serializer.data)
-        return Response({'error': 'patient_id required'}, status=status.HTTP_400_BAD_REQUEST)
+        if not patient_id:
+            return Response({'error': 'patient_id required'}, status=status.HTTP_400_BAD_REQUEST)
+        if not patient_id.isdigit():
+            return Response({'error': 'patient_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        denied = _patient_access_error(request.user, int(patient_id))
+        if denied:
+            return denied
+
+        records = MedicalRecord.objects.filter(patient_id=patient_id).order_by('-created_at', '-id')
+        paginator = StandardPagination()
+        if request.query_params.get('view') == 'summary':
+            records = records.select_related('doctor__user').annotate(prescription_count=Count('prescriptions'))
+            page = paginator.paginate_queryset(records, request, view=self)
+            serializer = MedicalRecordSummarySerializer(page, many=True)
+        else:
+            page = paginator.paginate_queryset(with_record_relations(records), request, view=self)
+            serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def vital_trends(self, request):
+        """A patient's vitals over time, downsampled to at most ``points`` per series"""
+        user = request.user
+        patient_id = user.id if user.role == 'citizen' else request.query_params.get('patient_id')
+        if not str(patient_id or '').isdigit():
+            return Response({'error': 'patient_id required'}, status=status.HTTP_400_BAD_REQUEST)
+        patient_id = int(patient_id)
+        denied = _patient_access_error(user, patient_id)
+        if denied:
+            return denied
+
+        metrics = request.query_params.get('metrics')
+        metrics = [name.strip() for name in metrics.split(',') if name.strip()] if metrics else list(VITAL_FIELDS)
+        unknown = sorted(set(metrics) - set(VITAL_FIELDS))
+        if unknown:
+            return Response(
+                {'error': f"Unknown metrics: {', '.join(unknown)}. Choose from {', '.join(VITAL_FIELDS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            bounds = date_params(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        start = datetime.combine(bounds['from'], time.min, dt_timezone.utc) if 'from' in bounds else None
+        end = datetime.combine(bounds['to'], time.max, dt_timezone.utc) if 'to' in bounds else None
+
+        try:
+            points = min(max(int(request.query_params.get('points', DEFAULT_POINTS)), 2), MAX_TREND_POINTS)
+        except ValueError:
+            return Response({'error': 'points must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'patient_id': patient_id, **trend(patient_id, metrics, start, end, points)})
+
+    @action(detail=False, methods=['post'])
+    def finalize(self, request):
+        """
+        Finalise a consultation in one transaction: create the record and its
+        prescriptions, complete the appointment and optionally book a follow-up.
+        """
+        doctor = Doctor.objects.filter(user=request.user).first()
+        if doctor is None:
+            return Response({'error': 'Doctor profile not found'}, status=status.HTTP_403_FORBIDDEN)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        appointment = serializer.validated_data.get('appointment')
+        patient = serializer.validated_data['patient']
+        if appointment and (appointment.doctor_id != doctor.id or appointment.patient_id != patient.id):
+            return Response(
+                {'error': 'Appointment does not belong to this doctor and patient'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        follow_up = None
+        follow_up_data = request.data.get('follow_up')
+        if follow_up_data:
+            if appointment is None or not isinstance(follow_up_data, dict):
+                return Response(
+                    {'error': 'follow_up needs an appointment and appointment_date, appointment_time, reason'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            follow_up = AppointmentSerializer(data={**follow_up_data, 'doctor': doctor.id})
+            if not follow_up.is_valid():
+                return Response({'follow_up': follow_up.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            with transaction.atomic():
+                medical_record = serializer.save(doctor=doctor)
+                if appointment and appointment.status != 'completed':
+                    previous, appointment.status = appointment.status, 'completed'
+                    appointment.save(update_fields=['status', 'updated_at'])
+                    transitions.record('appointment', [(appointment.pk, previous, 'completed')], request.user)
+                follow_up_appointment = None
+                if follow_up:
+                    follow_up_appointment = follow_up.save(patient=patient)
+                    transitions.record('appointment', [(follow_up_appointment.pk, '', follow_up_appointment.status)],
+                                       request.user)
+                    FollowUp.objects.create(
+                        original_appointment=appointment,
+                        follow_up_appointment=follow_up_appointment,
+                        reason=follow_up_appointment.reason
+                    )
+        except IntegrityError:
+            # Only a booking that took the follow-up slot after validation is a
+            # conflict; any other constraint failure is a bug and propagates
+            if not follow_up or not Appointment.objects.filter(
+                doctor=doctor,
+                appointment_date=follow_up.validated_data['appointment_date'],
+                appointment_time=follow_up.validated_data['appointment_time'],
+            ).exists():
+                raise
+            return Response({'error': 'Follow-up slot is no longer available'}, status=status.HTTP_409_CONFLICT)
+
+        return Response({
+            'medical_record': serializer.data,
+            'follow_up_appointment': AppointmentSerializer(follow_up_appointment).data if follow_up_appointment else None,
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Ranked full-text search over diagnosis, symptoms, treatment plan and medications"""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'q required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Same visibility as get_queryset
+        scope = {}
+        if request.user.role == 'doctor':
+            doctor_id = Doctor.objects.filter(user=request.user).values_list('id', flat=True).first()
+            if doctor_id is None:
+                return Response({'error': 'Doctor profile not found'}, status=status.HTTP_404_NOT_FOUND)
+            scope['doctor_id'] = doctor_id
+        elif request.user.role == 'citizen':
+            scope['patient_id'] = request.user.id
+
+        patient_id = request.query_params.get('patient_id')
+        if patient_id and 'patient_id' not in scope:
+            if not patient_id.isdigit():
+                return Response({'error': 'patient_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+            scope['patient_id'] = int(patient_id)
+
+        paginator = StandardPagination()
+        page = paginator.paginate_queryset(search_records(query, **scope), request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=['get'])
     def prescription_pdf(self, request, pk=None):
@@ -281,13 +506,13 @@ class MedicalRecordViewSet(viewsets.ModelViewSet):
         buffer.seek(0)
         return HttpResponse(buffer, content_type='application/pdf')
 
-class PrescriptionViewSet(viewsets.ModelViewSet):
+class PrescriptionViewSet(FieldProjectionMixin, viewsets.ModelViewSet):
     """Prescription management"""
     queryset = Prescription.objects.all()
     serializer_class = PrescriptionSerializer
     permission_classes = [IsAuthenticated]
 
-class DoctorUnavailabilityViewSet(viewsets.ModelViewSet):
+class DoctorUnavailabilityViewSet(FieldProjectionMixin, viewsets.ModelViewSet):
     """Doctor unavailability management"""
     queryset = DoctorUnavailability.objects.all()
     serializer_class = DoctorUnavailabilitySerializer
@@ -302,6 +527,44 @@ class DoctorUnavailabilityViewSet(viewsets.ModelViewSet):
         doctor = Doctor.objects.get(user=self.request.user)
         serializer.save(doctor=doctor)
 
+# Upper bound on patients scored per batch request
+MAX_PREDICTION_BATCH = 1000
+
+
+def _risk_report(data, risks):
+    """Build the prediction response for one patient from their (diabetes, heart, cancer) risks"""
+    diabetes_risk, heart_risk, cancer_risk = (float(risk) for risk in risks)
+
+    # Recommendations
+    checkups = []
+    if diabetes_risk > RISK_FLAG_THRESHOLDS['diabetes']:
+        checkups.append("Blood Sugar Test (Fasting / HbA1c)")
+    if heart_risk > RISK_FLAG_THRESHOLDS['heart']:
+        checkups.extend(["Blood Pressure Test", "ECG"])
+    if cancer_risk > RISK_FLAG_THRESHOLDS['cancer']:
+        checkups.append("Cancer Screening Consultation")
+    if data["bmi"] > 25:
+        checkups.append("Lipid Profile")
+
+    # Lifestyle Advice
+    advice = []
+    if data["smoking"] == "high":
+        advice.append("Reduce smoking gradually")
+    if data["alcohol"] == "high":
+        advice.append("Limit alcohol consumption")
+    if data["activity"] == "low":
+        advice.append("Increase physical activity to at least 30 minutes daily")
+    if data["bmi"] > 25:
+        advice.append("Maintain a healthy weight through balanced diet")
+
+    return {
+        "diabetes": round(diabetes_risk * 100, 2),
+        "heart": round(heart_risk * 100, 2),
+        "cancer": round(cancer_risk * 100, 2),
+        "checkups": checkups,
+        "advice": advice
+    }
+
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny]) # Making it accessible as per flow, security can be tightened later
 def predict_disease(request):
@@ -309,66 +572,39 @@ def predict_disease(request):
     form = PatientForm(request.data)
     if form.is_valid():
         data = form.cleaned_data
-        
-        # Encode input
-        # Validation for smoking, alcohol, activity mapping is handled by form choice field but we need to map to int
-        smoking_map = {"low": 0, "moderate": 1, "high": 2}
-        alcohol_map = {"low": 0, "moderate": 1, "high": 2}
-        activity_map = {"low": 0, "moderate": 1, "high": 2}
-
         try:
-            input_vector = np.array([[
-                data["age"],
-                1 if data["gender"] == "M" else 0,
-                data["bmi"],
-                smoking_map[data["smoking"]],
-                alcohol_map[data["alcohol"]],
-                activity_map[data["activity"]],
-                int(data["family_diabetes"]),
-                int(data["family_heart"]),
-                int(data["family_cancer"])
-            ]])
-
-            # Scale input
-            X_scaled = scaler.transform(input_vector)
-
-            # Predict risks
-            diabetes_risk = diabetes_model.predict_proba(X_scaled)[0][1]
-            heart_risk = heart_model.predict_proba(X_scaled)[0][1]
-            cancer_risk = cancer_model.predict_proba(X_scaled)[0][1]
-
-            # Recommendations
-            checkups = []
-            if diabetes_risk > 0.6:
-                checkups.append("Blood Sugar Test (Fasting / HbA1c)")
-            if heart_risk > 0.5:
-                checkups.extend(["Blood Pressure Test", "ECG"])
-            if cancer_risk > 0.4:
-                checkups.append("Cancer Screening Consultation")
-            if data["bmi"] > 25:
-                checkups.append("Lipid Profile")
-
-            # Lifestyle Advice
-            advice = []
-            if data["smoking"] == "high":
-                advice.append("Reduce smoking gradually")
-            if data["alcohol"] == "high":
-                advice.append("Limit alcohol consumption")
-            if data["activity"] == "low":
-                advice.append("Increase physical activity to at least 30 minutes daily")
-            if data["bmi"] > 25:
-                advice.append("Maintain a healthy weight through balanced diet")
-
-            result = {
-                "diabetes": round(diabetes_risk * 100, 2),
-                "heart": round(heart_risk * 100, 2),
-                "cancer": round(cancer_risk * 100, 2),
-                "checkups": checkups,
-                "advice": advice
-            }
-            return Response(result)
-        
+            risks = risk_scorer.predict([patient_features(data)])[0]
+            return Response(_risk_report(data, risks))
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     return Response(form.errors, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def predict_disease_batch(request):
+    """Predict disease risks for many patients in one pass"""
+    patients = request.data.get('patients')
+    if not isinstance(patients, list) or not patients:
+        return Response({'error': 'patients must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(patients) > MAX_PREDICTION_BATCH:
+        return Response(
+            {'error': f'At most {MAX_PREDICTION_BATCH} patients per request'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    cleaned, errors = [], {}
+    for index, patient in enumerate(patients):
+        form = PatientForm(patient if isinstance(patient, dict) else {})
+        if form.is_valid():
+            cleaned.append(form.cleaned_data)
+        else:
+            errors[index] = form.errors
+    if errors:
+        return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        risks = risk_scorer.predict([patient_features(data) for data in cleaned])
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    return Response({'results': [_risk_report(data, row) for data, row in zip(cleaned, risks)]})
@@ -0,0 +1,252 @@
+"""
+Vital-signs time series.
+
+``MedicalRecord.vital_signs`` is free-form JSON. Every save parses it into a
+typed VitalSign row indexed by (patient, recorded_at), so a patient's trends
+are read from one narrow index range instead of loading and parsing every
+record. Long histories are downsampled into equal time buckets that keep
+each bucket's min and max, so short spikes stay visible on a chart.
+"""
+import re
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from django.db.models.signals import post_save
+
+# Column -> accepted vital_signs keys (compared case-insensitively)
+VITAL_ALIASES = {
+    'systolic_bp': ('systolic_bp', 'systolic', 'sbp'),
+    'diastolic_bp': ('diastolic_bp', 'diastolic', 'dbp'),
+    'pulse': ('pulse', 'heart_rate', 'hr'),
+    'respiratory_rate': ('respiratory_rate', 'resp_rate', 'rr'),
+    'temperature': ('temperature', 'temp'),
+    'spo2': ('spo2', 'oxygen_saturation', 'o2_sat'),
+    'weight_kg': ('weight_kg', 'weight'),
+    'height_cm': ('height_cm', 'height'),
+    'bmi': ('bmi',),
+    'blood_sugar': ('blood_sugar', 'blood_glucose', 'glucose'),
+}
+VITAL_FIELDS = tuple(VITAL_ALIASES)
+
+# Combined "120/80" blood pressure keys
+BP_KEYS = ('bp', 'blood_pressure')
+
+# Units a reading may carry, per column, with conversions to the column's
+# unit. Readings in any other unit are dropped rather than stored on the
+# wrong scale; readings without a unit are taken to be in the column's.
+_KG_PER_LB = 0.45359237
+VITAL_UNITS = {
+    'systolic_bp': {'mmhg': float},
+    'diastolic_bp': {'mmhg': float},
+    'pulse': {'bpm': float, '/min': float},
+    'respiratory_rate': {'/min': float, 'breaths/min': float},
+    'temperature': {'c': float, 'f': lambda f: (f - 32) * 5 / 9},
+    'spo2': {'%': float},
+    'weight_kg': {'kg': float, 'lb': lambda lb: lb * _KG_PER_LB, 'lbs': lambda lb: lb * _KG_PER_LB},
+    'height_cm': {'cm': float, 'm': lambda m: m * 100, 'in': lambda inches: inches * 2.54},
+    'bmi': {'kg/m2': float},
+    'blood_sugar': {'mg/dl': float, 'mmol/l': lambda mmol: mmol * 18.0},
+}
+
+# A unitless temperature above this is Fahrenheit: the Celsius and
+# Fahrenheit ranges of a living patient do not overlap around it
+FAHRENHEIT_ABOVE = 50
+
+# Plausible ranges in the column's unit; anything outside is treated as a
+# typo and dropped
+VITAL_RANGES = {
+    'systolic_bp': (40, 300),
+    'diastolic_bp': (20, 200),
+    'pulse': (20, 300),
+    'respiratory_rate': (4, 80),
+    'temperature': (25, 46),
+    'spo2': (50, 100),
+    'weight_kg': (0.5, 500),
+    'height_cm': (30, 260),
+    'bmi': (5, 100),
+    'blood_sugar': (10, 1000),
+}
+INTEGER_FIELDS = ('systolic_bp', 'diastolic_bp', 'pulse', 'respiratory_rate')
+
+# Points per series returned by trend() unless asked otherwise
+DEFAULT_POINTS = 200
+
+_NUMBER = re.compile(r'\d+(?:\.\d+)?')
+_READING = re.compile(r'(\d+(?:\.\d+)?)\s*(.*)')
+
+
+def _reading(field, value):
+    """A value in its column's unit; None without a number or in an unknown unit"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        number, unit = float(value), ''
+    else:
+        match = _READING.fullmatch(str(value).strip())
+        if not match:
+            return None
+        number, unit = float(match.group(1)), match.group(2).lower().replace('°', '').replace(' ', '')
+    if not unit:
+        if field != 'temperature' or number <= FAHRENHEIT_ABOVE:
+            return number
+        unit = 'f'
+    convert = VITAL_UNITS[field].get(unit)
+    return convert(number) if convert else None
+
+
+def parse_vitals(vital_signs):
+    """
+    Extract typed readings from a vital_signs dict.
+
+    Args:
+        vital_signs: e.g. ``{"bp": "120/80", "temperature": "98.6 F", "weight": "154 lbs"}``
+
+    Returns:
+        dict: Column -> value for every plausible reading found, in mmHg,
+        /min, Celsius, %, kg, cm, kg/m2 and mg/dL; empty if none
+    """
+    if not isinstance(vital_signs, dict):
+        return {}
+    raw = {str(key).strip().lower(): value for key, value in vital_signs.items()}
+
+    values = {}
+    for key in BP_KEYS:
+        parts = _NUMBER.findall(str(raw.get(key, '')))
+        if len(parts) >= 2:
+            values['systolic_bp'], values['diastolic_bp'] = float(parts[0]), float(parts[1])
+            break
+    for field, aliases in VITAL_ALIASES.items():
+        for alias in aliases:
+            if alias in raw:
+                number = _reading(field, raw[alias])
+                if number is not None:
+                    values[field] = number
+                break
+    if 'bmi' not in values and 'weight_kg' in values and 'height_cm' in values:
+        values['bmi'] = values['weight_kg'] / (values['height_cm'] / 100) ** 2
+
+    readings = {}
+    for field, value in values.items():
+        low, high = VITAL_RANGES[field]
+        if low <= value <= high:
+            readings[field] = round(value) if field in INTEGER_FIELDS else value
+    return readings
+
+
+def _row(model, record_id, patient_id, recorded_at, readings):
+    return model(
+        medical_record_id=record_id, patient_id=patient_id, recorded_at=recorded_at,
+        **{field: readings.get(field) for field in VITAL_FIELDS}
+    )
+
+
+def _upsert(model, rows):
+    model.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['medical_record'],
+        update_fields=['patient', 'recorded_at', *VITAL_FIELDS],
+    )
+
+
+def sync_record_vitals(record, created=False):
+    """Write (or clear) the VitalSign row of one medical record"""
+    from .models import VitalSign
+    readings = parse_vitals(record.vital_signs)
+    if readings:
+        _upsert(VitalSign, [_row(VitalSign, record.pk, record.patient_id, record.created_at, readings)])
+    elif not created:
+        VitalSign.objects.filter(medical_record_id=record.pk).delete()
+
+
+def backfill(medical_record_model, vital_sign_model, batch_size=2000):
+    """
+    Parse the vitals of every existing record.
+
+    Takes the models as arguments so migrations can pass historical models.
+
+    Returns:
+        int: Records that had at least one reading
+    """
+    records = (
+        medical_record_model.objects.exclude(vital_signs={})
+        .order_by('id').values_list('id', 'patient_id', 'created_at', 'vital_signs')
+    )
+    rows, written = [], 0
+    for record_id, patient_id, created_at, vital_signs in records.iterator(chunk_size=batch_size):
+        readings = parse_vitals(vital_signs)
+        if readings:
+            rows.append(_row(vital_sign_model, record_id, patient_id, created_at, readings))
+        if len(rows) >= batch_size:
+            _upsert(vital_sign_model, rows)
+            written, rows = written + len(rows), []
+    if rows:
+        _upsert(vital_sign_model, rows)
+        written += len(rows)
+    return written
+
+
+def _downsample(times, values, points):
+    """Equal-width time buckets of (time, avg, min, max, n); empty buckets are left out"""
+    if len(values) <= points:
+        return [(t, v, v, v, 1) for t, v in zip(times, values)]
+    edges = np.linspace(times[0], times[-1], points + 1)
+    bucket = np.clip(np.searchsorted(edges, times, side='right') - 1, 0, points - 1)
+    # times are sorted, so each bucket is one contiguous run
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    counts = np.diff(np.r_[starts, len(values)])
+    return list(zip(
+        np.add.reduceat(times, starts) / counts,
+        np.add.reduceat(values, starts) / counts,
+        np.minimum.reduceat(values, starts),
+        np.maximum.reduceat(values, starts),
+        counts,
+    ))
+
+
+def trend(patient_id, metrics=VITAL_FIELDS, start=None, end=None, points=DEFAULT_POINTS):
+    """
+    A patient's vitals over time.
+
+    Args:
+        patient_id: Patient (CustomUser) id
+        metrics: VITAL_FIELDS to return
+        start: Earliest recorded_at, inclusive
+        end: Latest recorded_at, inclusive
+        points: Maximum points per series before downsampling
+
+    Returns:
+        dict: ``{"count": rows, "series": {metric: [{"t", "avg", "min", "max", "n"}, ...]}}``
+    """
+    from .models import VitalSign
+
+    readings = VitalSign.objects.filter(patient_id=patient_id)
+    if start is not None:
+        readings = readings.filter(recorded_at__gte=start)
+    if end is not None:
+        readings = readings.filter(recorded_at__lte=end)
+    rows = list(readings.order_by('recorded_at').values_list('recorded_at', *metrics))
+
+    series = {}
+    for column, metric in enumerate(metrics, start=1):
+        present = [(row[0].timestamp(), row[column]) for row in rows if row[column] is not None]
+        times = np.array([t for t, _ in present], dtype=np.float64)
+        values = np.array([v for _, v in present], dtype=np.float64)
+        series[metric] = [
+            {
+                't': datetime.fromtimestamp(float(t), dt_timezone.utc),
+                'avg': round(float(avg), 2),
+                'min': float(low),
+                'max': float(high),
+                'n': int(n),
+            }
+            for t, avg, low, high, n in _downsample(times, values, points)
+        ]
+    return {'count': len(rows), 'series': series}
+
+
+def _record_saved(sender, instance, created, **kwargs):
+    sync_record_vitals(instance, created)
+
+
+def connect_signals():
+    from .models import MedicalRecord
+    post_save.connect(_record_saved, sender=MedicalRecord, dispatch_uid='vitals-medicalrecord-save')
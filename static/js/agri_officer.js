@@ -5,12 +5,14 @@ console.log("Agri Officer Script Loaded");
 
 // Global State
 let currentQueryId = null;
+let queries = [];
 
 document.addEventListener('DOMContentLoaded', () => {
     console.log("DOM Loaded - Initializing Dashboard");
     checkOfficerAuth();
     loadDashboardStats();
     loadRecentQueries();
+    subscribeEvents({ farmer_query: handleQueryEvent });
 
     // Attach form listeners manually just in case
     const updateForm = document.getElementById('post-update-form');
@@ -21,6 +23,15 @@ document.addEventListener('DOMContentLoaded', () => {
     // respond-form listener is handled via onsubmit in HTML for robustness
 });
 
+const refreshStats = debounce(loadDashboardStats);
+
+// Apply a pushed farmer query change instead of refetching the list
+function handleQueryEvent(event) {
+    applyRowEvent(queries, event);
+    renderQueries();
+    refreshStats();
+}
+
 function checkOfficerAuth() {
     const token = localStorage.getItem('authToken');
     const role = localStorage.getItem('userRole');
@@ -44,42 +55,47 @@ async function loadDashboardStats() {
 async function loadRecentQueries() {
     console.log("Loading queries...");
     try {
-        const response = await apiCall('/agriculture/queries/');
-        const container = document.getElementById('queries-table-body');
-        const queries = response.results || response || [];
+        const response = await apiCall('/agriculture/queries/?view=compact');
+        queries = response.results || response || [];
 
         console.log("Queries loaded:", queries.length);
-
-        if (queries.length === 0) {
-            container.innerHTML = '<tr><td colspan="5" class="text-center">No queries found.</td></tr>';
-            return;
-        }
-
-        container.innerHTML = queries.map(q => {
-            // Debug each row ID
-            if (!q.id) console.error("Query missing ID:", q);
-            return `
-            <tr>
-                <td>${q.query_id}</td>
-                <td>${q.farmer_name || 'Farmer'}</td>
-                <td>
-                    <strong>${q.title}</strong><br>
-                    <small>${q.crop_category_name || 'General'}</small>
-                </td>
-                <td><span class="badge badge-${getStatusColor(q.status)}">${q.status}</span></td>
-                <td>
-                    <button class="btn btn-sm btn-primary" onclick="window.viewQuery(${q.id})">View</button>
-                    <button class="btn btn-sm btn-secondary" onclick="window.openRespondModal(${q.id}, '${q.query_id}')">Respond</button>
-                </td>
-            </tr>
-            `;
-        }).join('');
+        renderQueries();
     } catch (error) {
         console.error('Failed to load queries:', error);
         document.getElementById('queries-table-body').innerHTML = '<tr><td colspan="5" class="text-error">Failed to load data</td></tr>';
     }
 }
 
+function renderQueries() {
+    const container = document.getElementById('queries-table-body');
+    if (!container) return;
+
+    if (queries.length === 0) {
+        container.innerHTML = '<tr><td colspan="5" class="text-center">No queries found.</td></tr>';
+        return;
+    }
+
+    container.innerHTML = queries.map(q => {
+        // Debug each row ID
+        if (!q.id) console.error("Query missing ID:", q);
+        return `
+        <tr>
+            <td>${q.query_id}</td>
+            <td>${q.farmer_name || 'Farmer'}</td>
+            <td>
+                <strong>${q.title}</strong><br>
+                <small>${q.crop_name || 'General'}</small>
+            </td>
+            <td><span class="badge badge-${getStatusColor(q.status)}">${q.status}</span></td>
+            <td>
+                <button class="btn btn-sm btn-primary" onclick="window.viewQuery(${q.id})">View</button>
+                <button class="btn btn-sm btn-secondary" onclick="window.openRespondModal(${q.id}, '${q.query_id}')">Respond</button>
+            </td>
+        </tr>
+        `;
+    }).join('');
+}
+
 // Global Functions attached to window explicitly
 window.viewQuery = function (id) {
     console.log("View Query Clicked:", id);
@@ -112,6 +128,20 @@ window.viewQuery = function (id) {
     });
 };
 
+// Take the next open query off the shared queue so no other officer works on it
+window.claimNextQuery = async function () {
+    try {
+        const q = await apiCall('/agriculture/queries/claim/', 'POST', null, true);
+        if (!q) {
+            showNotification('No open queries waiting', 'info');
+            return;
+        }
+        window.openRespondModal(q.id, q.query_id);
+    } catch (error) {
+        showNotification('Failed to claim a query: ' + error.message, 'error');
+    }
+};
+
 window.openRespondModal = function (id, queryRef) {
     console.log('Opening respond modal', id, queryRef);
     if (!id) {
@@ -223,7 +253,7 @@ window.loadAdvisories = async function () {
 
 window.loadUpdates = async function () {
     try {
-        const response = await apiCall('/agriculture/updates/');
+        const response = await apiCall('/agriculture/updates/?view=compact');
         const container = document.getElementById('my-updates-list');
         const updates = response.results || response || [];
 
@@ -1,11 +1,22 @@
 // City Services - Staff Dashboard JavaScript
 let currentComplaintId = null;
+let complaints = [];
 
 document.addEventListener('DOMContentLoaded', () => {
     checkStaffAuth();
     initializeDashboard();
+    subscribeEvents({ complaint: handleComplaintEvent });
 });
 
+const refreshStats = debounce(loadDashboardStats);
+
+// Apply a pushed complaint change instead of refetching the list
+function handleComplaintEvent(event) {
+    applyRowEvent(complaints, event);
+    renderComplaints();
+    refreshStats();
+}
+
 function checkStaffAuth() {
     const role = localStorage.getItem('userRole');
     if (role !== 'city_staff') {
@@ -17,6 +28,40 @@ async function initializeDashboard() {
     loadDashboardStats();
     loadComplaints();
     loadCategories();
+    loadHotspots();
+}
+
+// Busiest areas, served from the daily rollup
+async function loadHotspots() {
+    const container = document.getElementById('hotspots-table-body');
+    if (!container) return;
+    try {
+        const heatmap = await apiCall('/city/heatmap/');
+        const areas = heatmap.areas.slice(0, 8);
+        if (areas.length === 0) {
+            container.innerHTML = '<tr><td colspan="4" class="text-center">No complaints in this period.</td></tr>';
+            return;
+        }
+        const busiest = areas[0].total;
+        container.innerHTML = areas.map(a => {
+            const [topCategory] = Object.entries(a.by_category).sort((x, y) => y[1] - x[1])[0];
+            return `
+            <tr>
+                <td>${a.area_key.replace(/-/g, ' ').toUpperCase()}</td>
+                <td>
+                    <div style="display: flex; align-items: center; gap: 0.5rem;">
+                        <div style="height: 8px; width: ${Math.max(4, Math.round(120 * a.total / busiest))}px; background: var(--civic-green); border-radius: 4px;"></div>
+                        ${a.total}
+                    </div>
+                </td>
+                <td>${a.open}</td>
+                <td>${topCategory}</td>
+            </tr>`;
+        }).join('');
+    } catch (error) {
+        console.error('Failed to load hotspots:', error);
+        container.innerHTML = '<tr><td colspan="4" class="text-error">Failed to load data</td></tr>';
+    }
 }
 
 async function loadDashboardStats() {
@@ -33,51 +78,20 @@ async function loadDashboardStats() {
 async function loadComplaints(category = null, priority = null) {
     try {
         let url = '/city/complaints/';
-        const params = [];
+        const params = ['view=compact'];
         if (category) {
             params.push(`category=${encodeURIComponent(category)}`);
         }
         if (priority) {
             params.push(`priority=${encodeURIComponent(priority)}`);
         }
-        if (params.length > 0) {
-            url += '?' + params.join('&');
+        if (currentAssignedFilter) {
+            params.push(`assigned=${currentAssignedFilter}`);
         }
+        url += '?' + params.join('&');
         const response = await apiCall(url);
-        const container = document.getElementById('complaints-table-body');
-        const allContainer = document.getElementById('all-complaints-table-body');
-
-        const complaints = response.results || response || [];
-
-        if (!container && !allContainer) return;
-
-        const html = complaints.length === 0
-            ? '<tr><td colspan="6" class="text-center">No complaints found.</td></tr>'
-            : complaints.map(c => `
-                <tr>
-                    <td>${c.complaint_id}</td>
-                    <td>
-                        <strong>${c.citizen_name || 'Citizen'}</strong><br>
-                        <small>${c.location}</small>
-                    </td>
-                    <td>
-                        <div>${c.title}</div>
-                        <span class="badge badge-secondary">${c.category_name}</span>
-                    </td>
-                    <td><span class="badge badge-${getPriorityColor(c.priority)}">${c.priority ? c.priority.toUpperCase() : 'MEDIUM'}</span></td>
-                    <td><span class="badge badge-${getStatusColor(c.status)}">${c.status}</span></td>
-                    <td>
-                        <div style="display: flex; gap: 0.5rem;">
-                            <button class="btn btn-sm btn-primary" onclick="viewComplaint(${c.id})">View</button>
-                            <button class="btn btn-sm btn-secondary" onclick="openRespondModal(${c.id}, '${c.complaint_id}')">Respond</button>
-                        </div>
-                    </td>
-                </tr>
-            `).join('');
-
-        if (container) container.innerHTML = html;
-        if (allContainer) allContainer.innerHTML = html;
-
+        complaints = response.results || response || [];
+        renderComplaints();
     } catch (error) {
         console.error('Failed to load complaints:', error);
         if (document.getElementById('complaints-table-body')) {
@@ -86,6 +100,59 @@ async function loadComplaints(category = null, priority = null) {
     }
 }
 
+function matchesFilters(c) {
+    if (currentCategoryFilter && (c.category_name || '').toLowerCase() !== currentCategoryFilter.toLowerCase()) return false;
+    if (currentPriorityFilter && (c.priority || '').toLowerCase() !== currentPriorityFilter.toLowerCase()) return false;
+    if (currentAssignedFilter === 'me' && c.assigned_to_username !== localStorage.getItem('userName')) return false;
+    if (currentAssignedFilter === 'none' && c.assigned_to) return false;
+    return true;
+}
+
+// Still open past its SLA deadline
+function isOverdue(c) {
+    return Boolean(c.due_at) && !['resolved', 'closed'].includes(c.status) && new Date(c.due_at) < new Date();
+}
+
+function renderComplaints() {
+    const container = document.getElementById('complaints-table-body');
+    const allContainer = document.getElementById('all-complaints-table-body');
+    if (!container && !allContainer) return;
+
+    const visible = complaints.filter(matchesFilters);
+    const html = visible.length === 0
+        ? '<tr><td colspan="6" class="text-center">No complaints found.</td></tr>'
+        : visible.map(c => `
+            <tr>
+                <td>${c.complaint_id}</td>
+                <td>
+                    <strong>${c.citizen_name || 'Citizen'}</strong><br>
+                    <small>${c.location}</small><br>
+                    <small style="opacity: 0.7;">${c.assigned_to ? `Assigned: ${c.assigned_to_name || c.assigned_to_username}` : 'Unassigned'}</small>
+                </td>
+                <td>
+                    <div>${c.title}</div>
+                    <span class="badge badge-secondary">${c.category_name}</span>
+                    ${c.cluster ? '<span class="badge badge-info">Duplicate report</span>' : ''}
+                </td>
+                <td><span class="badge badge-${getPriorityColor(c.priority)}">${c.priority ? c.priority.toUpperCase() : 'MEDIUM'}</span></td>
+                <td>
+                    <span class="badge badge-${getStatusColor(c.status)}">${c.status}</span>
+                    ${isOverdue(c) ? '<span class="badge badge-danger">Overdue</span>' : ''}
+                    ${c.escalated_at ? '<span class="badge badge-warning">Escalated</span>' : ''}
+                </td>
+                <td>
+                    <div style="display: flex; gap: 0.5rem;">
+                        <button class="btn btn-sm btn-primary" onclick="viewComplaint(${c.id})">View</button>
+                        <button class="btn btn-sm btn-secondary" onclick="openRespondModal(${c.id}, '${c.complaint_id}')">Respond</button>
+                    </div>
+                </td>
+            </tr>
+        `).join('');
+
+    if (container) container.innerHTML = html;
+    if (allContainer) allContainer.innerHTML = html;
+}
+
 async function loadResponses() {
     const container = document.getElementById('responses-list');
     if (!container) return;
@@ -131,6 +198,7 @@ function showSection(sectionName) {
     if (sectionName === 'dashboard') {
         loadDashboardStats();
         loadComplaints();
+        loadHotspots();
     } else if (sectionName === 'complaints') {
         loadComplaints();
     } else if (sectionName === 'responses') {
@@ -154,6 +222,7 @@ async function loadCategories() {
 
 let currentCategoryFilter = null;
 let currentPriorityFilter = null;
+let currentAssignedFilter = null;
 
 window.handleCategoryFilter = function (value) {
     currentCategoryFilter = value || null;
@@ -165,6 +234,11 @@ window.handlePriorityFilter = function (value) {
     loadComplaints(currentCategoryFilter, currentPriorityFilter);
 };
 
+window.handleAssignedFilter = function (value) {
+    currentAssignedFilter = value || null;
+    loadComplaints(currentCategoryFilter, currentPriorityFilter);
+};
+
 function getStatusColor(status) {
     switch (status) {
         case 'submitted': return 'warning';
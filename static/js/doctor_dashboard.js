@@ -18,8 +18,17 @@ document.addEventListener('DOMContentLoaded', () => {
     loadDoctorProfile();
     loadDashboardData();
     setupEventListeners();
+    subscribeEvents({ appointment: handleAppointmentEvent });
 });
 
+// Apply a pushed appointment change to the list
+function handleAppointmentEvent(event) {
+    applyRowEvent(appointments, event);
+    displayAppointments();
+    updateDashboardStats();
+    displayTodaySchedule();
+}
+
 function initializeSidebarNavigation() {
     document.querySelectorAll('.sidebar-link').forEach(link => {
         link.addEventListener('click', (e) => {
@@ -103,30 +112,52 @@ function updateDashboardStats() {
     if (document.getElementById('completed-today')) document.getElementById('completed-today').textContent = cApts.length;
 }
 
-function displayTodaySchedule() {
+async function displayTodaySchedule() {
+    // Appointments, blocked periods and free gaps come pre-computed from the calendar endpoint
     const today = new Date().toISOString().split('T')[0];
-    const tApts = appointments.filter(a => a.appointment_date === today).sort((a, b) => a.appointment_time.localeCompare(b.appointment_time));
     const tbody = document.getElementById('today-schedule');
     if (!tbody) return;
+    let day;
+    try {
+        const r = await fetch(`${API_BASE}/doctors/me/calendar/?from=${today}&to=${today}`, {
+            headers: { 'Authorization': `Bearer ${localStorage.getItem('authToken')}` }
+        });
+        if (!r.ok) return;
+        day = (await r.json()).days[0];
+    } catch (e) { console.error('Calendar fetch failed:', e); return; }
 
-    if (tApts.length === 0) {
+    if (day.appointments.length === 0 && day.blocked.length === 0) {
         tbody.innerHTML = '<tr><td colspan="5" style="text-align:center; padding:3rem; opacity:0.5;">No appointments scheduled for today</td></tr>';
         return;
     }
-    tbody.innerHTML = tApts.map(a => `
-        <tr>
-            <td>${formatTime(a.appointment_time)}</td>
-            <td>${a.patient_data ? `${a.patient_data.first_name} ${a.patient_data.last_name}` : (a.patient_name || 'Unknown')}</td>
-            <td>${a.reason}</td>
-            <td>${getStatusBadge(a.status)}</td>
-            <td>
-                <div style="display:flex; gap:0.5rem;">
-                    <button class="btn btn-sm btn-primary" onclick="viewAppointment(${a.id})">View</button>
-                    ${a.status === 'scheduled' ? `<button class="btn btn-sm btn-success" onclick="completeAppointment(${a.id})">Complete</button>` : ''}
-                </div>
-            </td>
-        </tr>
-    `).join('');
+    const rows = [
+        ...day.appointments.map(a => ({ start: a.start, html: `
+            <tr>
+                <td>${a.start}</td>
+                <td>${a.patient_name || 'Unknown'} ${getRiskBadges(appointments.find(x => x.id === a.id)?.patient_risk)}</td>
+                <td>${a.reason}</td>
+                <td>${getStatusBadge(a.status)}</td>
+                <td>
+                    <div style="display:flex; gap:0.5rem;">
+                        <button class="btn btn-sm btn-primary" onclick="viewAppointment(${a.id})">View</button>
+                        ${a.status === 'scheduled' ? `<button class="btn btn-sm btn-success" onclick="completeAppointment(${a.id})">Complete</button>` : ''}
+                    </div>
+                </td>
+            </tr>` })),
+        ...day.blocked.map(b => ({ start: b.start, html: `
+            <tr style="opacity:0.6;">
+                <td>${b.start} - ${b.end}</td>
+                <td colspan="2">${b.reason}</td>
+                <td><span class="badge badge-secondary">blocked</span></td>
+                <td></td>
+            </tr>` })),
+        ...day.free.map(f => ({ start: f.start, html: `
+            <tr style="opacity:0.5;">
+                <td>${f.start} - ${f.end}</td>
+                <td colspan="4">Free</td>
+            </tr>` }))
+    ];
+    tbody.innerHTML = rows.sort((a, b) => a.start.localeCompare(b.start)).map(x => x.html).join('');
 }
 
 async function loadAllAppointments() {
@@ -164,7 +195,7 @@ function displayAppointments() {
     tbody.innerHTML = fApts.map(a => `
         <tr>
             <td>${formatDate(a.appointment_date)} ${formatTime(a.appointment_time)}</td>
-            <td>${a.patient_data ? `${a.patient_data.first_name} ${a.patient_data.last_name}` : (a.patient_name || 'Unknown')}</td>
+            <td>${a.patient_data ? `${a.patient_data.first_name} ${a.patient_data.last_name}` : (a.patient_name || 'Unknown')} ${getRiskBadges(a.patient_risk)}</td>
             <td>${a.patient_data ? (a.patient_data.phone_number || 'N/A') : 'N/A'}</td>
             <td>${a.reason}</td>
             <td>${getStatusBadge(a.status)}</td>
@@ -221,9 +252,19 @@ async function completeAppointment(id) {
         s.value = a.patient_data.id;
         s.disabled = true;
     }
+    setFollowUpVisible(true);
     openModal('create-record-modal');
 }
 
+function setFollowUpVisible(visible) {
+    // Follow-ups are booked from the appointment being completed
+    const f = document.getElementById('record-follow-up');
+    if (!f) return;
+    f.style.display = visible ? 'block' : 'none';
+    document.getElementById('follow-up-date').value = '';
+    document.getElementById('follow-up-time').value = '';
+}
+
 async function cancelAppointment(id) {
     if (!confirm('Abort this planned session?')) return;
     try {
@@ -271,40 +312,51 @@ function displayPatients() {
 }
 
 async function viewPatientHistory(pid) {
+    const p = patients.find(x => x.id === pid);
+    if (document.getElementById('patient-history-name')) document.getElementById('patient-history-name').textContent = `${p.first_name} ${p.last_name}`;
+    const c = document.getElementById('patient-history-content');
+    if (!c) return;
+    c.innerHTML = '';
+    await loadPatientHistoryPage(`${API_BASE}/medical-records/patient_history/?patient_id=${pid}&page_size=20`);
+    openModal('patient-history-modal');
+}
+
+async function loadPatientHistoryPage(url) {
+    // History is paginated newest first; older entries are appended on demand
+    const c = document.getElementById('patient-history-content');
     try {
-        const r = await fetch(`${API_BASE}/medical-records/patient_history/?patient_id=${pid}`, {
+        const r = await fetch(url, {
             headers: { 'Authorization': `Bearer ${localStorage.getItem('authToken')}` }
         });
-        if (r.ok) {
-            const h = await r.json();
-            const p = patients.find(x => x.id === pid);
-            if (document.getElementById('patient-history-name')) document.getElementById('patient-history-name').textContent = `${p.first_name} ${p.last_name}`;
-            const c = document.getElementById('patient-history-content');
-            if (!c) return;
-
-            if (h.length === 0) {
-                c.innerHTML = '<p style="text-align:center; padding:3rem; opacity:0.5;">No archived logs for this subject</p>';
-            } else {
-                c.innerHTML = h.map(x => `
-                    <div style="border:1px solid #f1f5f9; padding:2rem; margin-bottom:1.5rem; background:#fafafa;">
-                        <div style="display:flex; justify-content:space-between; margin-bottom:1rem;">
-                            <h4 style="color:var(--gov-blue);">${formatDate(x.created_at)}</h4>
-                            <span class="badge badge-info">Dr. ${x.doctor_name || 'System'}</span>
-                        </div>
-                        <p><strong>Diagnosis:</strong> ${x.diagnosis}</p>
-                        <p><strong>Symptoms:</strong> ${x.symptoms}</p>
-                        <p style="margin-top:1rem;"><strong>Treatment:</strong> ${x.treatment_plan}</p>
-                        ${x.prescriptions && x.prescriptions.length > 0 ? `
-                            <div style="margin-top:1.5rem; background:white; padding:1rem; border-radius:4px;">
-                                <label style="font-size:0.7rem; font-weight:800; opacity:0.5;">PHARMACEUTICALS</label>
-                                ${x.prescriptions.map(m => `<div style="padding:0.5rem 0; border-bottom:1px solid #f1f5f9;"><strong>${m.medication_name}</strong> - ${m.dosage} (${m.frequency})</div>`).join('')}
-                            </div>
-                        `: ''}
-                        <button class="btn btn-sm btn-success" style="margin-top:1.5rem;" onclick="printPrescription(${x.id})">PRINT LOG</button>
+        if (!r.ok) { showNotification('Access Denied', 'error'); return; }
+        const h = await r.json();
+        document.getElementById('patient-history-more')?.remove();
+
+        if (h.count === 0) {
+            c.innerHTML = '<p style="text-align:center; padding:3rem; opacity:0.5;">No archived logs for this subject</p>';
+            return;
+        }
+        c.insertAdjacentHTML('beforeend', h.results.map(x => `
+            <div style="border:1px solid #f1f5f9; padding:2rem; margin-bottom:1.5rem; background:#fafafa;">
+                <div style="display:flex; justify-content:space-between; margin-bottom:1rem;">
+                    <h4 style="color:var(--gov-blue);">${formatDate(x.created_at)}</h4>
+                    <span class="badge badge-info">Dr. ${x.doctor_name || 'System'}</span>
+                </div>
+                <p><strong>Diagnosis:</strong> ${x.diagnosis}</p>
+                <p><strong>Symptoms:</strong> ${x.symptoms}</p>
+                <p style="margin-top:1rem;"><strong>Treatment:</strong> ${x.treatment_plan}</p>
+                ${x.prescriptions && x.prescriptions.length > 0 ? `
+                    <div style="margin-top:1.5rem; background:white; padding:1rem; border-radius:4px;">
+                        <label style="font-size:0.7rem; font-weight:800; opacity:0.5;">PHARMACEUTICALS</label>
+                        ${x.prescriptions.map(m => `<div style="padding:0.5rem 0; border-bottom:1px solid #f1f5f9;"><strong>${m.medication_name}</strong> - ${m.dosage} (${m.frequency})</div>`).join('')}
                     </div>
-                `).join('');
-            }
-            openModal('patient-history-modal');
+                `: ''}
+                <button class="btn btn-sm btn-success" style="margin-top:1.5rem;" onclick="printPrescription(${x.id})">PRINT LOG</button>
+            </div>
+        `).join(''));
+        if (h.next) {
+            c.insertAdjacentHTML('beforeend', `<button id="patient-history-more" class="btn btn-sm btn-primary" style="width:100%;">Load older entries</button>`);
+            document.getElementById('patient-history-more').onclick = () => loadPatientHistoryPage(h.next);
         }
     } catch (e) { showNotification('Access Denied', 'error'); }
 }
@@ -342,6 +394,7 @@ function displayMedicalRecords() {
 
 function openCreateRecordModal() {
     activeAppointmentId = null;
+    setFollowUpVisible(false);
 
     // Ensure patients are loaded from appointments
     if (appointments.length > 0) {
@@ -451,9 +504,19 @@ async function finalizeRecord() {
         appointment: activeAppointmentId ? parseInt(activeAppointmentId) : null,
         prescriptions: getPrescriptions()
     };
+    const followUpDate = document.getElementById('follow-up-date')?.value;
+    const followUpTime = document.getElementById('follow-up-time')?.value;
+    if (activeAppointmentId && followUpDate && followUpTime) {
+        data.follow_up = {
+            appointment_date: followUpDate,
+            appointment_time: followUpTime,
+            reason: `Follow-up: ${data.diagnosis}`
+        };
+    }
 
     try {
-        const r = await fetch(`${API_BASE}/medical-records/`, {
+        // Record, prescriptions, appointment completion and follow-up are saved together
+        const r = await fetch(`${API_BASE}/medical-records/finalize/`, {
             method: 'POST',
             headers: {
                 'Authorization': `Bearer ${localStorage.getItem('authToken')}`,
@@ -462,10 +525,6 @@ async function finalizeRecord() {
             body: JSON.stringify(data)
         });
         if (r.ok) {
-            if (activeAppointmentId) await fetch(`${API_BASE}/appointments/${activeAppointmentId}/complete/`, {
-                method: 'POST',
-                headers: { 'Authorization': `Bearer ${localStorage.getItem('authToken')}` }
-            });
             showNotification('✅ Archive Entry Finalized Successfully', 'success');
             closeModal('create-record-modal');
             loadMedicalRecords(); loadAllAppointments(); updateDashboardStats();
@@ -611,6 +670,12 @@ function formatTime(s) {
     return `${hr % 12 || 12}:${m} ${am}`;
 }
 
+function getRiskBadges(risk) {
+    // Flags from the nightly score_patient_risks job
+    if (!risk || !risk.flags.length) return '';
+    return risk.flags.map(f => `<span class="badge badge-danger" title="${f} risk ${risk[f]}%">${f}</span>`).join(' ');
+}
+
 function getStatusBadge(s) {
     const m = { 'scheduled': 'info', 'completed': 'success', 'cancelled': 'danger', 'no_show': 'warning' };
     return `<span class="badge badge-${m[s] || 'secondary'}">${s}</span>`;
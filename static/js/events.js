@@ -0,0 +1,65 @@
+/**
+ * Seva Setu - Live Events
+ * Server-pushed row changes (GET /api/core/events/) for the staff, officer
+ * and doctor dashboards.
+ */
+
+const EVENTS_URL = '/api/core/events/';
+
+/**
+ * Subscribe to server-pushed row changes.
+ * `handlers` maps a topic (complaint, appointment, farmer_query, approval_request)
+ * to a callback receiving {action, id, data}. The stream authenticates with a
+ * short-lived cookie from POST /api/core/events/ticket/, so the access token never
+ * appears in a URL. The browser reconnects on its own and resumes from the last
+ * event id; once the cookie expires the stream is reopened with a new one.
+ */
+async function subscribeEvents(handlers, lastEventId = null) {
+    const token = localStorage.getItem('authToken');
+    if (!token || !window.EventSource) return;
+
+    try {
+        const r = await fetch(`${EVENTS_URL}ticket/`, {
+            method: 'POST',
+            headers: { 'Authorization': `Bearer ${token}` }
+        });
+        if (!r.ok) return;
+    } catch (e) { return; }
+
+    const query = lastEventId ? `?last_event_id=${encodeURIComponent(lastEventId)}` : '';
+    const source = new EventSource(EVENTS_URL + query);
+    Object.entries(handlers).forEach(([topic, handler]) => {
+        source.addEventListener(topic, e => {
+            lastEventId = e.lastEventId || lastEventId;
+            handler(JSON.parse(e.data));
+        });
+    });
+    source.addEventListener('error', () => {
+        // A rejected reconnect closes the stream for good
+        if (source.readyState === EventSource.CLOSED) {
+            setTimeout(() => subscribeEvents(handlers, lastEventId), 3000);
+        }
+    });
+}
+
+// Apply a pushed {action, id, data} change to an array of rows in place
+function applyRowEvent(rows, event) {
+    const index = rows.findIndex(row => row.id === event.id);
+    if (event.action === 'deleted') {
+        if (index !== -1) rows.splice(index, 1);
+    } else if (index !== -1) {
+        rows[index] = { ...rows[index], ...event.data };
+    } else {
+        rows.unshift(event.data);
+    }
+    return rows;
+}
+
+// Collapse bursts of calls into one trailing call
+function debounce(fn, wait = 500) {
+    let timer = null;
+    return (...args) => {
+        clearTimeout(timer);
+        timer = setTimeout(() => fn(...args), wait);
+    };
+}